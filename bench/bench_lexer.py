@@ -0,0 +1,100 @@
+"""
+Lexer throughput and memory on generated scripts.
+
+    $ python bench/bench_lexer.py
+
+Compares `lexer.lex` with the previous char-by-char `tokenize()` (kept below as the
+baseline), which was called on every line and again on argument substrings.
+"""
+import os, sys, time, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from foundrydeploy.lexer import lex
+
+
+def tokenize(line: str, delim=" ", ignore=["(", ")"]):
+    tokens = []
+
+    NO_SKIP = ""
+    close_skip = NO_SKIP
+
+    token = ""
+    length = len(line)
+    for (index, ch) in enumerate(line):
+
+        if close_skip == NO_SKIP and ch == '"':
+            close_skip = ch
+        if close_skip == NO_SKIP and ch == ignore[0]:
+            close_skip = ignore[1]
+        elif ch == close_skip:
+            close_skip = NO_SKIP
+
+        if ch == delim and close_skip == NO_SKIP:
+            tokens.append(token)
+            token = ""
+        else:
+            token += ch
+
+        if index == length - 1:
+            tokens.append(token)
+
+    return tokens
+
+
+def baseline(script: str) -> int:
+    count = 0
+    for line in script.split("\n"):
+        line = line.strip()
+        if len(line) == 0 or line.startswith("#"):
+            continue
+        tokens = tokenize(line)
+        count += len(tokens)
+        if tokens[0] == "send":
+            arguments = tokenize(line.split(tokens[0] + " " + tokens[1])[1].strip())
+            tokenize(arguments[-1][1:-1], ",", ["[", "]"])
+    return count
+
+
+def generate(lines: int) -> str:
+    script = [".use d"]
+    for index in range(lines):
+        if index % 4 == 0:
+            script.append(
+                f"    deploy LABEL{index} ($LABEL{index - 4}, Name{index}, 11ether)"
+            )
+        elif index % 4 == 1:
+            script.append(
+                f"    send LABEL{index} setSaleDetails(1, [$A, $B, $C], 0x{index:064x}, 0)"
+            )
+        elif index % 4 == 2:
+            script.append(f'    send LABEL{index} setBaseURI("ipfs://{index}/")')
+        else:
+            script.append("    # comment")
+    return "\n".join(script)
+
+
+def measure(fn, script: str) -> tuple:
+    start = time.perf_counter()
+    result = fn(script)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = fn(script)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (elapsed, peak, result)
+
+
+if __name__ == "__main__":
+    print(
+        f"{'lines':>8} {'tokenize s':>11} {'lex s':>8} {'speedup':>8} {'lex bytes/token':>16}"
+    )
+    for lines in [10_000, 50_000, 100_000]:
+        script = generate(lines)
+        (old, _, _) = measure(baseline, script)
+        (new, peak, lexed) = measure(lex, script)
+        tokens = sum([len(line.tokens) for line in lexed])
+        print(
+            f"{lines:>8} {old:>11.3f} {new:>8.3f} {old / new:>7.1f}x {peak / tokens:>16.0f}"
+        )
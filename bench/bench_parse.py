@@ -0,0 +1,61 @@
+"""
+Parse time as the number of deployers and labels grows.
+
+    $ python bench/bench_parse.py
+
+Every script has the same `.use` block (skipped, so nothing is executed); only the number of
+deployers and labels changes. Time per line should stay flat.
+"""
+import os, sys, tempfile, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from loguru import logger
+from foundrydeploy import parser
+
+PATH_LINES = 2000
+
+
+def generate(deployers: int, labels: int) -> str:
+    lines = [".contracts"]
+    for label in range(labels):
+        lines.append(f"    LABEL{label} 0x{label + 1:040x}")
+
+    for deployer in range(deployers):
+        lines += [f".deployer d{deployer}", "    network fuji", "    signer ganache"]
+
+    lines += [".use d0", "    skip_start"]
+    for step in range(PATH_LINES):
+        label = step % labels
+        lines.append(f"    send LABEL{label} set(uint256) ({step})")
+        lines.append("    # comment")
+    lines.append("    skip_end")
+    return "\n".join(lines)
+
+
+def bench(deployers: int, labels: int) -> float:
+    script = generate(deployers, labels)
+    parser.SIGNERS.clear()
+    parser.DEPLOYERS.clear()
+    parser.ADDRESSES.clear()
+
+    start = time.perf_counter()
+    parser.parse(script)
+    elapsed = time.perf_counter() - start
+    return elapsed / len(script.splitlines())
+
+
+if __name__ == "__main__":
+    logger.remove()
+    os.chdir(tempfile.mkdtemp())
+
+    print(f"{'deployers':>10} {'labels':>8} {'us/line':>10}")
+    for (deployers, labels) in [
+        (1, 10),
+        (10, 100),
+        (100, 100),
+        (100, 500),
+        (300, 1000),
+    ]:
+        per_line = bench(deployers, labels)
+        print(f"{deployers:>10} {labels:>8} {per_line * 1e6:>10.1f}")
@@ -0,0 +1,75 @@
+"""
+Endpoint pool benchmark against local stand-in RPC servers (`rpc_server.py`): how reads are
+spread, how long a send takes to fail over when the fastest endpoint goes down, and the
+latency of sends through the pool compared with the slowest endpoint alone.
+
+    $ python bench/bench_pool.py
+    $ python bench/bench_pool.py --endpoints 4 --reads 2000 --latency 0.02
+"""
+import argparse, itertools, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from loguru import logger
+from foundrydeploy import TEST_SIGNER
+from foundrydeploy.crypto import sign_transaction
+from foundrydeploy.rpc import RpcClient
+from foundrydeploy.pool import PoolClient
+from rpc_server import Chain, serve
+
+
+# The stand-in checks the nonces of what it's sent
+_NONCES = itertools.count()
+
+
+def _send(client):
+    tx = {"chainId": 31337, "nonce": next(_NONCES), "gas": 21000, "gasPrice": 10**9}
+    raw = sign_transaction(tx, TEST_SIGNER.key_argument)
+    client.call("eth_sendRawTransaction", ["0x" + raw.hex()])
+
+
+def _sends(client, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        _send(client)
+    return (time.perf_counter() - start) / count * 1000
+
+
+def bench(endpoints: int, reads: int, sends: int, latency: float):
+    chain = Chain()
+    # The first endpoint is the fastest, every next one `latency` slower
+    servers = [serve(chain, latency=index * latency) for index in range(endpoints)]
+    pool = PoolClient([server.url for server in servers], interval=3600)
+
+    before = [server.requests for server in servers]
+    start = time.perf_counter()
+    for _ in range(reads):
+        pool.call("eth_blockNumber")
+    read_ms = (time.perf_counter() - start) / reads * 1000
+    spread = [server.requests - count for (server, count) in zip(servers, before)]
+    print(f"## reads ({reads}): {read_ms:.3f} ms each, per endpoint {spread}")
+
+    pool_ms = _sends(pool, sends)
+    slowest_ms = _sends(RpcClient(servers[-1].url), sends)
+    print(
+        f"## sends ({sends}): {pool_ms:.3f} ms each, slowest alone {slowest_ms:.3f} ms"
+    )
+
+    servers[0].down = True
+    start = time.perf_counter()
+    _send(pool)
+    failover_ms = (time.perf_counter() - start) * 1000
+    print(f"## failover: {failover_ms:.3f} ms, now sending to {pool.best()}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser()
+    cli.add_argument("--endpoints", type=int, default=3)
+    cli.add_argument("--reads", type=int, default=500)
+    cli.add_argument("--sends", type=int, default=50)
+    cli.add_argument("--latency", type=float, default=0.01)
+    args = cli.parse_args()
+
+    logger.remove()
+    bench(args.endpoints, args.reads, args.sends, args.latency)
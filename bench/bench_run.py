@@ -0,0 +1,212 @@
+"""
+End to end benchmark on synthetic projects: parse time, per-action overhead of running the
+`.use` paths against fake `forge`/`cast`, cache load/save time and peak memory.
+
+    $ python bench/bench_run.py                                  # small and medium scales
+    $ python bench/bench_run.py --scale large --json after.json --compare before.json
+    $ python bench/bench_run.py --contracts 300 --declarations 50 --deployers 2 --path 400
+
+Results are printed and, with `--json`, written as one object per scale so runs of different
+versions can be compared with `--compare`. `overhead_ms` is the CPU time foundrydeploy spends
+per action (the fake binaries run in child processes and aren't counted), `spawn_ms` the time
+to start one of them. The first run is recorded and `replay_s` is the time to replay it
+(`--replay`), without any process or network.
+"""
+import argparse, json, os, platform, resource, subprocess, sys, tempfile, time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from loguru import logger
+from foundrydeploy import parser, replay
+from fixtures import make_project
+from rpc_server import Chain, serve
+
+SCALES = {
+    "small": {"contracts": 10, "declarations": 10, "deployers": 1, "path": 50},
+    "medium": {"contracts": 100, "declarations": 100, "deployers": 4, "path": 250},
+    "large": {"contracts": 500, "declarations": 500, "deployers": 8, "path": 500},
+}
+
+# Lower is better for all of them
+METRICS = [
+    "compile_s",
+    "load_plan_s",
+    "compile_peak_kb",
+    "run_s",
+    "replay_s",
+    "overhead_ms",
+    "spawn_ms",
+    "rerun_overhead_ms",
+    "run_peak_kb",
+    "cache_save_ms",
+    "cache_load_ms",
+    "max_rss_kb",
+]
+
+
+def _reset():
+    parser.SIGNERS.clear()
+    parser.DEPLOYERS.clear()
+    parser.ADDRESSES.clear()
+
+
+def _actions(plan: dict) -> int:
+    return sum([len(step["path"]) for step in plan["steps"] if step["kind"] == "use"])
+
+
+def _spawn_ms(samples: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(samples):
+        subprocess.run("cast --version", shell=True, stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - start) / samples * 1000
+
+
+def _execute(plan: dict, traced: bool = False) -> tuple:
+    """
+    Runs a plan from scratch, returns (wall seconds, CPU seconds, peak traced bytes).
+    """
+    _reset()
+    if traced:
+        tracemalloc.start()
+    (start, cpu) = (time.perf_counter(), time.process_time())
+    parser.execute(plan)
+    (elapsed, cpu) = (time.perf_counter() - start, time.process_time() - cpu)
+    peak = 0
+    if traced:
+        (_, peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return (elapsed, cpu, peak)
+
+
+def bench(root: str, contracts: int, declarations: int, deployers: int, path: int):
+    # The fake binaries don't reach the network, the signers' nonces are still asked for
+    node = serve(Chain())
+    project = make_project(root, contracts, declarations, deployers, path, node.url)
+    os.chdir(root)
+    os.environ["PATH"] = project["bin"] + os.pathsep + os.environ["PATH"]
+    results = {}
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    plan = parser.compile_script(project["script"])
+    results["compile_s"] = time.perf_counter() - start
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results["compile_peak_kb"] = peak / 1024
+
+    parser.load_plan(project["script"])
+    start = time.perf_counter()
+    parser.load_plan(project["script"])
+    results["load_plan_s"] = time.perf_counter() - start
+
+    actions = _actions(plan)
+    recording = os.path.join(root, "recording.json")
+    replay.start_recording(recording)
+    (elapsed, cpu, _) = _execute(plan)
+    replay.stop().finish()
+    results["run_s"] = elapsed
+    results["overhead_ms"] = cpu / actions * 1000
+    results["spawn_ms"] = _spawn_ms()
+
+    replay.start_replay(recording)
+    (elapsed, _, _) = _execute(plan)
+    replay.stop().finish()
+    results["replay_s"] = elapsed
+
+    # Everything is cached or already sent now, so this is the cost of skipping
+    (_, _, peak) = _execute(plan, traced=True)
+    (_, cpu, _) = _execute(plan)
+    results["rerun_overhead_ms"] = cpu / actions * 1000
+    results["run_peak_kb"] = peak / 1024
+
+    start = time.perf_counter()
+    for deployer in parser.DEPLOYERS.values():
+        deployer.save()
+    results["cache_save_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for step in plan["steps"]:
+        if step["kind"] == "deployer":
+            parser.deployer_from_context(
+                step["context"], plan["contracts"], step["name"]
+            )
+    results["cache_load_ms"] = (time.perf_counter() - start) * 1000
+
+    results["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results["actions"] = actions
+    node.shutdown()
+    return results
+
+
+def _version() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except FileNotFoundError:
+        return ""
+
+
+def _print(name: str, results: dict, baseline: dict = None):
+    print(f"## {name} ({results['actions']} actions)")
+    for metric in METRICS:
+        line = f"  {metric:>18} {results[metric]:>12.3f}"
+        if baseline is not None and baseline.get(metric):
+            line += f"  {results[metric] / baseline[metric]:>6.2f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser()
+    cli.add_argument("--scale", nargs="*", choices=list(SCALES), default=None)
+    cli.add_argument("--contracts", type=int)
+    cli.add_argument("--declarations", type=int, default=10)
+    cli.add_argument("--deployers", type=int, default=1)
+    cli.add_argument("--path", type=int, default=100)
+    cli.add_argument("--json", help="write the results to this file")
+    cli.add_argument("--compare", help="results file of a previous run")
+    args = cli.parse_args()
+    # Every scale runs from its own project directory
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    if args.contracts is not None:
+        scales = {
+            "custom": {
+                "contracts": args.contracts,
+                "declarations": args.declarations,
+                "deployers": args.deployers,
+                "path": args.path,
+            }
+        }
+    else:
+        scales = {name: SCALES[name] for name in args.scale or ["small", "medium"]}
+
+    baselines = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baselines = {run["scale"]: run["results"] for run in json.load(f)["runs"]}
+
+    logger.remove()
+    runs = []
+    for (name, params) in scales.items():
+        results = bench(tempfile.mkdtemp(prefix=f"fd_bench_{name}_"), **params)
+        _print(name, results, baselines.get(name))
+        runs.append({"scale": name, "params": params, "results": results})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "version": _version(),
+                    "python": platform.python_version(),
+                    "created_at": time.time(),
+                    "runs": runs,
+                },
+                f,
+                indent=2,
+            )
@@ -0,0 +1,159 @@
+"""
+Synthetic projects for the benchmarks: a `.fd` script, its `out/` artifacts and fake
+`forge`/`cast` executables printing what the real ones do.
+
+Example:
+    project = make_project("/tmp/bench", contracts=100, declarations=50, deployers=4, path=500)
+    os.environ["PATH"] = project["bin"] + os.pathsep + os.environ["PATH"]
+"""
+import json, os, stat, sys
+
+# Extra seconds the fake binaries wait, to mimic a node (0 measures foundrydeploy alone)
+LATENCY_ENV = "FD_BENCH_LATENCY"
+
+_FAKE_BINARY = """#!{python}
+import os, sys, time
+
+time.sleep(float(os.environ.get("{latency_env}", "0")))
+tx_hash = "0x" + os.urandom(32).hex()
+if sys.argv[1] == "create":
+    print("Compiling...")
+    print("Deployer: 0x90f8bf6a479f320ead074411a4b0e7944ea8c9c1")
+    print("Deployed to: 0x" + os.urandom(20).hex())
+    print("Transaction hash: " + tx_hash)
+elif "--async" in sys.argv:
+    print(tx_hash)
+else:
+    print("blockHash               0x" + os.urandom(32).hex())
+    print("blockNumber             1")
+    print("gasUsed                 21000")
+    print("status                  1")
+    print("transactionHash         " + tx_hash)
+"""
+
+
+def artifact(index: int) -> dict:
+    return {
+        "abi": [
+            {
+                "type": "constructor",
+                "inputs": [
+                    {"name": "name", "type": "string"},
+                    {"name": "other", "type": "address"},
+                    {"name": "amount", "type": "uint256"},
+                ],
+            },
+            {
+                "type": "function",
+                "name": "setValue",
+                "inputs": [{"name": "value", "type": "uint256"}],
+                "outputs": [],
+            },
+            {
+                "type": "function",
+                "name": "setOther",
+                "inputs": [{"name": "other", "type": "address"}],
+                "outputs": [],
+            },
+            {
+                "type": "function",
+                "name": "setName",
+                "inputs": [{"name": "name", "type": "string"}],
+                "outputs": [],
+            },
+        ],
+        "bytecode": {"object": "0x6080604052" + f"{index:064x}"},
+    }
+
+
+def write_artifacts(root: str, contracts: int):
+    for index in range(contracts):
+        directory = f"{root}/out/Contract{index}.sol"
+        os.makedirs(directory, exist_ok=True)
+        with open(f"{directory}/Contract{index}.json", "w") as f:
+            json.dump(artifact(index), f)
+
+
+def install_fake_foundry(bin_dir: str) -> str:
+    """
+    Writes `forge` and `cast` to `bin_dir`, returns it.
+    """
+    os.makedirs(bin_dir, exist_ok=True)
+    source = _FAKE_BINARY.format(python=sys.executable, latency_env=LATENCY_ENV)
+    for name in ["forge", "cast"]:
+        path = f"{bin_dir}/{name}"
+        with open(path, "w") as f:
+            f.write(source)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return bin_dir
+
+
+def generate_script(
+    contracts: int, declarations: int, deployers: int, path: int, network: str = "fuji"
+) -> str:
+    """
+    Every deployer has its own signer, on `network`, and its share of the labels. Its `.use` path deploys
+    them (the first ones taking the last as argument), then sends to them until it holds
+    `path` actions. Repeated sends are numbered (see `Deployer._resolve_send`), so none is
+    skipped on the first run.
+    """
+    lines = [".declare"]
+    for index in range(declarations):
+        lines.append(f"    VALUE{index} {index + 1}ether")
+
+    lines.append(".contracts")
+    for index in range(contracts):
+        lines.append(f'    L{index} "src/Contract{index}.sol:Contract{index}"')
+
+    for deployer in range(deployers):
+        lines += [
+            f".signer s{deployer}",
+            f"    private {deployer + 1:064x}",
+            f".deployer d{deployer}",
+            f"    network {network}",
+            f"    signer s{deployer}",
+        ]
+
+    for deployer in range(deployers):
+        labels = [f"L{index}" for index in range(deployer, contracts, deployers)]
+        lines.append(f".use d{deployer}")
+
+        for (index, label) in enumerate(labels[:path]):
+            other = f"${labels[index - 1]}" if index > 0 else f"0x{1:040x}"
+            lines.append(f"    deploy {label} (Name{index}, {other}, 1ether)")
+
+        for step in range(path - min(path, len(labels))):
+            label = labels[step % len(labels)]
+            kind = step % 3
+            if kind == 0 and declarations > 0:
+                lines.append(f"    send {label} setValue(@VALUE{step % declarations})")
+            elif kind == 1:
+                lines.append(
+                    f"    send {label} setOther(${labels[step % len(labels) - 1]})"
+                )
+            else:
+                lines.append(f'    send {label} setName("name {step}")')
+    return "\n".join(lines) + "\n"
+
+
+def make_project(
+    root: str,
+    contracts: int,
+    declarations: int,
+    deployers: int,
+    path: int,
+    network: str = "fuji",
+) -> dict:
+    """
+    Writes a project to `root` (`deploy.fd`, `out/`, `bin/`) and returns its paths and script.
+    """
+    os.makedirs(root, exist_ok=True)
+    write_artifacts(root, contracts)
+    script = generate_script(contracts, declarations, deployers, path, network)
+    with open(f"{root}/deploy.fd", "w") as f:
+        f.write(script)
+    return {
+        "root": root,
+        "script": script,
+        "bin": install_fake_foundry(f"{root}/bin"),
+    }
@@ -0,0 +1,364 @@
+"""
+Local stand-in for an Ethereum JSON-RPC endpoint, for the benchmarks and the tests of the
+native backend.
+
+Several servers can serve the same `Chain`, like the endpoints of one network. Transactions
+are checked like a node would: their sender is recovered from the signature, a nonce already
+used is rejected and one ahead of the sender's is queued until the gap is filled. They are
+mined as soon as they can be, the ones calling a selector in `reverting` reverted, but their
+receipts only show up `block_time` seconds later: until then, another transaction with the
+same nonce is an underpriced replacement. `eth_call` simulates Multicall3's `aggregate3`,
+with the calls to a selector in `reverting` failing.
+
+Example:
+    chain = Chain()
+    fast, slow = serve(chain), serve(chain, latency=0.05)
+    # network http://127.0.0.1:<fast.server_port> http://127.0.0.1:<slow.server_port>
+"""
+import json, os, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from foundrydeploy import TEST_SIGNER
+from foundrydeploy.crypto import (
+    keccak256,
+    create_address,
+    rlp_encode,
+    _G,
+    _N,
+    _P,
+    _multiply,
+    _jacobian_add,
+)
+
+
+class NodeError(Exception):
+    """
+    Answered as a JSON-RPC error, eg. `nonce too low`.
+    """
+
+
+def rlp_decode(data: bytes, offset: int = 0) -> tuple:
+    """
+    Returns `(item, offset after it)`, items being bytes or lists of items.
+    """
+    prefix = data[offset]
+    if prefix < 0x80:
+        return (data[offset : offset + 1], offset + 1)
+    if prefix < 0xB8:
+        (start, length) = (offset + 1, prefix - 0x80)
+    elif prefix < 0xC0:
+        size = prefix - 0xB7
+        (start, length) = (
+            offset + 1 + size,
+            int.from_bytes(data[offset + 1 : offset + 1 + size], "big"),
+        )
+    else:
+        if prefix < 0xF8:
+            (start, length) = (offset + 1, prefix - 0xC0)
+        else:
+            size = prefix - 0xF7
+            (start, length) = (
+                offset + 1 + size,
+                int.from_bytes(data[offset + 1 : offset + 1 + size], "big"),
+            )
+        items = []
+        position = start
+        while position < start + length:
+            (item, position) = rlp_decode(data, position)
+            items.append(item)
+        return (items, start + length)
+    return (data[start : start + length], start + length)
+
+
+def _recover(msg_hash: bytes, recovery_id: int, r: int, s: int) -> str:
+    x = r + (_N if recovery_id & 2 else 0)
+    y = pow((x**3 + 7) % _P, (_P + 1) // 4, _P)
+    if (y & 1) != (recovery_id & 1):
+        y = _P - y
+
+    # Q = r^-1 (sR - eG)
+    (sr, eg) = (_multiply((x, y), s), _multiply(_G, int.from_bytes(msg_hash, "big")))
+    (qx, qy, qz) = _jacobian_add((sr[0], sr[1], 1), (eg[0], (_P - eg[1]) % _P, 1))
+    z = pow(qz, -1, _P)
+    public = _multiply(((qx * z**2) % _P, (qy * z**3) % _P), pow(r, -1, _N))
+    return (
+        "0x" + keccak256(b"".join([c.to_bytes(32, "big") for c in public]))[12:].hex()
+    )
+
+
+def decode_transaction(raw: bytes) -> dict:
+    """
+    The sender, nonce, target, data and fees of a signed legacy (EIP-155) or EIP-1559
+    transaction.
+    """
+    if raw[0] == 2:
+        (fields, _) = rlp_decode(raw, 1)
+        (nonce, to, data) = (fields[1], fields[5], fields[7])
+        fees = {"maxPriorityFeePerGas": fields[2], "maxFeePerGas": fields[3]}
+        msg_hash = keccak256(b"\x02" + rlp_encode(fields[:9]))
+        recovery_id = int.from_bytes(fields[9], "big")
+    else:
+        (fields, _) = rlp_decode(raw)
+        (nonce, to, data) = (fields[0], fields[3], fields[5])
+        fees = {"gasPrice": fields[1]}
+        v = int.from_bytes(fields[6], "big")
+        chain_id = (v - 35) // 2
+        msg_hash = keccak256(rlp_encode(fields[:6] + [chain_id, 0, 0]))
+        recovery_id = v - 35 - 2 * chain_id
+
+    (r, s) = [int.from_bytes(field, "big") for field in fields[-2:]]
+    return {
+        "sender": _recover(msg_hash, recovery_id, r, s),
+        "nonce": int.from_bytes(nonce, "big"),
+        "to": "0x" + to.hex() if to else None,
+        "data": data,
+        "fees": {name: int.from_bytes(fee, "big") for (name, fee) in fees.items()},
+    }
+
+
+def _word(data: bytes, offset: int) -> int:
+    return int.from_bytes(data[offset : offset + 32], "big")
+
+
+def _padded(data: bytes) -> bytes:
+    return data.ljust((len(data) + 31) // 32 * 32, b"\x00")
+
+
+def decode_aggregate3(data: bytes) -> list:
+    """
+    The `[(target, calldata), ...]` of `aggregate3((address,bool,bytes)[])` calldata.
+    """
+    body = data[4:]
+    array = _word(body, 0)
+    calls = []
+    for index in range(_word(body, array)):
+        start = array + 32 + _word(body, array + 32 + index * 32)
+        returned = start + _word(body, start + 64)
+        length = _word(body, returned)
+        calls.append(
+            (
+                "0x" + body[start + 12 : start + 32].hex(),
+                body[returned + 32 : returned + 32 + length],
+            )
+        )
+    return calls
+
+
+def encode_results(results: list) -> bytes:
+    """
+    The `(bool success, bytes returnData)[]` returned by `aggregate3`.
+    """
+    tuples = [
+        (1 if success else 0).to_bytes(32, "big")
+        + (64).to_bytes(32, "big")
+        + len(data).to_bytes(32, "big")
+        + _padded(data)
+        for (success, data) in results
+    ]
+    offsets = b""
+    position = len(tuples) * 32
+    for encoded in tuples:
+        offsets += position.to_bytes(32, "big")
+        position += len(encoded)
+    return (
+        (32).to_bytes(32, "big")
+        + len(tuples).to_bytes(32, "big")
+        + offsets
+        + b"".join(tuples)
+    )
+
+
+def error_string(reason: str) -> bytes:
+    """
+    Revert data of `revert(reason)`.
+    """
+    data = reason.encode()
+    return (
+        bytes.fromhex("08c379a0")
+        + (32).to_bytes(32, "big")
+        + len(data).to_bytes(32, "big")
+        + _padded(data)
+    )
+
+
+class Chain:
+    def __init__(
+        self,
+        chain_id: int = 31337,
+        sender: str = TEST_SIGNER.pub,
+        block_time: float = 0,
+    ):
+        self.chain_id = chain_id
+        self.block_time = block_time
+        # The signer of most transactions, for the callers predicting their addresses
+        self.sender = sender.lower()
+        self.nonces = {}
+        self.block = 1
+        self.receipts = {}
+        # When the receipts show up, by hash, and the hashes by (sender, nonce)
+        self.visible = {}
+        self.hashes = {}
+        # Signed transactions ahead of their sender's nonce, by (sender, nonce)
+        self.queued = {}
+        # Raw bytes of every transaction received, and the 4 byte selectors that revert
+        self.transactions = []
+        self.reverting = set()
+        self._lock = threading.Lock()
+
+    def sent(self, selector: bytes) -> int:
+        """
+        How many of the transactions received call `selector`.
+        """
+        return len([raw for raw in self.transactions if selector in raw])
+
+    def _mine(self, tx_hash: str, tx: dict):
+        reverts = any([selector in tx["data"] for selector in self.reverting])
+        self.receipts[tx_hash] = {
+            "status": "0x0" if reverts else "0x1",
+            "transactionHash": tx_hash,
+            "from": tx["sender"],
+            "contractAddress": (
+                create_address(tx["sender"], tx["nonce"]) if tx["to"] is None else None
+            ),
+            "gasUsed": hex(50000),
+            "blockNumber": hex(self.block),
+        }
+        self.visible[tx_hash] = time.monotonic() + self.block_time
+        self.hashes[(tx["sender"], tx["nonce"])] = tx_hash
+        self.nonces[tx["sender"]] = tx["nonce"] + 1
+        self.block += 1
+
+    def submit(self, raw: bytes) -> str:
+        tx_hash = "0x" + keccak256(raw).hex()
+        tx = decode_transaction(raw)
+        sender = tx["sender"]
+        with self._lock:
+            nonce = self.nonces.get(sender, 0)
+            if tx["nonce"] < nonce:
+                pending = self.hashes[(sender, tx["nonce"])]
+                if self.visible[pending] <= time.monotonic():
+                    raise NodeError(
+                        f"nonce too low: next nonce {nonce}, tx nonce {tx['nonce']}"
+                    )
+            else:
+                pending = self.queued.get((sender, tx["nonce"]), (None,))[0]
+            if pending == tx_hash:
+                raise NodeError("already known")
+            if pending is not None:
+                raise NodeError("replacement transaction underpriced")
+
+            self.transactions.append(raw)
+            self.queued[(sender, tx["nonce"])] = (tx_hash, tx)
+            while (sender, self.nonces.get(sender, 0)) in self.queued:
+                self._mine(*self.queued.pop((sender, self.nonces.get(sender, 0))))
+        return tx_hash
+
+    def call(self, data: bytes) -> bytes:
+        calls = decode_aggregate3(data)
+        return encode_results(
+            [
+                (False, error_string(f"0x{call[:4].hex()} reverts"))
+                if call[:4] in self.reverting
+                else (True, b"")
+                for (_, call) in calls
+            ]
+        )
+
+    def handle(self, method: str, params: list):
+        if method == "eth_chainId":
+            return hex(self.chain_id)
+        if method == "eth_blockNumber":
+            return hex(self.block)
+        if method == "eth_getTransactionCount":
+            return hex(self.nonces.get(params[0].lower(), 0))
+        if method in ("eth_estimateGas",):
+            return hex(100000)
+        if method in ("eth_gasPrice", "eth_maxPriorityFeePerGas"):
+            return hex(10**9)
+        if method == "eth_getBlockByNumber":
+            return {"number": hex(self.block), "baseFeePerGas": hex(7)}
+        if method == "eth_getCode":
+            return "0x6080"
+        if method == "eth_call":
+            return "0x" + self.call(bytes.fromhex(params[0]["data"][2:])).hex()
+        if method == "eth_getTransactionReceipt":
+            if self.visible.get(params[0], 0) > time.monotonic():
+                return None
+            return self.receipts.get(params[0])
+        if method == "eth_getTransactionByHash":
+            known = params[0] in self.receipts or params[0] in [
+                tx_hash for (tx_hash, _) in list(self.queued.values())
+            ]
+            return {"hash": params[0]} if known else None
+        if method == "eth_sendRawTransaction":
+            return self.submit(bytes.fromhex(params[0][2:]))
+        raise KeyError(method)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, don't wait for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def _answer(self, request: dict) -> dict:
+        try:
+            result = self.server.chain.handle(request["method"], request["params"])
+        except KeyError:
+            return {
+                "jsonrpc": "2.0",
+                "id": request["id"],
+                "error": {"code": -32601, "message": f"no {request['method']}"},
+            }
+        except NodeError as e:
+            return {
+                "jsonrpc": "2.0",
+                "id": request["id"],
+                "error": {"code": -32000, "message": str(e)},
+            }
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests += 1
+        if self.server.down:
+            self.close_connection = True
+            return
+
+        time.sleep(self.server.latency)
+        if isinstance(body, list):
+            answer = [self._answer(request) for request in body]
+        else:
+            answer = self._answer(body)
+            if body["method"] in self.server.lose:
+                # Handled, but the answer never makes it back
+                self.server.lose.remove(body["method"])
+                self.close_connection = True
+                return
+        data = json.dumps(answer).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(chain: Chain, latency: float = 0, port: int = 0) -> ThreadingHTTPServer:
+    """
+    Serves `chain` on a background thread. Set `down` on the returned server to make it drop
+    every request, `requests` counts them. The answer to the next request of every method in
+    `lose` is dropped after handling it.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    server.daemon_threads = True
+    server.chain = chain
+    server.latency = latency
+    server.down = False
+    server.requests = 0
+    server.lose = []
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -26,6 +26,8 @@
     legacy
     # debug
     # no_cache
+    # workers 4
+    # scoped
 
     network local
     # network fuji
@@ -50,10 +52,17 @@
     send LABEL2 functionName(99999)
 
 .use myDeployer2
+    # Deployed by myDeployer1, deployers share their addresses (unless `scoped`)
     send LABEL2 functionName (99999)
     send LABEL2 functionName(uint256) (99999)
     send LABEL2 @callme (@random_param)
 
+    # Sent again on every run, other sends only once
+    send LABEL2 functionName(99999) always
+
+    # Sent by the deployer's `signer` even with a pool of `signers` (eg. `onlyOwner`)
+    # send LABEL2 functionName(99999) pinned
+
     # seeded before
     send LABEL3 functionName(uint256) (@random_param)
     send LABEL3 @callme (@random_param)
@@ -10,6 +10,7 @@ class Network:
     AVAX_TEST: str = "--rpc-url https://api.avax-test.network/ext/bc/C/rpc"
 
     networks = {"ava": AVAX_MAIN, "fuji": AVAX_TEST, "local": LOCAL}
+    chain_ids = {AVAX_MAIN: 43114, AVAX_TEST: 43113}
 
 
 class Signer:
@@ -33,4 +34,6 @@ TEST_SIGNER = Signer(
     "4f3edf983ac636a65a842ce7c78d9aa706d3b113bce9c46f30d7d21715b23b1d",
 )
 
+from .backend import Backend, SubprocessBackend, RpcBackend
+from .store import CacheStore, PickleStore, SqliteStore, MemoryStore
 from .deployer import *
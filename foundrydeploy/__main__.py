@@ -1,14 +1,80 @@
-from .log import _error
-from .parser import parse
-import os, sys
+from .deployer import *
+from .log import _error, _info, add_event_sink
+from .parser import parse, load_plan
+from .estimate import plan_report
+from .trace import enable
+from .replay import start_recording, start_replay
+import argparse
 
-if len(sys.argv) == 1:
+cli = argparse.ArgumentParser(prog="foundrydeploy")
+cli.add_argument("script", nargs="?", help="deployment script (.fd)")
+cli.add_argument(
+    "--check",
+    action="store_true",
+    help="only validate the script, without deploying or sending anything",
+)
+cli.add_argument(
+    "--plan",
+    action="store_true",
+    help="show the actions a run would execute or skip and their estimated gas, without sending anything",
+)
+cli.add_argument(
+    "--trace",
+    metavar="TRACE_JSON",
+    help="time every phase of every action, write them as a Chrome trace (chrome://tracing, Perfetto) and print a summary",
+)
+cli.add_argument(
+    "--events",
+    metavar="EVENTS_JSONL",
+    help="append one JSON line per deploy, send, skip, cache and error event to this file (`-` for stdout)",
+)
+cli.add_argument(
+    "--record",
+    metavar="FIXTURE_JSON",
+    help="write the state every deployer starts from and the results of its deploys and sends to this file",
+)
+cli.add_argument(
+    "--replay",
+    metavar="FIXTURE_JSON",
+    help="run against a `--record` file instead of forge, cast and the network, and report where the run diverges from it",
+)
+args = cli.parse_args()
+
+if args.script is None:
     _error("requires a script file")
     exit(1)
 
-with open(sys.argv[1], "r") as f:
+tracer = enable() if args.trace else None
+if args.events:
+    add_event_sink(args.events)
+if args.record and args.replay:
+    _error("`--record` and `--replay` can't be used together")
+    exit(1)
+session = None
+if args.record:
+    session = start_recording(args.record)
+elif args.replay:
+    session = start_replay(args.replay)
+
+with open(args.script, "r") as f:
     try:
-        parse(f.read())
+        if args.check:
+            plan = load_plan(f.read())
+            steps = [step for step in plan["steps"] if step["kind"] == "use"]
+            actions = sum([len(step["path"]) for step in steps])
+            _info(f"`{args.script}` is valid: {len(steps)} paths, {actions} actions")
+        elif args.plan:
+            _info("\n" + plan_report(load_plan(f.read(), read_only=True)))
+        else:
+            parse(f.read())
+            if args.replay:
+                session.finish()
     except ValueError as e:
         _error(e)
         raise e
+    finally:
+        if args.record:
+            session.finish()
+        if tracer is not None:
+            tracer.export_chrome(args.trace)
+            _info(f"# Trace written to `{args.trace}`\n" + tracer.summary())
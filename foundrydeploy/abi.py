@@ -0,0 +1,408 @@
+from decimal import Decimal
+from functools import lru_cache
+from .crypto import keccak256
+
+# `gwei` before `wei`, which it ends with
+UNITS = {
+    "gwei": 9,
+    "ether": 18,
+    "wei": 0,
+}
+
+#####################
+# Helpers
+#####################
+
+
+def split_top_level(text: str, delim: str = ",") -> list:
+    """
+    Splits `text` on `delim`, ignoring the ones nested in brackets, parentheses or quotes.
+
+    Example:
+        "a,[b,c],(d,e)" -> ["a", "[b,c]", "(d,e)"]
+    """
+    parts = []
+    depth = 0
+    quoted = False
+    start = 0
+    for (index, ch) in enumerate(text):
+        if ch == '"':
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif ch in "[(":
+            depth += 1
+        elif ch in "])":
+            depth -= 1
+        elif ch == delim and depth == 0:
+            parts.append(text[start:index])
+            start = index + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts]
+
+
+def parse_signature(signature: str) -> tuple:
+    """
+    Example:
+        "transfer(address,uint256)" -> ("transfer", ["address", "uint256"])
+    """
+    signature = signature.strip().strip('"')
+    open_at = signature.index("(")
+    name = signature[:open_at]
+    inputs = signature[open_at + 1 : signature.rindex(")")]
+    if inputs.strip() == "":
+        return (name, [])
+    return (name, split_top_level(inputs))
+
+
+@lru_cache(maxsize=None)
+def _signature_types(signature: str) -> tuple:
+    (name, types) = parse_signature(signature)
+    return (name, tuple(types))
+
+
+@lru_cache(maxsize=None)
+def selector(signature: str) -> bytes:
+    return keccak256(signature.encode())[:4]
+
+
+def canonical_type(param: dict) -> str:
+    """
+    The type of an ABI input as written in signatures, with tuples (structs) spelled out.
+
+    Example:
+        {"type": "tuple[]", "components": [{"type": "address"}, {"type": "uint256"}]}
+        -> "(address,uint256)[]"
+    """
+    typ = param["type"]
+    if typ.startswith("tuple"):
+        components = [canonical_type(component) for component in param["components"]]
+        return "(" + ",".join(components) + ")" + typ[len("tuple") :]
+    return typ
+
+
+def parse_list(value: str) -> list:
+    value = value.strip()
+    if not (value.startswith("[") and value.endswith("]")):
+        raise ValueError(f"`{value}` is not a list")
+    if value[1:-1].strip() == "":
+        return []
+    return split_top_level(value[1:-1])
+
+
+def parse_tuple(value: str) -> list:
+    value = value.strip()
+    if not (value.startswith("(") and value.endswith(")")):
+        raise ValueError(f"`{value}` is not a tuple")
+    if value[1:-1].strip() == "":
+        return []
+    return split_top_level(value[1:-1])
+
+
+def nested_items(value: str) -> list:
+    """
+    The items of a `[..]` list or `(..)` tuple argument, None for any other argument.
+
+    Example:
+        "[$FLY,($POND,1)]" -> ["$FLY", "($POND,1)"]
+    """
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        return parse_list(value)
+    if value.startswith("(") and value.endswith(")"):
+        return parse_tuple(value)
+    return None
+
+
+def parse_amount(value: str) -> int:
+    """
+    Parses the amounts accepted by `cast`.
+
+    Example:
+        "11ether" -> 11000000000000000000, "1gwei" -> 1000000000, "0x10" -> 16
+    """
+    value = value.strip().replace("_", "")
+    if value.startswith("0x") or value.startswith("-0x"):
+        return int(value, 16)
+
+    for (unit, decimals) in UNITS.items():
+        if value.endswith(unit) and value[: -len(unit)].strip() != "":
+            amount = Decimal(value[: -len(unit)].strip()) * (10**decimals)
+            if amount != amount.to_integral_value():
+                raise ValueError(f"`{value}` is not a whole amount of wei")
+            return int(amount)
+
+    return int(value)
+
+
+def _hex_bytes(value: str) -> bytes:
+    value = value.strip().strip('"')
+    if value.startswith("0x"):
+        value = value[2:]
+    return bytes.fromhex(value)
+
+
+#####################
+# Encoding
+#####################
+
+
+def _array_type(typ: str) -> tuple:
+    """
+    Example:
+        "uint256[][3]" -> ("uint256[]", 3), "address[]" -> ("address", None)
+    """
+    open_at = typ.rindex("[")
+    size = typ[open_at + 1 : -1]
+    return (typ[:open_at], int(size) if size else None)
+
+
+def _tuple_types(typ: str) -> list:
+    """
+    Example:
+        "(address,(uint256,bool)[])" -> ["address", "(uint256,bool)[]"]
+    """
+    if typ[1:-1].strip() == "":
+        return []
+    return split_top_level(typ[1:-1])
+
+
+def is_dynamic(typ: str) -> bool:
+    if typ in ("bytes", "string"):
+        return True
+    if typ.endswith("]"):
+        base, size = _array_type(typ)
+        return size is None or is_dynamic(base)
+    if typ.startswith("("):
+        return any([is_dynamic(component) for component in _tuple_types(typ)])
+    return False
+
+
+def _encode_elementary(typ: str, value: str) -> bytes:
+    value = value.strip()
+
+    if typ == "address":
+        address = _hex_bytes(value)
+        if len(address) != 20:
+            raise ValueError(f"`{value}` is not an address")
+        return address.rjust(32, b"\x00")
+
+    if typ == "bool":
+        if value not in ("true", "false"):
+            raise ValueError(f"`{value}` is not a bool")
+        return (1 if value == "true" else 0).to_bytes(32, "big")
+
+    if typ.startswith("uint"):
+        number = parse_amount(value)
+        bits = int(typ[4:] or 256)
+        if number < 0 or number >= 2**bits:
+            raise ValueError(f"`{value}` does not fit in {typ}")
+        return number.to_bytes(32, "big")
+
+    if typ.startswith("int"):
+        number = parse_amount(value)
+        bits = int(typ[3:] or 256)
+        if number < -(2 ** (bits - 1)) or number >= 2 ** (bits - 1):
+            raise ValueError(f"`{value}` does not fit in {typ}")
+        return (number % 2**256).to_bytes(32, "big")
+
+    if typ == "string":
+        if value.startswith('"') and value.endswith('"'):
+            value = value[1:-1]
+        data = value.encode()
+        return len(data).to_bytes(32, "big") + data.ljust(
+            (len(data) + 31) // 32 * 32, b"\x00"
+        )
+
+    if typ == "bytes":
+        data = _hex_bytes(value)
+        return len(data).to_bytes(32, "big") + data.ljust(
+            (len(data) + 31) // 32 * 32, b"\x00"
+        )
+
+    if typ.startswith("bytes"):
+        data = _hex_bytes(value)
+        if len(data) > int(typ[5:]):
+            raise ValueError(f"`{value}` does not fit in {typ}")
+        return data.ljust(32, b"\x00")
+
+    raise ValueError(f"type `{typ}` is not supported")
+
+
+def encode_value(typ: str, value: str) -> bytes:
+    if typ.endswith("]"):
+        base, size = _array_type(typ)
+        items = parse_list(value)
+        if size is None:
+            return len(items).to_bytes(32, "big") + encode([base] * len(items), items)
+        if len(items) != size:
+            raise ValueError(f"`{value}` should have {size} elements for {typ}")
+        return encode([base] * size, items)
+
+    if typ.startswith("("):
+        return encode(_tuple_types(typ), parse_tuple(value))
+
+    return _encode_elementary(typ, value)
+
+
+def encode(types: list, values: list) -> bytes:
+    """
+    ABI encodes `values` (strings, as written in a script) for `types`.
+
+    Example:
+        encode(["address", "uint256[]"], ["0x1111111111111111111111111111111111111111", "[1, 2ether]"])
+        encode(["(address,uint256)[]"], ["[(0x1111111111111111111111111111111111111111, 1)]"])
+    """
+    return _encode(types, [is_dynamic(typ) for typ in types], values)
+
+
+def _encode(types: list, dynamic: list, values: list, memo: dict = None) -> bytes:
+    if len(types) != len(values):
+        raise ValueError(
+            f"expected {len(types)} arguments ({','.join(types)}), got {len(values)}"
+        )
+
+    encoded = []
+    for (typ, value) in zip(types, values):
+        if memo is None:
+            encoded.append(encode_value(typ, value))
+            continue
+        if (typ, value) not in memo:
+            memo[(typ, value)] = encode_value(typ, value)
+        encoded.append(memo[(typ, value)])
+    head_size = sum(32 if dyn else len(enc) for (dyn, enc) in zip(dynamic, encoded))
+
+    heads = b""
+    tails = b""
+    for (dyn, enc) in zip(dynamic, encoded):
+        if dyn:
+            heads += (head_size + len(tails)).to_bytes(32, "big")
+            tails += enc
+        else:
+            heads += enc
+    return heads + tails
+
+
+def encode_call(signature: str, args: list) -> bytes:
+    """
+    Example:
+        encode_call("transfer(address,uint256)", ["0x1111111111111111111111111111111111111111", "1ether"])
+    """
+    signature = signature.strip().strip('"')
+    (_, types) = _signature_types(signature)
+    return selector(signature) + encode(list(types), args)
+
+
+def encode_calls(calls: list) -> list:
+    """
+    Encodes `[(signature, args), ...]` grouped by signature: each group parses its types,
+    hashes its selector and lays out its head once, and encodes an argument value repeated
+    across the group (the same amount to many recipients) a single time. The results keep
+    the order of `calls`; a call that can't be encoded gets its ValueError in place of its
+    calldata.
+
+    Example:
+        encode_calls([("transfer(address,uint256)", [alice, "1ether"]), ("transfer(address,uint256)", [bob, "1ether"])])
+    """
+    groups = {}
+    for (index, (signature, _)) in enumerate(calls):
+        groups.setdefault(signature.strip().strip('"'), []).append(index)
+
+    encoded = [None] * len(calls)
+    for (signature, indexes) in groups.items():
+        try:
+            (_, types) = _signature_types(signature)
+            prefix = selector(signature)
+        except ValueError as e:
+            for index in indexes:
+                encoded[index] = e
+            continue
+
+        types = list(types)
+        dynamic = [is_dynamic(typ) for typ in types]
+        memo = {}
+        for index in indexes:
+            try:
+                encoded[index] = prefix + _encode(types, dynamic, calls[index][1], memo)
+            except ValueError as e:
+                encoded[index] = e
+    return encoded
+
+
+#####################
+# Overloads
+#####################
+
+
+def _fits(typ: str, value: str) -> bool:
+    try:
+        encode_value(typ, value)
+        return True
+    except (ValueError, ArithmeticError):
+        return False
+
+
+def _natural(typ: str, value: str) -> bool:
+    """
+    Whether `value` is written the way a `typ` usually is, eg. an address as 20 bytes of hex
+    and a string in quotes, although it could be encoded as others (a number, a string..).
+    """
+    value = value.strip()
+    is_address = value.startswith("0x") and len(value) == 42
+    if typ == "string":
+        return value.startswith('"')
+    if typ == "address":
+        return is_address
+    if typ.startswith(("uint", "int", "bytes")):
+        return not is_address
+    return True
+
+
+def select_overload(name: str, overloads: list, args: list) -> dict:
+    """
+    Picks the overload of `name` taking `args`: by argument count, then by the types the
+    arguments can be encoded as, preferring the one the arguments are written for (see
+    `_natural`). Several overloads still matching need the full signature.
+
+    Example:
+        overloads = [{"signature": "mint(address)", ..}, {"signature": "mint(address,uint256)", ..}]
+        select_overload("mint", overloads, ["0x11..", "1ether"]) -> {"signature": "mint(address,uint256)", ..}
+    """
+    candidates = [
+        overload for overload in overloads if len(overload["inputs"]) == len(args)
+    ]
+    if len(candidates) == 0:
+        counts = sorted(set([len(overload["inputs"]) for overload in overloads]))
+        raise ValueError(
+            f"`{name}` takes {' or '.join(map(str, counts))} arguments, got {len(args)}"
+        )
+    if len(candidates) == 1:
+        # Left to the encoder (or `cast`) to report arguments that don't fit
+        return candidates[0]
+
+    matching = [
+        overload
+        for overload in candidates
+        if all([_fits(typ, arg) for (typ, arg) in zip(overload["inputs"], args)])
+    ]
+    if len(matching) > 1:
+        scores = [
+            sum([_natural(typ, arg) for (typ, arg) in zip(overload["inputs"], args)])
+            for overload in matching
+        ]
+        matching = [
+            overload
+            for (overload, score) in zip(matching, scores)
+            if score == max(scores)
+        ]
+    if len(matching) == 1:
+        return matching[0]
+
+    signatures = ", ".join(
+        [overload["signature"] for overload in (matching or candidates)]
+    )
+    if len(matching) == 0:
+        raise ValueError(f"no overload of `{name}` takes these arguments: {signatures}")
+    raise ValueError(
+        f"`{name}` is overloaded and these arguments fit {signatures}, write the full signature"
+    )
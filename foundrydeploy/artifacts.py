@@ -0,0 +1,179 @@
+import json, os, threading, hashlib
+from concurrent.futures import ProcessPoolExecutor
+from .trace import span
+from .abi import canonical_type, selector
+
+
+def artifact_path(contract_path: str, out: str = "out") -> str:
+    """
+    Example:
+        "src/zones/Pond.sol:Pond" -> "out/Pond.sol/Pond.json"
+    """
+    contract_file_path, contract_name = contract_path.split(":")
+
+    for chunk in contract_file_path.split("/"):
+        if chunk.endswith(".sol"):
+            return f"{out}/{chunk}/{contract_name}.json"
+
+    raise ValueError(f"`{contract_path}` should be in the format `path/File.sol:Name`")
+
+
+def load_artifact(contract_path: str) -> dict:
+    with open(artifact_path(contract_path)) as f:
+        return json.load(f)
+
+
+def constructor_inputs(abi: list) -> list:
+    for obj in abi:
+        if obj["type"] == "constructor":
+            return [canonical_type(inp) for inp in obj["inputs"]]
+    return []
+
+
+def function_overloads(abi: list) -> dict:
+    """
+    Every overload of every function, with its selector.
+
+    Example:
+        {"transfer": [{"signature": "transfer(address,uint256)", "selector": "0xa9059cbb",
+                       "inputs": ["address", "uint256"]}], ...}
+    """
+    functions = {}
+    for obj in abi:
+        if obj["type"] == "function":
+            inputs = [canonical_type(inp) for inp in obj["inputs"]]
+            signature = "{}({})".format(obj["name"], ",".join(inputs))
+            functions.setdefault(obj["name"], []).append(
+                {
+                    "signature": signature,
+                    "selector": "0x" + selector(signature).hex(),
+                    "inputs": inputs,
+                }
+            )
+    return functions
+
+
+def _stat(path: str) -> list:
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def read_entry(path: str) -> dict:
+    """
+    Parses one artifact and keeps only what the deployers need from it.
+    """
+    stat = _stat(path)
+    with open(path) as f:
+        artifact = json.load(f)
+
+    bytecode = artifact.get("bytecode", {}).get("object", "")
+    return {
+        "stat": stat,
+        "functions": function_overloads(artifact["abi"]),
+        "constructor": constructor_inputs(artifact["abi"]),
+        "bytecode_hash": hashlib.sha256(bytecode.encode()).hexdigest(),
+    }
+
+
+class ArtifactIndex:
+    """
+    On-disk index of the ABI data of `out/` artifacts, keyed by artifact path and invalidated
+    by its mtime and size. Only new or changed artifacts are parsed again; many of them at
+    once (eg. a cold cache) are parsed with a process pool.
+    """
+
+    POOL_THRESHOLD = 16
+
+    def __init__(self, index_path: str, out: str = "out"):
+        self.index_path = index_path
+        self.out = out
+        self._entries = None
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    @property
+    def entries(self) -> dict:
+        # Read on first use, runs that never resolve a signature don't pay for it
+        if self._entries is None:
+            try:
+                with open(self.index_path) as f:
+                    self._entries = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _is_fresh(self, path: str) -> bool:
+        entry = self.entries.get(path)
+        try:
+            return (
+                entry is not None
+                # Entries written by older versions lack the newer fields
+                and "functions" in entry
+                and entry["stat"] == _stat(path)
+            )
+        except FileNotFoundError:
+            return False
+
+    def get(self, contract_path: str) -> dict:
+        return self.load_many([contract_path])[contract_path]
+
+    def load_many(self, contract_paths: list) -> dict:
+        """
+        Returns `{contract_path: entry}`, parsing the stale artifacts.
+        """
+        paths = {
+            contract_path: artifact_path(contract_path, self.out)
+            for contract_path in contract_paths
+        }
+        stale = sorted(
+            set([path for path in paths.values() if not self._is_fresh(path)])
+        )
+
+        entries = []
+        if len(stale) > 0:
+            with span("artifact load", artifacts=len(stale)):
+                if len(stale) >= ArtifactIndex.POOL_THRESHOLD:
+                    with ProcessPoolExecutor() as pool:
+                        entries = list(pool.map(read_entry, stale, chunksize=8))
+                else:
+                    entries = [read_entry(path) for path in stale]
+
+        with self._lock:
+            for (path, entry) in zip(stale, entries):
+                self.entries[path] = entry
+                self.dirty = True
+
+        return {
+            contract_path: self.entries[path] for (contract_path, path) in paths.items()
+        }
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+
+            directory = os.path.dirname(self.index_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Write and rename, so concurrent runs never read a half written index
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_index(cache_path: str = "cache", out: str = "out") -> ArtifactIndex:
+    """
+    Returns the index shared by every deployer using `cache_path`.
+    """
+    index_path = f"{cache_path}/artifacts.json"
+    with _INDEXES_LOCK:
+        if index_path not in _INDEXES:
+            _INDEXES[index_path] = ArtifactIndex(index_path, out)
+        return _INDEXES[index_path]
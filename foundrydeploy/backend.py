@@ -0,0 +1,420 @@
+import re, time
+from . import KeyKind
+from . import abi
+from .artifacts import load_artifact, constructor_inputs
+from .multicall import MULTICALL3, AGGREGATE3, encode_aggregate3, cast_argument
+from .crypto import (
+    CREATE2_FACTORY,
+    create2_address,
+    create_address,
+    is_private_key,
+    keccak256,
+    private_key_to_address,
+    sign_transaction,
+)
+from .rpc import RpcError, get_client
+from .pipeline import get_nonce_manager, is_nonce_error, check_addresses
+from .trace import span
+
+###########################
+# Backends
+###########################
+
+
+class Backend:
+    """
+    Executes the deploy/send actions of a Deployer.
+
+    Both calls receive already resolved arguments (`$LABEL`, `#PUB` and declarations replaced)
+    and return:
+        {"address": "0x..." or None, "transactions": ["0x..", ...]}
+
+    Sends and multicalls are made by `signer`, one of the deployer's pool (see
+    `signers.SignerPool`), or by the deployer's own signer if it's None.
+
+    An `offline` backend never reaches the network, so deployers using it don't either.
+    """
+
+    offline = False
+
+    def supports(self, signer) -> bool:
+        return True
+
+    def deploy(
+        self, deployer, contract_path: str, args: list, salt: bytes = None
+    ) -> dict:
+        """
+        With a `salt`, the contract is deployed with CREATE2 through `CREATE2_FACTORY`.
+        """
+        raise NotImplementedError
+
+    def send(
+        self, deployer, address: str, signature: str, args: list, signer=None
+    ) -> dict:
+        raise NotImplementedError
+
+    def multicall(self, deployer, calls: list, signer=None) -> dict:
+        """
+        Sends `[(address, calldata), ...]` as a single Multicall3 `aggregate3` transaction,
+        which reverts as a whole if any call reverts.
+        """
+        return self.send(
+            deployer, MULTICALL3, AGGREGATE3, [cast_argument(calls)], signer
+        )
+
+    def simulate(self, deployer, calls: list) -> bool:
+        """
+        Whether a batch of sends can go through Multicall3, see `Deployer._simulate_batch`.
+        """
+        return deployer._simulate_batch(calls)
+
+
+class SubprocessBackend(Backend):
+    """
+    Calls `$ forge create` and `$ cast send` through `Deployer.run()`.
+    """
+
+    def _quote(self, arg: str) -> str:
+        if abi.nested_items(arg) is not None:
+            return f'"{arg}"'
+        return arg
+
+    def _nonces(self, deployer, signer):
+        """
+        The `NonceManager` of `signer`, None if the node picks its nonces (see
+        `Deployer.local_nonces`): also for hardware wallets and keys only the shell expands
+        (`private $PK`), whose address isn't known here.
+        """
+        if not deployer.local_nonces() or signer.key_kind != KeyKind.PRIVATE:
+            return None
+        if not is_private_key(signer.key_argument):
+            return None
+        client = get_client(deployer.rpc_url)
+        return get_nonce_manager(client, private_key_to_address(signer.key_argument))
+
+    def _nonce(self, deployer, signer) -> str:
+        nonces = self._nonces(deployer, signer)
+        if nonces is None:
+            return ""
+        return f"--nonce {nonces.next()}"
+
+    def _run(self, deployer, cmd: str, signer) -> str:
+        """
+        Runs the transaction of `cmd`, only retried with its nonce unused (see
+        `Deployer.run`). Commands without a pinned nonce may have been sent whatever the
+        error, so they are never retried. Failed with a pinned nonce, the signer's nonces are
+        resynced: it may not have been used, and would be a gap for the next transactions.
+        """
+        nonces = self._nonces(deployer, signer)
+        pinned = re.search(r"--nonce (\d+)", cmd)
+        if nonces is None or pinned is None:
+            return deployer.run(cmd, sent=lambda: True)
+
+        try:
+            return deployer.run(cmd, sent=lambda: nonces.is_used(int(pinned.group(1))))
+        except ValueError:
+            nonces.resync()
+            raise
+
+    def _fees(self, deployer) -> str:
+        """
+        The chain id and the deployer's cached fees (see `fees.BlockContext`), so forge/cast
+        don't ask the node for them before every transaction.
+        """
+        if not deployer.fee_flags:
+            return ""
+        fees = deployer.fees.fees()
+        flags = f"--chain {deployer.chain_id()}"
+        if "gasPrice" in fees:
+            return f"{flags} --gas-price {fees['gasPrice']}"
+        return f"{flags} --gas-price {fees['maxFeePerGas']} --priority-gas-price {fees['maxPriorityFeePerGas']}"
+
+    def parse_output(self, output: str) -> dict:
+        with span("parse output"):
+            result = {"address": None, "transactions": []}
+            for line in output.splitlines():
+                if "Deployed to: " in line:
+                    result["address"] = line[-42:]
+
+                if "Transaction hash: " in line:
+                    result["transactions"].append(line[-66:])
+
+                if "transactionHash" in line:
+                    result["transactions"].append(line[-67:][:-1])
+
+                if line.startswith("gasUsed"):
+                    result["gas_used"] = int(line.split()[-1])
+            return result
+
+    def deploy(
+        self, deployer, contract_path: str, args: list, salt: bytes = None
+    ) -> dict:
+        if salt is not None:
+            raise ValueError("`create2` deploys need the `native` backend")
+
+        const = ""
+        for arg in args:
+            const += f"--constructor-args {self._quote(arg)} "
+
+        output = self._run(
+            deployer,
+            f"forge create {self._nonce(deployer, deployer.signer)} {self._fees(deployer)} {deployer.rpc_flag()} {deployer.is_legacy} {deployer.signer.get()} {contract_path} {const}",
+            deployer.signer,
+        )
+        return self.parse_output(output)
+
+    def send(
+        self, deployer, address: str, signature: str, args: list, signer=None
+    ) -> dict:
+        signer = signer if signer is not None else deployer.signer
+        _args = f' "{signature}" '
+        for arg in args:
+            _args += f" {self._quote(arg)} "
+
+        if deployer.receipts is None:
+            output = self._run(
+                deployer,
+                f"cast send {address} {self._nonce(deployer, signer)} {self._fees(deployer)} {deployer.rpc_flag()} {deployer.is_legacy} {signer.get()} {_args}",
+                signer,
+            )
+            return self.parse_output(output)
+
+        # Pipelined: cast only prints the hash and its receipt is collected later
+        output = self._run(
+            deployer,
+            f"cast send --async {self._nonce(deployer, signer)} {self._fees(deployer)} {address} {deployer.rpc_flag()} {deployer.is_legacy} {signer.get()} {_args}",
+            signer,
+        )
+        tx_hash = output.strip().splitlines()[-1].strip()
+        deployer.receipts.add(tx_hash, f"{address} {signature}")
+        return {"address": None, "transactions": [tx_hash]}
+
+
+class RpcBackend(Backend):
+    """
+    Signs private key transactions in-process and talks JSON-RPC to the deployer's endpoint,
+    reading deploy bytecode from the `out/` artifacts. No process is spawned per action.
+    """
+
+    def __init__(self, poll_interval: float = 0.1, receipt_timeout: float = 300):
+        self.poll_interval = poll_interval
+        self.receipt_timeout = receipt_timeout
+        self._senders = {}
+
+    def supports(self, signer) -> bool:
+        return signer.key_kind == KeyKind.PRIVATE and is_private_key(
+            signer.key_argument
+        )
+
+    def sender(self, signer) -> str:
+        key = signer.key_argument
+        if key not in self._senders:
+            self._senders[key] = private_key_to_address(key)
+        return self._senders[key]
+
+    def deploy(
+        self, deployer, contract_path: str, args: list, salt: bytes = None
+    ) -> dict:
+        """
+        The address is predicted before submission (from the nonce, or the salt and initcode
+        with CREATE2) and checked against the receipt. Pipelined deploys don't wait for it.
+        """
+        with span("artifact load"):
+            artifact = load_artifact(contract_path)
+        bytecode = artifact["bytecode"]["object"]
+        if "__$" in bytecode:
+            raise ValueError(
+                f"{contract_path} needs linked libraries, which the native backend does not support"
+            )
+
+        initcode = bytes.fromhex(bytecode[2:]) + abi.encode(
+            constructor_inputs(artifact["abi"]), args
+        )
+        wait = deployer.receipts is None
+        if salt is None:
+            return self.transact(
+                deployer, None, initcode, wait=wait, description=contract_path
+            )
+
+        address = create2_address(CREATE2_FACTORY, salt, initcode)
+        client = get_client(deployer.rpc_url)
+        if client.call("eth_getCode", [address, "latest"]) not in (None, "0x"):
+            # Same salt and initcode were deployed before, by any sender
+            return {"address": address, "transactions": []}
+
+        return self.transact(
+            deployer,
+            CREATE2_FACTORY,
+            salt + initcode,
+            wait=wait,
+            description=contract_path,
+            expected={"address": address, "create2": True},
+        )
+
+    def send(
+        self, deployer, address: str, signature: str, args: list, signer=None
+    ) -> dict:
+        return self.transact(
+            deployer,
+            address,
+            abi.encode_call(signature, args),
+            wait=(deployer.receipts is None),
+            description=f"{address} {signature}",
+            signer=signer,
+        )
+
+    def multicall(self, deployer, calls: list, signer=None) -> dict:
+        return self.transact(
+            deployer,
+            MULTICALL3,
+            encode_aggregate3(calls),
+            wait=(deployer.receipts is None),
+            description=f"{MULTICALL3} aggregate3 ({len(calls)} calls)",
+            signer=signer,
+        )
+
+    def transact(
+        self,
+        deployer,
+        to: str,
+        data: bytes,
+        wait: bool = True,
+        description: str = "",
+        expected: dict = None,
+        signer=None,
+    ) -> dict:
+        """
+        Without `wait`, the transaction is handed to `deployer.receipts` once submitted.
+        `expected` is the predicted address of a CREATE2 deploy, CREATE ones (`to` is None)
+        are predicted from the nonce.
+
+        Pipelined, concurrent (`workers > 1`) and `pin_nonces` deployers take nonces from a local
+        `NonceManager` (resynced and retried when the node rejects one). Pipelined ones
+        estimate against the pending block, which includes the transactions they haven't
+        collected yet.
+        """
+        client = get_client(deployer.rpc_url)
+        signer = signer if signer is not None else deployer.signer
+        sender = self.sender(signer)
+        pipelined = deployer.receipts is not None
+        local_nonces = deployer.local_nonces()
+
+        call = {"from": sender, "data": "0x" + data.hex()}
+        if to is not None:
+            call["to"] = to
+
+        with span("rpc submit"):
+            # Everything needed to build the transaction in a single round trip. The chain id
+            # and fees are cached by the deployer, fees are only asked for once they're stale
+            calls = []
+            if not local_nonces:
+                calls.append(("eth_getTransactionCount", [sender, "pending"]))
+            calls.append(
+                ("eth_estimateGas", [call, "pending"] if pipelined else [call])
+            )
+            fee_calls = deployer.fees.calls()
+
+            batch = client.batch(calls + fee_calls)
+            if len(fee_calls) > 0:
+                deployer.fees.update(batch[len(calls) :])
+            results = {}
+            for ((method, _), result) in zip(calls, batch):
+                if isinstance(result, RpcError):
+                    raise result
+                results[method] = result
+
+            tx = {
+                "chainId": deployer.chain_id(),
+                "nonce": int(results.get("eth_getTransactionCount", "0x0"), 16),
+                "gas": int(results["eth_estimateGas"], 16),
+                "to": to,
+                "value": 0,
+                "data": data,
+                **deployer.fees.fees(),
+            }
+
+            if not local_nonces:
+                raw = sign_transaction(tx, signer.key_argument)
+                tx_hash = self.submit(client, raw)
+            else:
+                nonces = get_nonce_manager(client, sender)
+                for attempt in range(3):
+                    tx["nonce"] = nonces.next()
+                    raw = sign_transaction(tx, signer.key_argument)
+                    try:
+                        tx_hash = self.submit(client, raw)
+                        break
+                    except RpcError as e:
+                        # Whatever the error, the nonce may now be a gap for the next transactions.
+                        # Another transaction took it: this one wasn't sent (see `submit`) and is
+                        # signed again with the next nonce
+                        nonces.resync()
+                        if not is_nonce_error(e) or attempt == 2:
+                            raise
+
+        if to is None:
+            expected = {
+                "address": create_address(sender, tx["nonce"]),
+                "create2": False,
+            }
+        address = expected["address"] if expected is not None else None
+
+        if not wait:
+            deployer.receipts.add(tx_hash, description, raw, expected)
+            return {"address": address, "transactions": [tx_hash]}
+
+        with span("receipt wait"):
+            receipt = self.wait_receipt(client, tx_hash)
+
+        if int(receipt["status"], 16) != 1:
+            raise ValueError(f"transaction {tx_hash} reverted")
+
+        if expected is not None:
+            check_addresses(client, [(description, receipt, expected)])
+
+        return {
+            "address": address,
+            "transactions": [tx_hash],
+            "gas_used": int(receipt["gasUsed"], 16),
+        }
+
+    def submit(self, client, raw: bytes) -> str:
+        """
+        Sends a signed transaction and returns its hash. A request retried after a timeout may
+        have reached the node the first time, which then already knows the transaction, or
+        even mined it: its nonce is used, by this very transaction.
+        """
+        tx_hash = "0x" + keccak256(raw).hex()
+        try:
+            return client.call("eth_sendRawTransaction", ["0x" + raw.hex()])
+        except RpcError as e:
+            message = str(e).lower()
+            if "already known" in message:
+                return tx_hash
+            if "nonce too low" in message:
+                if client.call("eth_getTransactionByHash", [tx_hash]) is not None:
+                    return tx_hash
+            raise
+
+    def wait_receipt(self, client, tx_hash: str) -> dict:
+        interval = self.poll_interval
+        deadline = time.monotonic() + self.receipt_timeout
+        while True:
+            receipt = client.call("eth_getTransactionReceipt", [tx_hash])
+            if receipt is not None:
+                return receipt
+            if time.monotonic() > deadline:
+                raise RpcError(f"timed out waiting for the receipt of {tx_hash}")
+            time.sleep(interval)
+            interval = min(interval * 2, 2)
+
+
+def default_backend(signer, native: bool = False) -> Backend:
+    """
+    The native backend only handles private keys, hardware wallets keep going through forge/cast.
+    """
+    if native:
+        backend = RpcBackend()
+        if backend.supports(signer):
+            return backend
+    return SubprocessBackend()
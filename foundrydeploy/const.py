@@ -1,3 +1,12 @@
+#####################
+# Plan
+#####################
+
+# Bump whenever the plan format or the grammar changes, so cached plans are compiled again
+PLAN_VERSION = 12
+# Cached plans kept in `cache/`, the least recently used ones are removed
+PLAN_CACHE_SIZE = 16
+
 #####################
 # Sections
 #####################
@@ -37,6 +46,23 @@ SECTION_DEPLOYER_SIGNER = "signer"
 SECTION_DEPLOYER_LEGACY = "legacy"
 SECTION_DEPLOYER_NO_CACHE = "no_cache"
 SECTION_DEPLOYER_DEBUG = "debug"
+SECTION_DEPLOYER_WORKERS = "workers"
+SECTION_DEPLOYER_NATIVE = "native"
+SECTION_DEPLOYER_BATCH = "batch"
+SECTION_DEPLOYER_BATCH_GAS = "batch_gas"
+SECTION_DEPLOYER_PIPELINE = "pipeline"
+SECTION_DEPLOYER_CREATE2 = "create2"
+SECTION_DEPLOYER_TIMEOUT = "timeout"
+SECTION_DEPLOYER_RETRIES = "retries"
+SECTION_DEPLOYER_PIN_NONCES = "pin_nonces"
+SECTION_DEPLOYER_RATE = "rate"
+SECTION_DEPLOYER_FEE_CACHE = "fee_cache"
+SECTION_DEPLOYER_FEE_BUMP = "fee_bump"
+SECTION_DEPLOYER_MAX_FEE = "max_fee"
+SECTION_DEPLOYER_SIGNER_POOL = "signers"
+SECTION_DEPLOYER_SIGNER_POLICY = "signer_policy"
+SECTION_DEPLOYER_SIGNER_POLICIES = ["round_robin", "least_pending"]
+SECTION_DEPLOYER_SCOPED = "scoped"
 SECTION_DEPLOYER_REQUIRED = [SECTION_DEPLOYER_SIGNER, SECTION_DEPLOYER_NETWORK]
 
 #####################
@@ -46,6 +72,12 @@ SECTION_PATH_DEPLOY = "deploy"
 SECTION_PATH_SEND = "send"
 SECTION_PATH_SKIP0 = "skip_start"
 SECTION_PATH_SKIP1 = "skip_end"
+# trailing marker of a send that runs on every run, eg. `send FLY sync() always`
+SECTION_PATH_ALWAYS = "always"
+# trailing marker of a send made by the deployer's `signer`, never by its pool of `signers`,
+# eg. `send FLY addZone($POND) pinned`
+SECTION_PATH_PINNED = "pinned"
+SECTION_PATH_SEND_MARKERS = [SECTION_PATH_ALWAYS, SECTION_PATH_PINNED]
 SECTION_PATH_ACTIONS = [
     SECTION_PATH_DEPLOY,
     SECTION_PATH_SEND,
@@ -0,0 +1,319 @@
+import hmac, hashlib, re
+
+#####################
+# Keccak-256
+#####################
+
+_ROUND_CONSTANTS = [
+    0x0000000000000001,
+    0x0000000000008082,
+    0x800000000000808A,
+    0x8000000080008000,
+    0x000000000000808B,
+    0x0000000080000001,
+    0x8000000080008081,
+    0x8000000000008009,
+    0x000000000000008A,
+    0x0000000000000088,
+    0x0000000080008009,
+    0x000000008000000A,
+    0x000000008000808B,
+    0x800000000000008B,
+    0x8000000000008089,
+    0x8000000000008003,
+    0x8000000000008002,
+    0x8000000000000080,
+    0x000000000000800A,
+    0x800000008000000A,
+    0x8000000080008081,
+    0x8000000000008080,
+    0x0000000080000001,
+    0x8000000080008008,
+]
+
+# _ROTATIONS[x][y]
+_ROTATIONS = [
+    [0, 36, 3, 41, 18],
+    [1, 44, 10, 45, 2],
+    [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56],
+    [27, 20, 39, 8, 14],
+]
+
+_MASK = (1 << 64) - 1
+_RATE = 136
+
+
+def _rol(value: int, shift: int) -> int:
+    return ((value << shift) | (value >> (64 - shift))) & _MASK
+
+
+def _keccak_f(state: list) -> list:
+    for rc in _ROUND_CONSTANTS:
+        c = [
+            state[x] ^ state[x + 5] ^ state[x + 10] ^ state[x + 15] ^ state[x + 20]
+            for x in range(5)
+        ]
+        d = [c[(x - 1) % 5] ^ _rol(c[(x + 1) % 5], 1) for x in range(5)]
+        state = [state[i] ^ d[i % 5] for i in range(25)]
+
+        b = [0] * 25
+        for x in range(5):
+            for y in range(5):
+                b[y + 5 * ((2 * x + 3 * y) % 5)] = _rol(
+                    state[x + 5 * y], _ROTATIONS[x][y]
+                )
+
+        state = [
+            b[i] ^ ((~b[(i + 1) % 5 + 5 * (i // 5)]) & b[(i + 2) % 5 + 5 * (i // 5)])
+            for i in range(25)
+        ]
+        state[0] ^= rc
+    return state
+
+
+def keccak256(data: bytes) -> bytes:
+    """
+    Ethereum's keccak256 (original keccak padding, not the NIST sha3_256 one)
+    """
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(b"\x00" * (-len(padded) % _RATE))
+    padded[-1] |= 0x80
+
+    state = [0] * 25
+    for offset in range(0, len(padded), _RATE):
+        block = padded[offset : offset + _RATE]
+        for i in range(_RATE // 8):
+            state[i] ^= int.from_bytes(block[i * 8 : i * 8 + 8], "little")
+        state = _keccak_f(state)
+
+    return b"".join(lane.to_bytes(8, "little") for lane in state[:4])
+
+
+#####################
+# RLP
+#####################
+
+
+def _length_prefix(length: int, offset: int) -> bytes:
+    if length < 56:
+        return bytes([offset + length])
+    encoded = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes([offset + 55 + len(encoded)]) + encoded
+
+
+def int_to_bytes(value: int) -> bytes:
+    return value.to_bytes((value.bit_length() + 7) // 8, "big")
+
+
+def rlp_encode(item) -> bytes:
+    """
+    Encodes ints, bytes and (nested) lists of them.
+    """
+    if isinstance(item, int):
+        item = int_to_bytes(item)
+
+    if isinstance(item, (bytes, bytearray)):
+        if len(item) == 1 and item[0] < 0x80:
+            return bytes(item)
+        return _length_prefix(len(item), 0x80) + bytes(item)
+
+    payload = b"".join(rlp_encode(sub) for sub in item)
+    return _length_prefix(len(payload), 0xC0) + payload
+
+
+#####################
+# secp256k1
+#####################
+
+_P = 2**256 - 2**32 - 977
+_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+_G = (
+    0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+    0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8,
+)
+
+
+def _jacobian_double(p: tuple) -> tuple:
+    x, y, z = p
+    if y == 0:
+        return (0, 0, 0)
+    ysq = (y * y) % _P
+    s = (4 * x * ysq) % _P
+    m = (3 * x * x) % _P
+    nx = (m * m - 2 * s) % _P
+    ny = (m * (s - nx) - 8 * ysq * ysq) % _P
+    nz = (2 * y * z) % _P
+    return (nx, ny, nz)
+
+
+def _jacobian_add(p: tuple, q: tuple) -> tuple:
+    if p[1] == 0:
+        return q
+    if q[1] == 0:
+        return p
+    u1 = (p[0] * q[2] ** 2) % _P
+    u2 = (q[0] * p[2] ** 2) % _P
+    s1 = (p[1] * q[2] ** 3) % _P
+    s2 = (q[1] * p[2] ** 3) % _P
+    if u1 == u2:
+        if s1 != s2:
+            return (0, 0, 1)
+        return _jacobian_double(p)
+    h = u2 - u1
+    r = s2 - s1
+    h2 = (h * h) % _P
+    h3 = (h * h2) % _P
+    u1h2 = (u1 * h2) % _P
+    nx = (r * r - h3 - 2 * u1h2) % _P
+    ny = (r * (u1h2 - nx) - s1 * h3) % _P
+    nz = (h * p[2] * q[2]) % _P
+    return (nx, ny, nz)
+
+
+def _multiply(point: tuple, scalar: int) -> tuple:
+    result = (0, 0, 1)
+    addend = (point[0], point[1], 1)
+    while scalar:
+        if scalar & 1:
+            result = _jacobian_add(result, addend)
+        addend = _jacobian_double(addend)
+        scalar >>= 1
+
+    z = pow(result[2], -1, _P)
+    return ((result[0] * z**2) % _P, (result[1] * z**3) % _P)
+
+
+def _private_key_int(private_key: str) -> int:
+    if private_key.startswith("0x"):
+        private_key = private_key[2:]
+    return int(private_key, 16)
+
+
+def is_private_key(key: str) -> bool:
+    """
+    Whether a signer's key is a literal hex private key, and not eg. an `$ENV_VAR` only the
+    shell running forge/cast expands.
+    """
+    return re.fullmatch(r"(0x)?[0-9a-fA-F]{64}", key) is not None
+
+
+def private_key_to_address(private_key: str) -> str:
+    x, y = _multiply(_G, _private_key_int(private_key))
+    public = x.to_bytes(32, "big") + y.to_bytes(32, "big")
+    return "0x" + keccak256(public)[12:].hex()
+
+
+def _deterministic_k(secret: int, msg_hash: bytes) -> int:
+    """
+    RFC 6979 nonce generation
+    """
+    x = secret.to_bytes(32, "big")
+    h = (int.from_bytes(msg_hash, "big") % _N).to_bytes(32, "big")
+    v = b"\x01" * 32
+    k = b"\x00" * 32
+    k = hmac.new(k, v + b"\x00" + x + h, hashlib.sha256).digest()
+    v = hmac.new(k, v, hashlib.sha256).digest()
+    k = hmac.new(k, v + b"\x01" + x + h, hashlib.sha256).digest()
+    v = hmac.new(k, v, hashlib.sha256).digest()
+    while True:
+        v = hmac.new(k, v, hashlib.sha256).digest()
+        candidate = int.from_bytes(v, "big")
+        if 1 <= candidate < _N:
+            return candidate
+        k = hmac.new(k, v + b"\x00", hashlib.sha256).digest()
+        v = hmac.new(k, v, hashlib.sha256).digest()
+
+
+def sign_hash(msg_hash: bytes, private_key: str) -> tuple:
+    """
+    Returns `(recovery_id, r, s)` with a canonical (low) `s`.
+    """
+    secret = _private_key_int(private_key)
+    k = _deterministic_k(secret, msg_hash)
+    rx, ry = _multiply(_G, k)
+    r = rx % _N
+    s = (pow(k, -1, _N) * (int.from_bytes(msg_hash, "big") + r * secret)) % _N
+    recovery_id = (ry & 1) | (2 if rx >= _N else 0)
+    if s > _N // 2:
+        s = _N - s
+        recovery_id ^= 1
+    return (recovery_id, r, s)
+
+
+#####################
+# Transactions
+#####################
+
+
+def _to_bytes(address: str) -> bytes:
+    if not address:
+        return b""
+    return bytes.fromhex(address[2:] if address.startswith("0x") else address)
+
+
+def sign_transaction(tx: dict, private_key: str) -> bytes:
+    """
+    Signs a legacy (EIP-155) transaction when `gasPrice` is present, otherwise an EIP-1559 one.
+
+    Example:
+        tx = {
+            "chainId": 43113, "nonce": 0, "gas": 21000, "to": "0x..", "value": 0, "data": b"",
+            "gasPrice": 25 * 10**9,
+            # or
+            "maxPriorityFeePerGas": 10**9, "maxFeePerGas": 50 * 10**9,
+        }
+    """
+    to = _to_bytes(tx.get("to"))
+    value = tx.get("value", 0)
+    data = tx.get("data", b"")
+
+    if "gasPrice" in tx:
+        fields = [tx["nonce"], tx["gasPrice"], tx["gas"], to, value, data]
+        recovery_id, r, s = sign_hash(
+            keccak256(rlp_encode(fields + [tx["chainId"], 0, 0])), private_key
+        )
+        return rlp_encode(fields + [recovery_id + tx["chainId"] * 2 + 35, r, s])
+
+    fields = [
+        tx["chainId"],
+        tx["nonce"],
+        tx["maxPriorityFeePerGas"],
+        tx["maxFeePerGas"],
+        tx["gas"],
+        to,
+        value,
+        data,
+        [],
+    ]
+    recovery_id, r, s = sign_hash(keccak256(b"\x02" + rlp_encode(fields)), private_key)
+    return b"\x02" + rlp_encode(fields + [recovery_id, r, s])
+
+
+#####################
+# Contract addresses
+#####################
+
+# Deterministic deployment proxy, at the same address on most chains. Its calldata is
+# `salt ++ initcode`, see https://github.com/Arachnid/deterministic-deployment-proxy
+CREATE2_FACTORY = "0x4e59b44847b379578588920cA78FbF26c0B4956C"
+
+
+def create_address(sender: str, nonce: int) -> str:
+    """
+    Address of the contract deployed by `sender`'s transaction with `nonce`.
+    """
+    return "0x" + keccak256(rlp_encode([_to_bytes(sender), nonce]))[12:].hex()
+
+
+def create2_address(factory: str, salt: bytes, initcode: bytes) -> str:
+    """
+    Address of the contract deployed by `factory` with CREATE2, `salt` and `initcode`.
+    """
+    return (
+        "0x"
+        + keccak256(b"\xff" + _to_bytes(factory) + salt + keccak256(initcode))[
+            12:
+        ].hex()
+    )
@@ -1,7 +1,23 @@
-import pickle, json, subprocess, hashlib
+import pickle, json, os, signal, subprocess, hashlib, threading, time
+from collections import Counter
+from contextlib import contextmanager
 from loguru import logger
-from . import Signer
-from .log import _info, _debug, _error
+from . import Signer, Network, KeyKind
+from .log import _info, _debug, _error, _event
+from .scheduler import run_graph, qualified
+from .backend import default_backend
+from .artifacts import get_index
+from .journal import Journal
+from .store import get_store
+from .rpc import RpcError, get_client
+from .pipeline import ReceiptCollector
+from .crypto import keccak256, is_private_key
+from .abi import encode_calls, nested_items, select_overload
+from .multicall import MULTICALL3, encode_aggregate3, decode_aggregate3, revert_reason
+from .trace import span
+from .retry import is_transient, backoff, get_limiter, limit_rate
+from .fees import BlockContext, FeePolicy
+from .signers import SignerPool, ROUND_ROBIN
 
 
 class Deployer:
@@ -10,6 +26,39 @@ class Deployer:
     SEND = 1
     SKIP_START = 2
     SKIP_END = 3
+    BATCH = 4
+    SEND_ALWAYS = 5
+    SEND_PINNED = 6
+    SEND_ALWAYS_PINNED = 7
+
+    SENDS = (SEND, SEND_ALWAYS, SEND_PINNED, SEND_ALWAYS_PINNED)
+    # Made on every run, see `send`
+    ALWAYS = (SEND_ALWAYS, SEND_ALWAYS_PINNED)
+    # Made by the deployer's own signer, see `_send_signer`
+    PINNED = (SEND_PINNED, SEND_ALWAYS_PINNED)
+
+    # Names of the actions in traces
+    NAMES = {
+        DEPLOY: "deploy",
+        **{action: "send" for action in SENDS},
+        BATCH: "batch",
+    }
+
+    # Attributes that only make sense for the running process and are never cached
+    TRANSIENT = [
+        "_lock",
+        "_occurrences",
+        "_unconfirmed",
+        "artifacts",
+        "fees",
+        "journal",
+        "peers",
+        "predicted",
+        "receipts",
+        "resumed_sends",
+        "signers",
+        "store",
+    ]
 
     def __init__(
         self,
@@ -21,6 +70,26 @@ class Deployer:
         cache_path="cache",
         no_cache=False,
         name="",
+        workers=1,
+        backend=None,
+        store=None,
+        addresses=None,
+        scoped=False,
+        peers=None,
+        batch=0,
+        batch_gas=0,
+        pipeline=False,
+        create2=None,
+        timeout=0,
+        retries=3,
+        pin_nonces=False,
+        rate=0,
+        fee_cache=False,
+        fee_bump=0,
+        max_fee=None,
+        signers=None,
+        signer_policy=ROUND_ROBIN,
+        read_only=False,
     ):
         _info("#####")
         self.name = name
@@ -30,30 +99,117 @@ class Deployer:
         _info(f"# RPC: `{rpc}`")
 
         self.rpc = rpc
+        self.rpc_url = rpc.replace("--rpc-url", "").strip()
+        # Several URLs make a pool, see `pool.PoolClient`
+        self.endpoints = self.rpc_url.split()
         self.contracts = {}
-        self.addresses = {}
+        # Labels given an address in `.contracts`, never deployed by this deployer
+        self.fixed = set()
+        # Pass the same dict to several deployers to share their addresses
+        self.addresses = addresses if addresses is not None else {}
+        # Keeps its own addresses, the other deployers reference them as `$LABEL@name`
+        self.scoped = scoped
+        # Deployers by name, whose labels are referenced as `$LABEL@name`
+        self.peers = peers if peers is not None else {}
+        # Addresses of pipelined deploys not mined yet, see `address`
+        self.predicted = {}
         self.contract_signatures = {}
+        self.artifacts_loaded = 0
         self.transactions = []
+        self.saved_transactions = 0
+        self.deployments = {}
+        # Fingerprint -> how many times that send was made, see `_resolve_send`
+        self.sent = Counter()
+        self._occurrences = Counter()
+        # Pipelined actions waiting for their receipts, by transaction hash (see `_complete`)
+        self._unconfirmed = {}
+        self._lock = threading.Lock()
         self.context = {}
+        self._chain_id = None
 
-        # Load from cache if it exists
         self.cache_path = (
             cache_path
             + "/deploy_"
             + hashlib.sha256((name + rpc).encode()).hexdigest()[:8]
         )
+        self.backend = backend if backend is not None else default_backend(signer)
+        if not all([self.backend.supports(s) for s in [signer] + (signers or [])]):
+            _info(
+                f"# {type(self.backend).__name__} does not support this signer, using forge/cast"
+            )
+            self.backend = default_backend(signer)
+        # Read only deployers (see `estimate.resolve_plan`) only read their cache and journal
+        self.read_only = read_only
+        self.store = store if store is not None else get_store(cache_path, read_only)
+        # Offline backends (see `replay.Replayer`) keep no journal
+        self.journal = Journal(
+            None if self.backend.offline else self.cache_path + ".journal"
+        )
+        self.resumed_sends = Counter()
+        # Load from cache if it exists
         if not no_cache:
-            self.load_from_cache(self.cache_path)
+            with span("cache load", deployer=name):
+                self.load_from_cache(self.cache_path)
+                self.replay_journal()
+        elif not read_only:
+            self.journal.compact()
 
         # Add/Replace cached values
+        self.artifacts = get_index(cache_path)
         self.add_contracts(contracts)
         self.signer = signer
+        # Signers sharing the sends that don't need `signer` (see `_send_signer`), None sends with it
+        self.signers = SignerPool(signers, signer_policy) if signers else None
         self.debug = debug
+        self.workers = workers
+        if workers > 1 and not all(
+            [
+                signer.key_kind == KeyKind.PRIVATE
+                and is_private_key(signer.key_argument)
+                for signer in [signer] + (signers or [])
+            ]
+        ):
+            # Concurrent steps would all be given the node's pending nonce, see `local_nonces`
+            _info(
+                "# `workers` needs literal private keys to hand out their nonces, running steps one at a time"
+            )
+            self.workers = 1
+        self.batch = batch
+        self.batch_gas = batch_gas
+        # Pipelined sends are submitted without waiting, their receipts are collected at the end
+        self.receipts = (
+            ReceiptCollector(get_client(self.rpc_url))
+            if pipeline and not self.backend.offline
+            else None
+        )
+        # Salt prefix of CREATE2 deploys, None deploys with CREATE
+        self.create2 = create2
+        # Seconds before a forge/cast command (or an RPC request) is given up, 0 waits forever
+        self.timeout = timeout
+        self.retries = retries
+        # Private key nonces handed out locally even without workers or pipeline, so that
+        # failed forge/cast transaction commands can be retried (see `local_nonces`)
+        self.pin_nonces = pin_nonces
+        # Requests per second to the endpoint, shared with every deployer using it (0 is unlimited)
+        if not self.backend.offline:
+            for endpoint in self.endpoints:
+                limit_rate(endpoint, rate)
+            client = get_client(self.rpc_url)
+            client.retries = retries
+            if timeout > 0:
+                client.timeout = timeout
 
         self.is_legacy = ""
         if is_legacy:
             self.is_legacy = "--legacy"
 
+        # Fee data asked for once per block and shared by every action
+        self.fees = BlockContext(
+            self.rpc_url, is_legacy, FeePolicy(bump=fee_bump, max_fee=max_fee)
+        )
+        # forge/cast are given the cached fees and chain id instead of asking the node for them
+        self.fee_flags = fee_cache or fee_bump > 0 or max_fee is not None
+
         _info("#####\n")
 
     ###########################
@@ -74,16 +230,91 @@ class Deployer:
             _info(self.contracts)
             _info(self.contract_signatures)
 
+        if self.debug:
+            _debug(f"# Artifacts loaded: {self.artifacts_loaded}")
+            _debug(f"# Fee data fetched: {self.fees.fetches}")
+            if self.signers is not None:
+                _debug(f"# Sends per pooled signer: {self.signers.sends}")
+
+        _event(
+            "summary",
+            deployer=self.name,
+            transactions=list(self.transactions),
+            addresses=dict(self.addresses),
+        )
+
+    def rpc_flag(self) -> str:
+        """
+        The `--rpc-url` of the next forge/cast command: the fastest healthy endpoint of a pool.
+        """
+        if len(self.endpoints) == 1:
+            return self.rpc
+        return f"--rpc-url {get_client(self.rpc_url).best()}"
+
+    def owned(self) -> list:
+        """
+        The labels this deployer deployed or was given an address for in `.contracts`, the
+        only ones its cache keeps.
+        """
+        labels = list(self.deployments) + sorted(self.fixed)
+        return [label for label in dict.fromkeys(labels) if label in self.addresses]
+
+    def local_nonces(self) -> bool:
+        """
+        Whether the private key signers' nonces are handed out by a local `NonceManager`
+        instead of the node's pending count, which doesn't include the transactions submitted
+        right before: by pipelined sends and by the concurrent steps of `workers > 1`. With
+        `pin_nonces`, retried forge/cast commands keep the nonce of the attempt that may have
+        been sent. The manager is shared by the whole process, so no other process should
+        send from the same keys meanwhile.
+        """
+        return self.receipts is not None or self.workers > 1 or self.pin_nonces
+
+    def _owner(self, contract_label: str) -> tuple:
+        (contract_label, _, name) = contract_label.partition("@")
+        if name in ("", self.name):
+            return (self, contract_label)
+        if name not in self.peers:
+            raise ValueError(f"`${contract_label}@{name}`: no deployer `{name}`")
+        return (self.peers[name], contract_label)
+
+    def qualified(self, contract_label: str) -> str:
+        """
+        The key of a label in the `.use` graph and the plan, see `scheduler.qualified`.
+        """
+        scoped = [name for (name, peer) in self.peers.items() if peer.scoped]
+        if self.scoped:
+            scoped.append(self.name)
+        return qualified(contract_label, self.name, scoped)
+
+    def has_address(self, contract_label: str) -> bool:
+        (owner, contract_label) = self._owner(contract_label)
+        return contract_label in owner.predicted or contract_label in owner.addresses
+
+    def address(self, contract_label: str) -> str:
+        """
+        The address of a label, or of another deployer's one with `LABEL@deployer`. A
+        pipelined deploy's predicted address is only used by the rest of the run, it's
+        recorded in `addresses` once its receipt confirms it.
+        """
+        (owner, contract_label) = self._owner(contract_label)
+        if owner is not self:
+            return owner.address(contract_label)
+        if contract_label in self.predicted:
+            return self.predicted[contract_label]
+        return self.addresses[contract_label]
+
     def _handle_arg(self, arg: str) -> str:
-        if arg.startswith("[") and arg.endswith("]"):
-            args = []
-            for _arg in arg[1:-1].split(","):
-                args.append(self._handle_arg(_arg))
-            arg = "[" + ",".join(args) + "]"
+        items = nested_items(arg)
+        if items is not None:
+            # `[..]` lists and `(..)` tuples, nested in any way
+            arg = (
+                arg[0] + ",".join([self._handle_arg(item) for item in items]) + arg[-1]
+            )
 
         elif arg.startswith("$"):
             contract_label = arg[1:]
-            arg = f"{self.addresses[contract_label]}"
+            arg = f"{self.address(contract_label)}"
 
         elif arg.startswith("#PUB"):
             arg = f"{self.signer.public_key()}"
@@ -94,25 +325,92 @@ class Deployer:
     # Cache
     ###########################
 
+    def chain_id(self) -> int:
+        if self._chain_id is None:
+            if self.rpc in Network.chain_ids:
+                self._chain_id = Network.chain_ids[self.rpc]
+            else:
+                self._chain_id = int(get_client(self.rpc_url).call("eth_chainId"), 16)
+        return self._chain_id
+
     def load_from_cache(self, cache_path):
-        try:
-            deployer = Deployer.load(cache_path)
-            _info(f"# Loading cache at `{cache_path}`")
-            self.contracts = deployer.contracts
-            self.addresses = deployer.addresses
-            self.contract_signatures = deployer.contract_signatures
+        found = self.store.load(self)
+        if found:
+            _info(f"# Loading cache at `{self.store.location(self)}`")
+        else:
+            _info(f"# Starting cache at `{self.store.location(self)}`")
+        _event(
+            "cache_load",
+            deployer=self.name,
+            location=self.store.location(self),
+            found=found,
+            addresses=len(self.addresses),
+            sends=len(self.sent),
+        )
 
-        except FileNotFoundError:
-            _info(f"# Starting cache at `{cache_path}`")
-            pass
+    def replay_journal(self):
+        """
+        Re-applies the actions completed by a run that was interrupted before saving its cache.
+        """
+        records = self.journal.replay()
+        if len(records) == 0:
+            return
+
+        _info(f"# Resuming {len(records)} actions from `{self.journal.path}`")
+        _event("resume", deployer=self.name, actions=len(records))
+        for record in records:
+            if record["kind"] == "deploy":
+                self.addresses[record["label"]] = record["address"]
+                self.deployments[record["label"]] = record["deployment"]
+            elif record["kind"] == "send":
+                self._replay_send(record)
+            elif record["kind"] == "batch":
+                for send in record["sends"]:
+                    self._replay_send(send)
+            self.transactions.extend(record["transactions"])
+
+    def _replay_send(self, record: dict):
+        if record.get("always") or "fingerprint" not in record:
+            self.resumed_sends[record["key"]] += 1
+        else:
+            self._mark_sent(record)
 
     def load(cache_path):
         with open(cache_path, "rb") as f:
             return pickle.load(f)
 
     def save(self):
-        with open(self.cache_path, "wb") as f:
-            pickle.dump(self, f)
+        """
+        Writes the cache and compacts the journal, whose records it now contains.
+        """
+        if self.read_only:
+            raise ValueError(f"deployer `{self.name}` is read only")
+        start = time.perf_counter()
+        with span("cache save", deployer=self.name):
+            self.artifacts.save()
+            with self._lock:
+                self.store.save(self)
+            self.journal.compact()
+        _event(
+            "cache_save",
+            deployer=self.name,
+            location=self.store.location(self),
+            duration=time.perf_counter() - start,
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for attribute in Deployer.TRANSIENT:
+            state.pop(attribute, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._occurrences = Counter()
+        self._unconfirmed = {}
+        self.peers = {}
+        self.predicted = {}
 
     ###########################
     # Contract loading
@@ -120,37 +418,24 @@ class Deployer:
 
     def load_contract_signatures(self, contract_label: str, contract_path: str):
         """
-        Reads ABI from out/ folder generated by foundry and loads out function names and signatures
+        Reads ABI from out/ folder generated by foundry and loads out function names and the
+        signatures and selectors of their overloads
         """
-        contract_file_path, contract_name = contract_path.split(":")
-
-        out = {}
-        for chunk in contract_file_path.split("/"):
-            if chunk.endswith(".sol"):
-                with open(f"out/" + chunk + "/" + contract_name + ".json") as f:
-                    out = json.load(f)
-                    break
-
-        abi = out["abi"]
-
-        signatures = {}
-        for obj in abi:
-            if obj["type"] == "function":
-
-                # Get inputs
-                inputs = []
-                for inp in obj["inputs"]:
-                    inputs.append(inp["type"])
-                inputs = ",".join(inputs)
+        entry = self.artifacts.get(contract_path)
+        self.contract_signatures[contract_path] = dict(entry["functions"])
+        self.artifacts_loaded += 1
 
-                # Get Name
-                func_name = obj["name"]
-                signature = "{}({})".format(func_name, inputs)
-
-                if contract_path not in self.contract_signatures:
-                    self.contract_signatures[contract_path] = {}
+    def signatures(self, contract_label: str) -> dict:
+        """
+        Function overloads of a labelled contract, loaded the first time they are needed.
 
-                self.contract_signatures[contract_path][func_name] = signature
+        Example:
+            {"mint": [{"signature": "mint(address)", "selector": "0x6a627842", "inputs": ["address"]}]}
+        """
+        contract_path = self.contracts[contract_label]
+        if contract_path not in self.contract_signatures:
+            self.load_contract_signatures(contract_label, contract_path)
+        return self.contract_signatures[contract_path]
 
     def add_contracts(self, contracts: [tuple]):
         """
@@ -159,36 +444,105 @@ class Deployer:
                 ("CONTRACT_1_LABEL", "src/Contract1.sol:ContractName1", "0x1111111111111111111111111111111111111111"),
                 ("CONTRACT_2_LABEL", "src/Contract2.sol:ContractName2")
             ]
+
+        ABIs are only read once `send` needs to resolve a function name (see `signatures`).
         """
         for contract in contracts:
             if contract[1] != "":
                 self.contracts[contract[0]] = contract[1]
-                self.load_contract_signatures(contract[0], contract[1])
 
             if len(contract) == 3:
                 self.addresses[contract[0]] = contract[2]
+                self.fixed.add(contract[0])
 
     ###########################
     # OS execution
     ###########################
 
-    def run(self, cmd: str):
-        proc = subprocess.Popen(
-            cmd, shell=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE
-        )
-        result = (proc.stdout.read()).decode()
-        err = (proc.stderr.read()).decode()
+    def _run_once(self, cmd: str) -> tuple:
+        """
+        Returns `(returncode, stdout, stderr)`, with a None returncode if the command was killed
+        after `timeout` seconds.
+        """
+        with span("subprocess", command=" ".join(cmd.split()[:2])):
+            # Its own process group, so a timeout kills forge/cast and not only the shell
+            proc = subprocess.Popen(
+                cmd,
+                shell=True,
+                stderr=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                start_new_session=True,
+            )
+            try:
+                # Reads both pipes at once, a full stderr can't block forge/cast
+                (result, err) = proc.communicate(timeout=self.timeout or None)
+            except subprocess.TimeoutExpired:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except (AttributeError, ProcessLookupError):
+                    proc.kill()
+                (result, err) = proc.communicate()
+                return (None, result.decode(), f"timed out after {self.timeout}s")
+
+        return (proc.returncode, result.decode(), err.decode())
+
+    def _command_endpoint(self, cmd: str) -> str:
+        for endpoint in self.endpoints:
+            if f"--rpc-url {endpoint} " in cmd:
+                return endpoint
+        return self.endpoints[0]
+
+    def run(self, cmd: str, sent=None):
+        """
+        Runs a forge/cast command, retrying it up to `retries` times (with exponential backoff)
+        when it failed on a throttled, unreachable or timed out endpoint.
 
-        proc.wait()
+        Such a failure may follow the broadcast of the command's transaction, `sent()` is
+        asked before every retry whether it did and the command isn't retried if so. A
+        command killed by the `timeout` isn't retried either.
+        """
+        attempt = 0
+        while True:
+            endpoint = self._command_endpoint(cmd)
+            get_limiter(endpoint).acquire()
+            (returncode, result, err) = self._run_once(cmd)
+            if returncode == 0 or returncode is None:
+                break
+            if attempt >= self.retries or not is_transient(err):
+                break
+
+            reason = (err.strip().splitlines() or [""])[-1]
+            if sent is not None and sent():
+                _info(f"Not retrying, the transaction was sent | {reason}")
+                break
+
+            delay = backoff(attempt)
+            if len(self.endpoints) > 1:
+                # Fails over to the next endpoint of the pool right away
+                get_client(self.rpc_url).mark_failed(endpoint, reason)
+                cmd = cmd.replace(f"--rpc-url {endpoint} ", f"{self.rpc_flag()} ")
+                if self._command_endpoint(cmd) != endpoint:
+                    delay = 0
+            _info(f"Retrying in {delay:.1f}s | {reason}")
+            _event(
+                "retry",
+                deployer=self.name,
+                command=cmd,
+                attempt=attempt + 1,
+                delay=delay,
+                message=err,
+            )
+            time.sleep(delay)
+            attempt += 1
 
-        if not proc.returncode == 0:
-            self.save()
-            proc.wait()
+        if not returncode == 0:
+            # Everything completed so far is already in the journal
 
             _error(f"command:\n{cmd}")
             _error(f"result:\n{err}\n\r")
+            _event("error", deployer=self.name, command=cmd, message=err)
             self.print_details()
-            exit(1)
+            raise ValueError(f"`{' '.join(cmd.split()[:2])}` failed: {err.strip()}")
         elif self.debug:
             _debug(f"command:\n{cmd}")
             _debug(f"result:\n{result}\n\r")
@@ -199,61 +553,177 @@ class Deployer:
     # Foundry Calls
     ###########################
 
-    def _store_transaction_details(self, contract_label: str, output: str):
-        # Store deployed address
-        address = ""
-        for line in output.splitlines():
-            if "Deployed to: " in line:
-                address = line[-42:]
-                self.addresses[contract_label] = address
+    def _complete(self, transactions: list, complete):
+        """
+        Calls `complete()`, which marks an action as done and journals it, once its
+        transactions are mined: right away, or for pipelined ones once `ReceiptCollector`
+        confirms every one of them (see `_confirmed`). An action whose transaction reverts is
+        never taken as done, so the next run makes it again.
+        """
+        waiting = [
+            tx_hash
+            for tx_hash in transactions
+            if self.receipts is not None and self.receipts.is_pending(tx_hash)
+        ]
+        if len(waiting) == 0:
+            complete()
+            return
+
+        entry = {"waiting": set(waiting), "complete": complete}
+        with self._lock:
+            for tx_hash in waiting:
+                self._unconfirmed[tx_hash] = entry
+
+    def _confirmed(self, tx_hash: str):
+        with self._lock:
+            entry = self._unconfirmed.pop(tx_hash, None)
+            if entry is None:
+                return
+            entry["waiting"].discard(tx_hash)
+            done = len(entry["waiting"]) == 0
+        if done:
+            entry["complete"]()
+
+    def _fingerprint(self, contract_path: str, args: list) -> str:
+        """
+        Identifies what a deploy creates: the artifact's bytecode and the resolved constructor
+        arguments (so including the current address of every `$LABEL` argument).
+        """
+        try:
+            bytecode_hash = self.artifacts.get(contract_path)["bytecode_hash"]
+        except FileNotFoundError:
+            # Not built yet, `forge create` compiles it
+            return None
+        return hashlib.sha256(json.dumps([bytecode_hash, args]).encode()).hexdigest()
 
-            if "Transaction hash: " in line:
-                tx = line[-66:]
-                self.transactions.append(tx)
+    def _is_stale(self, contract_label: str, args: list) -> bool:
+        """
+        Whether a cached deployment no longer matches its contract or constructor arguments.
+        """
+        deployment = self.deployments.get(contract_label)
+        if contract_label in self.fixed or deployment is None:
+            return False
 
-            if "transactionHash" in line:
-                tx = line[-67:][:-1]
-                self.transactions.append(tx)
+        try:
+            args = [self._handle_arg(arg) for arg in args]
+        except KeyError:
+            # An argument's label isn't deployed in this run, there's nothing to compare with
+            return False
+
+        fingerprint = self._fingerprint(self.contracts[contract_label], args)
+        if fingerprint is None:
+            return False
+        if deployment.get("fingerprint") is None:
+            # Cached before fingerprints were recorded, taken as up to date
+            deployment["fingerprint"] = fingerprint
+            return False
+        return deployment["fingerprint"] != fingerprint
 
     def deploy(self, contract_label: str, args: str) -> str:
         """
-        Calls `$ forge create`
+        Calls `$ forge create` (or the native backend)
+
+        A label with a cached address is skipped, unless the artifact's bytecode or the resolved
+        constructor arguments changed since it was deployed. Redeploying a label changes the
+        arguments of the deploys referencing it with `$LABEL`, so they follow.
         """
 
-        # Skips deployment if there's an address cached for this contract label
-        if contract_label in self.addresses:
+        # Skips deployment if there's an up to date address cached for this contract label
+        if self.has_address(contract_label):
+            if not self._is_stale(contract_label, args):
+                _info(
+                    f"Skipping ${contract_label} deployment. Has address: {self.address(contract_label)}"
+                )
+                _event(
+                    "skip",
+                    deployer=self.name,
+                    action="deploy",
+                    label=contract_label,
+                    reason="cached",
+                    address=self.address(contract_label),
+                )
+                return self.address(contract_label)
+
             _info(
-                f"Skipping ${contract_label} deployment. Has address: {self.addresses[contract_label]}"
+                f"Redeploying ${contract_label}. Its bytecode or constructor arguments changed since {self.address(contract_label)}"
             )
-            return self.addresses[contract_label]
 
         contract_path = self.contracts[contract_label]
-
-        # Stringify arguments
-        const = ""
-        for arg in args:
-            arg = self._handle_arg(arg)
-            if arg.startswith("[") and arg.endswith("]"):
-                arg = f'"{arg}"'
-            const += f"--constructor-args {arg} "
-
-        _info(f"{self.name} | Deploying | ${contract_label}...")
-
-        # Call `forge create`
-        result = self.run(
-            f"forge create {self.rpc} {self.is_legacy} {self.signer.get()} {contract_path} {const}"
+        with span("resolve"):
+            args = [self._handle_arg(arg) for arg in args]
+
+        _info(f"Deploying | ${contract_label}...")
+
+        salt = None
+        if self.create2 is not None:
+            salt = keccak256(f"{self.create2}{contract_label}".encode())
+
+        redeploy = self.has_address(contract_label)
+        start = time.perf_counter()
+        result = self.backend.deploy(self, contract_path, args, salt)
+        _event(
+            "deploy",
+            deployer=self.name,
+            label=contract_label,
+            contract=contract_path,
+            address=result["address"],
+            transactions=result["transactions"],
+            duration=time.perf_counter() - start,
+            gas_used=result.get("gas_used"),
+            redeploy=redeploy,
         )
 
-        self._store_transaction_details(contract_label, result)
+        self.transactions.extend(result["transactions"])
+        if result["address"]:
+            with self._lock:
+                self.predicted[contract_label] = result["address"]
+        deployment = {
+            "tx_hash": (result["transactions"] or [None])[0],
+            "artifact_hash": self.artifacts.get(contract_path)["bytecode_hash"],
+            "deployed_at": time.time(),
+            "fingerprint": self._fingerprint(contract_path, args),
+        }
+
+        def complete():
+            with self._lock:
+                self.predicted.pop(contract_label, None)
+            if result["address"]:
+                self.addresses[contract_label] = result["address"]
+            self.deployments[contract_label] = deployment
+            self.journal.append(
+                {
+                    "kind": "deploy",
+                    "label": contract_label,
+                    "address": result["address"],
+                    "deployment": deployment,
+                    "transactions": result["transactions"],
+                }
+            )
+
+        self._complete(result["transactions"], complete)
 
-    def send(self, contract_label: str, address: str, _args: str) -> str:
-        """
-        Calls `$ cast send`
+    def _resolve_send(
+        self,
+        contract_label: str,
+        address: str,
+        _args: list,
+        always: bool = False,
+        pinned: bool = False,
+    ) -> dict:
         """
+        Resolves the signature and arguments of a send action, and fingerprints it by deployer,
+        target address, signature and arguments.
 
+        The same send can appear several times in a path, so it's also numbered: its
+        `occurrence` is only skipped if the send was made at least that many times before.
+        """
         function_name = _args[0]
+        # `#PUB` arguments are usually about the signer's own rights (eg. `grantRole(.., #PUB)`)
+        pinned = pinned or any(["#PUB" in arg for arg in _args[1:]])
+        with span("resolve"):
+            args = [self._handle_arg(arg) for arg in _args[1:]]
 
-        # Get function signature if not given
+        # Get function signature if not given, picking the overload that takes `args`
         if "(" not in function_name:
 
             if contract_label not in self.contracts:
@@ -261,37 +731,397 @@ class Deployer:
                     f"{contract_label} has no contract specified, so you need to specify the function signature"
                 )
 
-            contract_path = self.contracts[contract_label]
+            signatures = self.signatures(contract_label)
 
-            if function_name not in self.contract_signatures[contract_path]:
-                raise ValueError(f"{function_name} does not exist in {contract_path}")
+            if function_name not in signatures:
+                raise ValueError(
+                    f"{function_name} does not exist in {self.contracts[contract_label]}"
+                )
 
-            _args[0] = (
-                '"' + self.contract_signatures[contract_path][function_name] + '"'
-            )
+            signature = select_overload(function_name, signatures[function_name], args)[
+                "signature"
+            ]
         else:
-            _args[0] = '"' + function_name + '"'
+            signature = function_name.strip('"')
+
+        with span("resolve"):
+            fingerprint = hashlib.sha256(
+                json.dumps([self.name, address.lower(), signature, args]).encode()
+            ).hexdigest()
+        with self._lock:
+            self._occurrences[fingerprint] += 1
+            occurrence = self._occurrences[fingerprint]
+
+        return {
+            "label": contract_label,
+            "function": function_name,
+            "address": address,
+            "signature": signature,
+            "args": args,
+            "key": " ".join([address, signature] + args),
+            "fingerprint": fingerprint,
+            "occurrence": occurrence,
+            "always": always,
+            "pinned": pinned,
+        }
+
+    def _is_done(self, call: dict) -> bool:
+        """
+        Whether the send was already made: by an earlier run, or for `always` sends by the
+        interrupted run that is being resumed.
+        """
+        with self._lock:
+            if call["always"]:
+                done = self.resumed_sends[call["key"]] > 0
+                if done:
+                    self.resumed_sends[call["key"]] -= 1
+            else:
+                done = call["occurrence"] <= self.sent[call["fingerprint"]]
+
+        if done:
+            _info(f"Skipping ${call['label']} {call['function']}(...). Already sent")
+            _event(
+                "skip",
+                deployer=self.name,
+                action="send",
+                label=call["label"],
+                function=call["function"],
+                reason="resumed" if call["always"] else "sent",
+                address=call["address"],
+            )
+        return done
 
-        _info(f"{self.name} | Sending   | ${contract_label} {function_name}(...) ")
+    def _mark_sent(self, call: dict):
+        with self._lock:
+            self.sent[call["fingerprint"]] = max(
+                self.sent[call["fingerprint"]], call["occurrence"]
+            )
 
-        # Stringify arguments
-        args = ""
-        for index, arg in enumerate(_args):
-            arg = self._handle_arg(arg)
-            if arg.startswith("[") and arg.endswith("]"):
-                arg = f'"{arg}"'
-            args += f" {arg} "
+    @staticmethod
+    def _send_record(call: dict) -> dict:
+        return {
+            "key": call["key"],
+            "fingerprint": call["fingerprint"],
+            "occurrence": call["occurrence"],
+            "always": call["always"],
+        }
+
+    @contextmanager
+    def _send_signer(self, pinned: bool):
+        """
+        The signer of a send: one of the pool, or the deployer's own signer if the send is
+        `pinned` (a `pinned` send or one with a `#PUB` argument) or there's no pool. Pipelined
+        sends stay pending in the pool until their receipts are collected.
+        """
+        if pinned or self.signers is None:
+            yield self.signer
+            return
 
-        result = self.run(
-            f"cast send {address} {self.rpc} {self.is_legacy} {self.signer.get()} {args}"
+        signer = self.signers.acquire()
+        try:
+            yield signer
+        finally:
+            if self.receipts is None:
+                self.signers.release(signer)
+
+    def _send_call(self, call: dict):
+        _info(f"Sending   | ${call['label']} {call['function']}(...) ")
+
+        start = time.perf_counter()
+        with self._send_signer(call["pinned"]) as signer:
+            result = self.backend.send(
+                self, call["address"], call["signature"], call["args"], signer
+            )
+        _event(
+            "send",
+            deployer=self.name,
+            label=call["label"],
+            function=call["function"],
+            signature=call["signature"],
+            address=call["address"],
+            transactions=result["transactions"],
+            duration=time.perf_counter() - start,
+            gas_used=result.get("gas_used"),
         )
 
-        self._store_transaction_details(contract_label, result)
+        self.transactions.extend(result["transactions"])
+
+        def complete():
+            if not call["always"]:
+                self._mark_sent(call)
+            self.journal.append(
+                dict(
+                    self._send_record(call),
+                    kind="send",
+                    label=call["label"],
+                    transactions=result["transactions"],
+                )
+            )
+
+        self._complete(result["transactions"], complete)
+
+    def send(
+        self,
+        contract_label: str,
+        address: str,
+        _args: str,
+        always: bool = False,
+        pinned: bool = False,
+    ) -> str:
+        """
+        Calls `$ cast send` (or the native backend)
+
+        Sends made by an earlier run are skipped, unless `always` is set. `pinned` sends are
+        made by the deployer's signer, never by the pool of `signers` (eg. `onlyOwner` ones).
+        """
+        call = self._resolve_send(contract_label, address, _args, always, pinned)
+        if not self._is_done(call):
+            self._send_call(call)
+
+    ###########################
+    # Batching
+    ###########################
+
+    def _batched_steps(self, steps: list) -> list:
+        """
+        Replaces every run of consecutive sends with a single BATCH step.
+
+        Example:
+            [(SEND, "FLY", a), (SEND_ALWAYS, "POND", b), (DEPLOY, "BALLOT", c)]
+            -> [(BATCH, ("FLY", "POND"), [("FLY", a, False, False), ("POND", b, True, False)]), (DEPLOY, "BALLOT", c)]
+        """
+        batched = []
+        run = []
+
+        def close_run():
+            if len(run) == 1:
+                batched.append(run[0])
+            elif len(run) > 1:
+                labels = tuple(dict.fromkeys([label for (_, label, _) in run]))
+                sends = [
+                    (
+                        label,
+                        arguments,
+                        action in Deployer.ALWAYS,
+                        action in Deployer.PINNED,
+                    )
+                    for (action, label, arguments) in run
+                ]
+                batched.append((Deployer.BATCH, labels, sends))
+            run.clear()
+
+        for (action, contract_label, arguments) in steps:
+            if action in Deployer.SENDS:
+                run.append((action, contract_label, arguments))
+            else:
+                close_run()
+                batched.append((action, contract_label, arguments))
+        close_run()
+
+        return batched
+
+    def _simulate_batch(self, calls: list) -> bool:
+        """
+        Runs the calls through Multicall3 with `eth_call` (and estimates their gas if
+        `batch_gas` is set) in a single request. Reports every call that would revert.
+        """
+        client = get_client(self.rpc_url)
+        targets = [(call["address"], call["data"]) for call in calls]
+        requests = [
+            ("eth_getCode", [MULTICALL3, "latest"]),
+            (
+                "eth_call",
+                [
+                    {
+                        "to": MULTICALL3,
+                        "data": "0x"
+                        + encode_aggregate3(targets, allow_failure=True).hex(),
+                    },
+                    "latest" if self.receipts is None else "pending",
+                ],
+            ),
+        ]
+        if self.batch_gas > 0:
+            for (address, data) in targets:
+                requests.append(
+                    (
+                        "eth_estimateGas",
+                        [
+                            {
+                                "from": MULTICALL3,
+                                "to": address,
+                                "data": "0x" + data.hex(),
+                            }
+                        ],
+                    )
+                )
+
+        results = client.batch(requests)
+        if isinstance(results[0], RpcError) or results[0] in (None, "0x"):
+            _info(f"# Multicall3 is not deployed at {MULTICALL3}")
+            return False
+        if isinstance(results[1], RpcError):
+            _info(f"# Multicall3 simulation failed: {results[1]}")
+            return False
+
+        would_revert = False
+        simulated = decode_aggregate3(bytes.fromhex(results[1][2:]))
+        for (call, (success, data)) in zip(calls, simulated):
+            if not success:
+                _info(
+                    f"Batching  | ${call['label']} {call['function']}(...) reverts through Multicall3: {revert_reason(data)}"
+                )
+                would_revert = True
+
+        for (call, gas) in zip(calls, results[2:]):
+            # Calls depending on an earlier one of the batch can't be estimated on their own
+            call["gas"] = self.batch_gas if isinstance(gas, RpcError) else int(gas, 16)
+
+        return not would_revert
+
+    def _batch_chunks(self, calls: list) -> list:
+        chunks = [[]]
+        gas = 0
+        for call in calls:
+            call_gas = call.get("gas", 0)
+            if len(chunks[-1]) > 0 and (
+                len(chunks[-1]) >= self.batch
+                or (self.batch_gas > 0 and gas + call_gas > self.batch_gas)
+            ):
+                chunks.append([])
+                gas = 0
+            chunks[-1].append(call)
+            gas += call_gas
+        return chunks
+
+    def send_batch(self, sends: list):
+        """
+        Sends consecutive send actions as Multicall3 `aggregate3` transactions, of up to
+        `batch` calls and `batch_gas` gas each. A transaction reverts as a whole if any of its
+        calls reverts.
+
+        The calls are simulated first. `msg.sender` becomes Multicall3, so calls restricted to
+        the signer (eg. `onlyOwner`) revert through it: if any call would revert, or Multicall3
+        isn't deployed, each revert is reported and the sends are made one by one instead.
+
+        Example:
+            sends = [("FLY", ["addZone", "$POND"], False, False), ("FLY", ["mint", "$POND"], False, True)]
+        """
+        calls = []
+        for (contract_label, arguments, always, pinned) in sends:
+            if not self.has_address(contract_label):
+                raise ValueError(f"{contract_label} has not been deployed.")
+
+            call = self._resolve_send(
+                contract_label, self.address(contract_label), arguments, always, pinned
+            )
+            if not self._is_done(call):
+                calls.append(call)
+
+        encoded = encode_calls([(call["signature"], call["args"]) for call in calls])
+        for (call, data) in zip(calls, encoded):
+            # Types the native encoder doesn't know are left to `cast`
+            call["data"] = None if isinstance(data, ValueError) else data
+
+        if (
+            len(calls) < 2
+            or any([call["data"] is None for call in calls])
+            or not self.backend.simulate(self, calls)
+        ):
+            for call in calls:
+                self._send_call(call)
+            return
+
+        for chunk in self._batch_chunks(calls):
+            _info(
+                f"Batching  | "
+                + ", ".join([f"${call['label']} {call['function']}" for call in chunk])
+            )
+
+            start = time.perf_counter()
+            with self._send_signer(any([call["pinned"] for call in chunk])) as signer:
+                result = self.backend.multicall(
+                    self, [(call["address"], call["data"]) for call in chunk], signer
+                )
+            _event(
+                "batch",
+                deployer=self.name,
+                sends=[
+                    {
+                        "label": call["label"],
+                        "function": call["function"],
+                        "address": call["address"],
+                    }
+                    for call in chunk
+                ],
+                transactions=result["transactions"],
+                duration=time.perf_counter() - start,
+                gas_used=result.get("gas_used"),
+            )
+
+            self.transactions.extend(result["transactions"])
+            self._complete(
+                result["transactions"],
+                lambda chunk=chunk, result=result: self._complete_batch(chunk, result),
+            )
+
+    def _complete_batch(self, chunk: list, result: dict):
+        for call in chunk:
+            if not call["always"]:
+                self._mark_sent(call)
+        self.journal.append(
+            {
+                "kind": "batch",
+                "sends": [self._send_record(call) for call in chunk],
+                "transactions": result["transactions"],
+            }
+        )
 
     ###########################
     # Action Flow
     ###########################
 
+    def _active_steps(self, path: list) -> list:
+        """
+        Returns the path without the SKIP markers and the actions between them.
+        """
+        steps = []
+        skipping = False
+        for (action, contract_label, arguments) in path:
+            if action == Deployer.SKIP_START:
+                skipping = True
+            elif action == Deployer.SKIP_END:
+                skipping = False
+            elif not skipping:
+                steps.append((action, contract_label, arguments))
+        return steps
+
+    def _step(self, action: int, contract_label: str, arguments: list):
+        if isinstance(contract_label, tuple):
+            label = ",".join(contract_label)
+        else:
+            label = contract_label
+
+        with span(
+            "action", deployer=self.name, label=label, action=Deployer.NAMES[action]
+        ):
+            if action in Deployer.SENDS:
+
+                if not self.has_address(contract_label):
+                    raise ValueError(f"{contract_label} has not been deployed.")
+
+                self.send(
+                    contract_label,
+                    self.address(contract_label),
+                    arguments,
+                    always=(action in Deployer.ALWAYS),
+                    pinned=(action in Deployer.PINNED),
+                )
+            elif action == Deployer.DEPLOY:
+                self.deploy(contract_label, arguments)
+            elif action == Deployer.BATCH:
+                self.send_batch(arguments)
+
     def path(self, path: list):
         """
         Example:
@@ -303,37 +1133,56 @@ class Deployer:
                 (Deployer.SKIP_END,0,0),
 
                 (Deployer.SEND, "CONTRACT_1_LABEL",   ["ContractMethodName", "9999999999", "00"*32, "00"*32, "0"]),
+                (Deployer.SEND_ALWAYS, "CONTRACT_1_LABEL", ["ContractMethodName2"]),
+                (Deployer.SEND_PINNED, "CONTRACT_1_LABEL", ["ContractMethodName3"]),
 
                 (Deployer.DEPLOY, "CONTRACT_2_LABEL", ["Arg1", "Arg2", "12ether"])
             ]
 
-        Will skip the first Deploy and execute the rest, one after the other.
-        """
-        skipping = False
-        for (action, contract_contract_label, arguments) in path:
+        Will skip the first Deploy and execute the rest, one after the other. Sends already made
+        by an earlier run are skipped too, except SEND_ALWAYS (and SEND_ALWAYS_PINNED) ones.
 
-            if action == Deployer.SKIP_START:
-                skipping = True
-            elif action == Deployer.SKIP_END:
-                skipping = False
-                continue
+        With `workers > 1`, steps are scheduled from the `$LABEL` references in their arguments
+        instead: a step only waits for the steps touching the labels it uses, and independent
+        ones run concurrently (see `scheduler.build_graph`).
 
-            if skipping:
-                continue
-            elif action == Deployer.SEND:
+        With `pipeline`, sends (and native deploys, whose address is predicted) don't wait to be
+        mined before the next step is submitted, and every receipt is checked once the path is
+        done (see `pipeline.ReceiptCollector`). Only then are they journaled and taken as done.
 
-                if contract_contract_label not in self.addresses:
-                    raise ValueError(
-                        f"{contract_contract_label} has not been deployed."
-                    )
+        With `batch > 0`, consecutive sends are grouped into Multicall3 transactions
+        (see `send_batch`).
 
-                self.send(
-                    contract_contract_label,
-                    self.addresses[contract_contract_label],
-                    arguments,
-                )
-            elif action == Deployer.DEPLOY:
-                self.deploy(contract_contract_label, arguments)
+        With a pool of `signers`, sends and batches are spread over it, each signer with its own
+        nonces. Deploys, SEND_PINNED sends and sends with a `#PUB` argument stay on the
+        deployer's signer.
+        """
+        steps = self._active_steps(path)
+        if self.batch > 0:
+            steps = self._batched_steps(steps)
+
+        # A failure leaves the completed actions in the journal, for the next run to resume
+        if self.workers > 1:
+            run_graph(steps, self._step, self.workers)
+        else:
+            for step in steps:
+                self._step(*step)
+
+        if self.receipts is not None:
+            start = time.perf_counter()
+            receipts = self.receipts.collect(self._confirmed)
+            _event(
+                "receipts",
+                deployer=self.name,
+                transactions=len(receipts),
+                gas_used=sum(
+                    [int(receipt["gasUsed"], 16) for receipt in receipts.values()]
+                ),
+                duration=time.perf_counter() - start,
+            )
+            if self.signers is not None:
+                self.signers.settle()
 
         self.save()
+
         self.print_details()
@@ -0,0 +1,239 @@
+from collections import Counter
+from decimal import Decimal
+from . import KeyKind, Deployer
+from . import abi
+from .artifacts import load_artifact, constructor_inputs
+from .crypto import private_key_to_address, is_private_key
+from .rpc import RpcError, get_client
+from .scheduler import referenced_labels
+from .parser import DEPLOYERS, SIGNERS, signer_from_context, deployer_from_context
+
+# Stands in for the addresses of labels the plan deploys, to encode the arguments using them
+PENDING_ADDRESS = "0x" + "11" * 20
+
+
+def _sender(signer) -> str:
+    if signer.key_kind == KeyKind.PRIVATE and is_private_key(signer.key_argument):
+        return private_key_to_address(signer.key_argument)
+    return signer.public_key() or None
+
+
+def _pending(deployer, arguments: list, pending: set) -> set:
+    """
+    The labels referenced by `arguments` that the plan deploys.
+    """
+    labels = referenced_labels(arguments)
+    return {deployer.qualified(label) for label in labels} & pending
+
+
+def _resolve(deployer, arg: str, pending: set) -> str:
+    """
+    `Deployer._handle_arg`, with the labels deployed by the plan at `PENDING_ADDRESS`.
+    """
+    items = abi.nested_items(arg)
+    if items is not None:
+        return (
+            arg[0]
+            + ",".join([_resolve(deployer, item, pending) for item in items])
+            + arg[-1]
+        )
+    if arg.startswith("$") and deployer.qualified(arg[1:]) in pending:
+        return PENDING_ADDRESS
+    return deployer._handle_arg(arg)
+
+
+def _deploy_row(deployer, contract_label: str, arguments: list, pending: set) -> dict:
+    row = {"action": "deploy", "label": contract_label, "function": ""}
+
+    label = deployer.qualified(contract_label)
+    if contract_label in deployer.addresses and label not in pending:
+        # Arguments using a label the plan deploys change with its address
+        if not _pending(deployer, arguments, pending) and not deployer._is_stale(
+            contract_label, arguments
+        ):
+            return dict(row, status="skip (cached)")
+        row["status"] = "redeploy"
+    else:
+        row["status"] = "deploy"
+    pending.add(label)
+
+    contract_path = deployer.contracts[contract_label]
+    try:
+        artifact = load_artifact(contract_path)
+    except FileNotFoundError:
+        return dict(row, note="not built")
+
+    bytecode = artifact["bytecode"]["object"]
+    if "__$" in bytecode:
+        return dict(row, note="needs linked libraries")
+
+    args = [_resolve(deployer, arg, pending) for arg in arguments]
+    try:
+        data = bytes.fromhex(bytecode[2:]) + abi.encode(
+            constructor_inputs(artifact["abi"]), args
+        )
+    except ValueError as e:
+        return dict(row, note=str(e))
+    return dict(row, call={"data": "0x" + data.hex()})
+
+
+def _send_row(
+    deployer,
+    contract_label: str,
+    arguments: list,
+    always: bool,
+    pending: set,
+    resumed: Counter,
+) -> dict:
+    row = {"action": "send", "label": contract_label, "function": arguments[0]}
+
+    if deployer.qualified(contract_label) in pending or _pending(
+        deployer, arguments[1:], pending
+    ):
+        # Its target or arguments are deployed by the plan, so there's nothing to estimate against yet
+        return dict(row, status="send", note="after deploy")
+    if contract_label not in deployer.addresses:
+        return dict(row, status="error", note=f"{contract_label} has not been deployed")
+
+    call = deployer._resolve_send(
+        contract_label, deployer.addresses[contract_label], arguments, always
+    )
+    if always:
+        if resumed[call["key"]] > 0:
+            resumed[call["key"]] -= 1
+            return dict(row, status="skip (resumed)")
+    elif call["occurrence"] <= deployer.sent[call["fingerprint"]]:
+        return dict(row, status="skip (sent)")
+
+    try:
+        data = abi.encode_call(call["signature"], call["args"])
+    except ValueError as e:
+        return dict(row, status="send", note=str(e))
+    return dict(
+        row,
+        status="send (always)" if always else "send",
+        call={"to": call["address"], "data": "0x" + data.hex()},
+    )
+
+
+def resolve_plan(plan: dict) -> list:
+    """
+    Walks every `.use` path of a plan like `execute` would, resolving skips, cached and
+    redeployed labels, sends already made and `$LABEL`/`#PUB` arguments, without sending
+    anything. Deployers are created read only: their caches and journals are read, but
+    nothing is created, compacted or written.
+
+    Returns one row per action:
+        {"deployer": "d", "action": "send", "label": "FLY", "function": "addZone",
+         "status": "send", "call": {"to": "0x..", "data": "0x.."}}
+    """
+    rows = []
+    pending = set()
+    resumed = {}
+    for step in plan["steps"]:
+        if step["kind"] == "signer":
+            SIGNERS[step["name"]] = signer_from_context(step["context"])
+
+        elif step["kind"] == "deployer":
+            DEPLOYERS[step["name"]] = deployer_from_context(
+                step["context"], plan["contracts"], step["name"], read_only=True
+            )
+
+        elif step["kind"] == "use":
+            deployer = DEPLOYERS[step["deployer"]]
+            if step["deployer"] not in resumed:
+                resumed[step["deployer"]] = Counter(deployer.resumed_sends)
+
+            path = [tuple(action) for action in step["path"]]
+            for (action, contract_label, arguments) in deployer._active_steps(path):
+                if action == Deployer.DEPLOY:
+                    row = _deploy_row(deployer, contract_label, arguments, pending)
+                else:
+                    row = _send_row(
+                        deployer,
+                        contract_label,
+                        arguments,
+                        action in Deployer.ALWAYS,
+                        pending,
+                        resumed[step["deployer"]],
+                    )
+
+                if "call" in row:
+                    sender = _sender(deployer.signer)
+                    if sender is not None:
+                        row["call"]["from"] = sender
+                rows.append(dict(row, deployer=step["deployer"], rpc=deployer.rpc_url))
+    return rows
+
+
+def estimate_rows(rows: list) -> dict:
+    """
+    Estimates the gas of every row with a call, with a single JSON-RPC batch per endpoint
+    (including its gas price). Returns the gas price of every endpoint.
+    """
+    prices = {}
+    for rpc in dict.fromkeys([row["rpc"] for row in rows]):
+        estimated = [row for row in rows if row["rpc"] == rpc and "call" in row]
+        results = get_client(rpc).batch(
+            [("eth_gasPrice", [])]
+            + [("eth_estimateGas", [row["call"]]) for row in estimated]
+        )
+
+        prices[rpc] = 0 if isinstance(results[0], RpcError) else int(results[0], 16)
+        for (row, gas) in zip(estimated, results[1:]):
+            if isinstance(gas, RpcError):
+                row["note"] = f"estimate failed: {gas}"
+            else:
+                row["gas"] = int(gas, 16)
+                row["cost"] = row["gas"] * prices[rpc]
+    return prices
+
+
+def format_report(rows: list) -> str:
+    """
+    Table of the executed and skipped actions, with their estimated gas and cost.
+    """
+    header = ["deployer", "action", "label", "function", "status", "gas", "cost", ""]
+    table = [header]
+    for row in rows:
+        table.append(
+            [
+                row["deployer"],
+                row["action"],
+                f"${row['label']}",
+                row["function"],
+                row["status"],
+                str(row.get("gas", "")),
+                _ether(row["cost"]) if "cost" in row else "",
+                row.get("note", ""),
+            ]
+        )
+    widths = [max([len(line[column]) for line in table]) for column in range(8)]
+    lines = [
+        "  ".join([cell.ljust(width) for (cell, width) in zip(line, widths)]).rstrip()
+        for line in table
+    ]
+
+    executed = [row for row in rows if not row["status"].startswith("skip")]
+    unestimated = [row for row in executed if "gas" not in row]
+    total_gas = sum([row.get("gas", 0) for row in executed])
+    total_cost = sum([row.get("cost", 0) for row in executed])
+    lines.append("")
+    lines.append(
+        f"{len(executed)} actions to execute, {len(rows) - len(executed)} skipped"
+    )
+    lines.append(
+        f"estimated gas: {total_gas}, cost: {_ether(total_cost)}"
+        + (f" (+ {len(unestimated)} actions not estimated)" if unestimated else "")
+    )
+    return "\n".join(lines)
+
+
+def _ether(wei: int) -> str:
+    return f"{Decimal(wei) / Decimal(10**18):f} ether"
+
+
+def plan_report(plan: dict) -> str:
+    rows = resolve_plan(plan)
+    estimate_rows(rows)
+    return format_report(rows)
@@ -0,0 +1,140 @@
+import threading, time
+from .rpc import RpcError, get_client
+
+
+class FeePolicy:
+    """
+    How the fees the node suggests are adjusted before every transaction:
+
+    * legacy: `gasPrice` is `eth_gasPrice` plus `bump` percent
+    * EIP-1559: `maxPriorityFeePerGas` is `eth_maxPriorityFeePerGas` plus `bump` percent, and
+      `maxFeePerGas` is `base_multiplier` times the latest base fee plus the priority fee
+
+    Both are capped at `max_fee` wei, if set.
+
+    Example:
+        FeePolicy(bump=10, max_fee=100 * 10**9).apply(legacy=True, gas_price=25 * 10**9)
+        -> {"gasPrice": 27500000000}
+    """
+
+    def __init__(self, bump: int = 0, max_fee: int = None, base_multiplier: int = 2):
+        self.bump = bump
+        self.max_fee = max_fee
+        self.base_multiplier = base_multiplier
+
+    def _bumped(self, fee: int) -> int:
+        return fee * (100 + self.bump) // 100
+
+    def _capped(self, fee: int) -> int:
+        return fee if self.max_fee is None else min(fee, self.max_fee)
+
+    def apply(
+        self, legacy: bool, gas_price: int = 0, base_fee: int = 0, tip: int = 0
+    ) -> dict:
+        if legacy:
+            return {"gasPrice": self._capped(self._bumped(gas_price))}
+
+        max_fee = self._capped(self.base_multiplier * base_fee + self._bumped(tip))
+        return {
+            "maxFeePerGas": max_fee,
+            "maxPriorityFeePerGas": min(self._bumped(tip), max_fee),
+        }
+
+
+class BlockContext:
+    """
+    Fee data of a deployer's network, shared by all of its actions instead of being asked for
+    by every transaction (or every forge/cast command).
+
+    It's refreshed at most every `poll_interval` seconds: `fees` polls `eth_blockNumber` and
+    only fetches the fee data again for a new block, the native backend adds `calls` to the
+    batch it sends for every transaction anyway.
+
+    Example:
+        BlockContext("https://api.avax-test.network/ext/bc/C/rpc", legacy=False).fees()
+        -> {"maxFeePerGas": 50000000000, "maxPriorityFeePerGas": 1500000000}
+    """
+
+    def __init__(
+        self,
+        rpc_url: str,
+        legacy: bool,
+        policy: FeePolicy = None,
+        poll_interval: float = 1,
+    ):
+        self.rpc_url = rpc_url
+        self.legacy = legacy
+        self.policy = policy if policy is not None else FeePolicy()
+        self.poll_interval = poll_interval
+        self.block = None
+        self.fetches = 0
+        self._fees = None
+        self._polled = 0
+        self._lock = threading.Lock()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._fees is not None
+            and time.monotonic() - self._polled < self.poll_interval
+        )
+
+    def calls(self) -> list:
+        """
+        The requests fetching the fee data, none while it's fresh. Their results go to `update`.
+        """
+        with self._lock:
+            if self._is_fresh():
+                return []
+        if self.legacy:
+            return [("eth_blockNumber", []), ("eth_gasPrice", [])]
+        return [
+            ("eth_getBlockByNumber", ["latest", False]),
+            ("eth_maxPriorityFeePerGas", []),
+        ]
+
+    def update(self, results: list):
+        (block, fee) = results
+        if isinstance(block, RpcError):
+            raise block
+        if self.legacy:
+            if isinstance(fee, RpcError):
+                raise fee
+            fees = self.policy.apply(True, gas_price=int(fee, 16))
+        else:
+            if isinstance(fee, RpcError):
+                # Nodes without the method (eg. older ones) accept a 1 gwei tip
+                fee = hex(10**9)
+            fees = self.policy.apply(
+                False,
+                base_fee=int(block.get("baseFeePerGas", "0x0"), 16),
+                tip=int(fee, 16),
+            )
+            block = block["number"]
+
+        with self._lock:
+            self.block = int(block, 16)
+            self._fees = fees
+            self._polled = time.monotonic()
+            self.fetches += 1
+
+    def fees(self) -> dict:
+        """
+        `{"gasPrice": wei}` for legacy transactions, otherwise
+        `{"maxFeePerGas": wei, "maxPriorityFeePerGas": wei}`.
+        """
+        with self._lock:
+            if self._is_fresh():
+                return dict(self._fees)
+            known = self.block if self._fees is not None else None
+
+        client = get_client(self.rpc_url)
+        if known is not None:
+            block = int(client.call("eth_blockNumber"), 16)
+            with self._lock:
+                if block == self.block:
+                    self._polled = time.monotonic()
+                    return dict(self._fees)
+
+        self.update(client.batch(self.calls()))
+        with self._lock:
+            return dict(self._fees)
@@ -0,0 +1,62 @@
+import json, os, threading
+
+
+class Journal:
+    """
+    Append-only JSONL log of the actions completed since the cache was last saved.
+
+    Every record is flushed and fsync'd as soon as its action completes, so an interrupted run
+    (Ctrl-C, OOM kill, hung RPC) can be replayed on the next start and resume where it stopped.
+    Saving the cache compacts the journal back to empty. A `path` of None keeps no journal.
+
+    Example:
+        {"kind": "deploy", "label": "FLY", "address": "0x..", "transactions": ["0x.."]}
+        {"kind": "send", "label": "FLY", "key": "0x.. addZone(address) 0x..", "transactions": ["0x.."]}
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def append(self, record: dict):
+        if self.path is None:
+            return
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a")
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def replay(self) -> list:
+        records = []
+        if self.path is None:
+            return records
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # Only the last line can be torn by a crash mid-write
+                        break
+        except FileNotFoundError:
+            pass
+        return records
+
+    def compact(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self.path is None:
+                return
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
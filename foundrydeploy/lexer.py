@@ -0,0 +1,128 @@
+import re
+
+# Runs of characters that never start or end a group
+_PLAIN = re.compile(r'[^\s()\[\]"]*')
+_SPACE = re.compile(r"\s*")
+_DELIMITERS = re.compile(r'[()\[\]"]')
+_WORD = re.compile(r"\S+")
+_SPECIAL = re.compile(r'[()\[\]"#]')
+
+_CLOSING = {"(": ")", "[": "]"}
+
+
+class Line:
+    """
+    A non empty, non comment line of a script.
+
+    `tokens` are split on whitespace, except inside `(..)`, `[..]` (nested) and `".."`.
+    `columns` holds the 1-based column where each token starts.
+    """
+
+    __slots__ = ("number", "text", "tokens", "columns")
+
+    def __init__(self, number: int, text: str, tokens: list, columns: list):
+        self.number = number
+        self.text = text
+        self.tokens = tokens
+        self.columns = columns
+
+
+class LexError(ValueError):
+    def __init__(self, message: str, number: int, column: int, text: str):
+        super().__init__(
+            f"line:{number}:{column} {message}\n{text}\n{' ' * (column - 1)}^"
+        )
+        self.number = number
+        self.column = column
+
+
+def _group_end(text: str, start: int, number: int) -> int:
+    """
+    Returns the index right after the group opened at `text[start]`.
+    """
+    stack = []
+    # Where the open quote is, if any
+    quoted = None
+    for match in _DELIMITERS.finditer(text, start):
+        ch = match.group()
+        if ch == '"':
+            quoted = match.start() if quoted is None else None
+            if quoted is None and len(stack) == 0:
+                return match.end()
+        elif quoted is not None:
+            continue
+        elif ch in _CLOSING:
+            stack.append((_CLOSING[ch], match.start()))
+        else:
+            if len(stack) == 0 or stack[-1][0] != ch:
+                raise LexError(f"unexpected `{ch}`", number, match.start() + 1, text)
+            stack.pop()
+            if len(stack) == 0:
+                return match.end()
+
+    if quoted is not None:
+        raise LexError('unclosed `"`', number, quoted + 1, text)
+    raise LexError(f"unclosed `{text[stack[-1][1]]}`", number, stack[-1][1] + 1, text)
+
+
+def lex_line(text: str, number: int = 1) -> Line:
+    """
+    Example:
+        `send HOPPER setSaleDetails(1, [$A, $B], "a b")  # comment`
+        -> ["send", "HOPPER", 'setSaleDetails(1, [$A, $B], "a b")']
+
+    A `#` starting a token and followed by a space (or another `#`) comments out the rest of
+    the line, `#PUB` stays a token.
+    """
+    tokens = []
+    columns = []
+    length = len(text)
+
+    # Most lines have no groups nor comments and are split by the regex engine alone
+    if not _SPECIAL.search(text):
+        for match in _WORD.finditer(text):
+            tokens.append(match.group())
+            columns.append(match.start() + 1)
+        return Line(number, text.strip(), tokens, columns)
+
+    position = _SPACE.match(text).end()
+    while position < length:
+        ch = text[position]
+        if ch == "#" and (
+            position + 1 == length
+            or text[position + 1].isspace()
+            or text[position + 1] == "#"
+        ):
+            break
+
+        start = position
+        while position < length and not text[position].isspace():
+            position = _PLAIN.match(text, position).end()
+            if position < length and text[position] in '(["':
+                position = _group_end(text, position, number)
+            elif position < length and text[position] in ")]":
+                raise LexError(
+                    f"unexpected `{text[position]}`", number, position + 1, text
+                )
+
+        tokens.append(text[start:position])
+        columns.append(start + 1)
+        position = _SPACE.match(text, position).end()
+
+    return Line(number, text.strip(), tokens, columns)
+
+
+def lex(script: str) -> list:
+    """
+    Tokenizes a whole script in one pass, skipping blank and comment lines.
+    """
+    lines = []
+    for (index, text) in enumerate(script.split("\n")):
+        stripped = text.strip()
+        if len(stripped) == 0 or stripped[0] == "#":
+            continue
+
+        line = lex_line(text, index + 1)
+        if len(line.tokens) > 0:
+            lines.append(line)
+    return lines
@@ -1,13 +1,31 @@
-import sys
+import json, sys, threading
 from loguru import logger
 
 logger.remove()
+logger.configure(extra={"prefix": ""})
 logger.add(
     sys.stderr,
     colorize=True,
-    format="<green>{time}</green> | <level>{level}</level> | {message}",
+    format="<green>{time}</green> | <level>{level}</level> | {extra[prefix]}{message}",
+    # Events only go to the event sinks
+    filter=lambda record: "event" not in record["extra"],
 )
 
+# Handler ids of the event sinks, events aren't even built while there's none
+_EVENT_SINKS = []
+_EVENT_SINKS_LOCK = threading.Lock()
+
+
+def _prefixed(prefix: str):
+    """
+    Prefixes every line logged within the context, including by the steps it schedules.
+
+    Example:
+        with _prefixed("[fuji] "):
+            ...
+    """
+    return logger.contextualize(prefix=prefix)
+
 
 def _info(msg: str):
     logger.info(msg)
@@ -19,3 +37,73 @@ def _debug(msg: str):
 
 def _error(msg: str):
     logger.error(msg)
+
+
+def _event(kind: str, **fields):
+    """
+    Emits a structured event to the event sinks (see `add_event_sink`), never to the console.
+
+    Example:
+        _event("deploy", deployer="fuji", label="FLY", address="0x..", transactions=["0x.."])
+    """
+    if len(_EVENT_SINKS) > 0:
+        logger.bind(event={"event": kind, **fields}).info(kind)
+
+
+class _JsonLines:
+    def __init__(self, stream, owned=False):
+        self.stream = stream
+        # Opened by `add_event_sink` from a path, so closed with the sink
+        self.owned = owned
+
+    def write(self, message):
+        record = message.record
+        event = dict(time=record["time"].isoformat(), **record["extra"]["event"])
+        self.stream.write(json.dumps(event, default=str) + "\n")
+        self.stream.flush()
+
+    def stop(self):
+        # Called by loguru once the queued events are written
+        if self.owned:
+            self.stream.close()
+
+
+def add_event_sink(sink) -> int:
+    """
+    Writes every event as a JSON line to `sink`: a file path (appended to), "-" for stdout, or
+    a writable stream. Lines are written by a background thread, so emitting an event never
+    waits for the sink. Returns the handler id to pass to `remove_event_sink`.
+
+    Events: `cache_load`, `resume`, `deploy`, `send`, `batch`, `skip`, `receipts`, `cache_save`,
+    `summary` and `error`, each with its `deployer` and a `time`. `gas_used` is null when the
+    backend doesn't report it (eg. `forge create`, pipelined sends before their receipts).
+
+    Example:
+        {"time": "2022-06-01T12:00:00.000000+00:00", "event": "deploy", "deployer": "fuji",
+         "label": "FLY", "address": "0x..", "transactions": ["0x.."], "duration": 3.2, "gas_used": 812345}
+    """
+    owned = isinstance(sink, str) and sink != "-"
+    if sink == "-":
+        sink = sys.stdout
+    elif owned:
+        sink = open(sink, "a")
+
+    handler = logger.add(
+        _JsonLines(sink, owned),
+        format="{message}",
+        filter=lambda record: "event" in record["extra"],
+        enqueue=True,
+    )
+    with _EVENT_SINKS_LOCK:
+        _EVENT_SINKS.append(handler)
+    return handler
+
+
+def remove_event_sink(handler: int):
+    """
+    Writes the events still queued for the sink, then removes it, closing the file
+    `add_event_sink` opened for a path.
+    """
+    with _EVENT_SINKS_LOCK:
+        _EVENT_SINKS.remove(handler)
+    logger.remove(handler)
@@ -0,0 +1,99 @@
+from . import abi
+
+# Same address on every chain it is deployed to, see https://github.com/mds1/multicall
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+AGGREGATE3 = "aggregate3((address,bool,bytes)[])"
+
+_ERROR_STRING = bytes.fromhex("08c379a0")
+_PANIC = bytes.fromhex("4e487b71")
+
+
+def _word(number: int) -> bytes:
+    return number.to_bytes(32, "big")
+
+
+def _padded(data: bytes) -> bytes:
+    return data.ljust((len(data) + 31) // 32 * 32, b"\x00")
+
+
+def encode_aggregate3(calls: list, allow_failure: bool = False) -> bytes:
+    """
+    Calldata of `aggregate3` for `[(target, calldata), ...]`.
+
+    Example:
+        encode_aggregate3([("0x1111111111111111111111111111111111111111", b"\\x12\\x34")])
+    """
+    tuples = []
+    for (target, data) in calls:
+        tuples.append(
+            abi.encode_value("address", target)
+            + _word(1 if allow_failure else 0)
+            + _word(3 * 32)
+            + _word(len(data))
+            + _padded(data)
+        )
+
+    offsets = b""
+    position = len(tuples) * 32
+    for encoded in tuples:
+        offsets += _word(position)
+        position += len(encoded)
+
+    return (
+        abi.selector(AGGREGATE3)
+        + _word(32)
+        + _word(len(tuples))
+        + offsets
+        + b"".join(tuples)
+    )
+
+
+def decode_aggregate3(data: bytes) -> list:
+    """
+    Decodes the `(bool success, bytes returnData)[]` returned by `aggregate3`.
+    """
+
+    def read(offset: int) -> int:
+        return int.from_bytes(data[offset : offset + 32], "big")
+
+    array = read(0)
+    count = read(array)
+    results = []
+    for index in range(count):
+        start = array + 32 + read(array + 32 + index * 32)
+        success = read(start) == 1
+        returned = start + read(start + 32)
+        length = read(returned)
+        results.append((success, data[returned + 32 : returned + 32 + length]))
+    return results
+
+
+def revert_reason(data: bytes) -> str:
+    """
+    Example:
+        Error("Ownable: caller is not the owner") -> "Ownable: caller is not the owner"
+    """
+    if data[:4] == _ERROR_STRING:
+        offset = int.from_bytes(data[4:36], "big") + 4
+        length = int.from_bytes(data[offset : offset + 32], "big")
+        return data[offset + 32 : offset + 32 + length].decode(errors="replace")
+    if data[:4] == _PANIC:
+        return f"panic {hex(int.from_bytes(data[4:36], 'big'))}"
+    if len(data) == 0:
+        return "reverted without a reason"
+    return f"reverted with 0x{data.hex()}"
+
+
+def cast_argument(calls: list, allow_failure: bool = False) -> str:
+    """
+    The `aggregate3` argument as `cast send` expects it.
+
+    Example:
+        "[(0x1111111111111111111111111111111111111111,false,0x1234)]"
+    """
+    flag = "true" if allow_failure else "false"
+    return (
+        "["
+        + ",".join([f"({target},{flag},0x{data.hex()})" for (target, data) in calls])
+        + "]"
+    )
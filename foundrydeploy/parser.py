@@ -1,33 +1,33 @@
+import hashlib, json, os
 from .const import *
 from . import Signer, Network, TEST_SIGNER, KeyKind, Deployer
-from .log import _info
+from .backend import default_backend
+from .artifacts import artifact_path, get_index
+from .scheduler import referenced_labels, run_graph, qualified
+from .lexer import lex
+from .abi import split_top_level, nested_items, parse_amount
+from .log import _info, _prefixed, _event
+from .trace import span
+from .replay import get_session
 
 #####################
 # Context
 #####################
 
 SIGNERS = {}
+# Every deployer resolves the `$LABEL@deployer` arguments of the others through it
 DEPLOYERS = {}
 CONTEXT = {}
 
+# Shared by every deployer, so an address deployed by one is immediately visible to all.
+# `scoped` deployers keep their own instead
+ADDRESSES = {}
+
 #####################
 # Helpers
 #####################
 
 
-def _sharing_is_caring():
-    """
-    Makes sure all deployers have access to all deployed addresses
-    """
-    addresses = {}
-
-    for deployer in DEPLOYERS.keys():
-        addresses.update(DEPLOYERS[deployer].addresses)
-
-    for deployer in DEPLOYERS.keys():
-        DEPLOYERS[deployer].addresses.update(addresses)
-
-
 def _is_declaration(arg: str, declarations: dict):
     if arg.startswith("@"):
         return declarations[arg[1:]]
@@ -35,17 +35,29 @@ def _is_declaration(arg: str, declarations: dict):
         return arg
 
 
+def _nested_declarations(arg: str, declarations: dict) -> str:
+    items = nested_items(arg)
+    if items is None:
+        return _is_declaration(arg, declarations)
+    items = [_nested_declarations(item, declarations) for item in items]
+    return arg[0] + ",".join(items) + arg[-1]
+
+
 def _load_arguments(is_send: bool, arguments: list, declarations: dict):
     args = []
     if is_send:
 
-        if len(arguments) == 1 and is_send:
-            tokens = arguments[0].split("(")
-            function_name = tokens[0]
-            arguments = "(" + tokens[1]
-        else:
+        if len(arguments) == 1 and "(" in arguments[0]:
+            open_at = arguments[0].index("(")
+            function_name = arguments[0][:open_at]
+            arguments = arguments[0][open_at:]
+        elif len(arguments) == 2:
             function_name = arguments[0]
             arguments = arguments[1]
+        else:
+            raise ValueError(
+                f"send command should have the following format `send contract_label function (args...)`"
+            )
 
         function_name = _is_declaration(function_name, declarations)
         args.append(function_name)
@@ -53,19 +65,13 @@ def _load_arguments(is_send: bool, arguments: list, declarations: dict):
     if not arguments.startswith("(") or not arguments.endswith(")"):
         raise ValueError(f"arguments which should start with `(` and end with `)`")
 
-    arguments = tokenize(arguments[1:-1], ",", ["[", "]"])
+    if arguments[1:-1].strip() == "":
+        return args
 
-    for arg in arguments:
-        arg = arg.strip()
+    for arg in split_top_level(arguments[1:-1]):
 
-        # list parameter with declaration
-        if arg.startswith("[") and arg.endswith("]"):
-            _args = []
-            for _arg in arg[1:-1].split(","):
-                _args.append(_is_declaration(_arg, declarations))
-            arg = "[" + ",".join(_args) + "]"
-        else:
-            arg = _is_declaration(arg, declarations)
+        # list or tuple parameter with declarations
+        arg = _nested_declarations(arg, declarations)
 
         # check if * is present
         # 00*2 -> 0000
@@ -85,41 +91,84 @@ def _name_check(current_section: str, tokens: list, field_desc="field") -> str:
     return tokens[1]
 
 
-def _remove_field(field: str, missing_fields: list):
-    try:
-        missing_fields.remove(field)
-    except:
-        pass
-    return missing_fields
+def _check_label(contract_label: str, contracts: list):
+    if contract_label not in [contract[0] for contract in contracts]:
+        raise ValueError(f"`{contract_label}` is not declared in `.contracts`")
 
 
-def tokenize(line: str, delim=" ", ignore=["(", ")"]):
-    tokens = []
+def _check_deploy(contract_label: str, contracts: list):
+    for contract in contracts:
+        if contract[0] == contract_label and contract[1] == "":
+            raise ValueError(
+                f"`{contract_label}` can't be deployed, it has no contract path in `.contracts`"
+            )
 
-    NO_SKIP = ""
-    close_skip = NO_SKIP
 
-    token = ""
-    length = len(line)
-    for (index, ch) in enumerate(line):
+def _check_references(arguments: list, contracts: list, deployers: set):
+    for label in referenced_labels(arguments):
+        if "@" in label:
+            (label, deployer) = label.split("@", 1)
+            if deployer not in deployers:
+                raise ValueError(
+                    f"deployer `{deployer}` needs to be declared before `${label}@{deployer}`"
+                )
+        _check_label(label, contracts)
 
-        if close_skip == NO_SKIP and ch == '"':
-            close_skip = ch
-        if close_skip == NO_SKIP and ch == ignore[0]:
-            close_skip = ignore[1]
-        elif ch == close_skip:
-            close_skip = NO_SKIP
 
-        if ch == delim and close_skip == NO_SKIP:
-            tokens.append(token)
-            token = ""
-        else:
-            token += ch
+def _check_functions(plan: dict, read_only: bool = False):
+    """
+    Checks the bare function names of every send, and their argument counts, against the
+    ABIs found in `out/`.
+    Contracts without a built artifact are left for forge to compile and `send` to check.
+    The ABI index is saved for the next runs, unless `read_only`.
+    """
+    contract_paths = {contract[0]: contract[1] for contract in plan["contracts"]}
+
+    sends = []
+    for step in plan["steps"]:
+        if step["kind"] == "use":
+            for (action, contract_label, arguments) in step["path"]:
+                if action in Deployer.SENDS and "(" not in arguments[0]:
+                    contract_path = contract_paths[contract_label]
+                    if contract_path == "":
+                        raise ValueError(
+                            f"{contract_label} has no contract specified, so you need to specify the function signature"
+                        )
+                    if os.path.exists(artifact_path(contract_path)):
+                        sends.append((contract_path, arguments[0], len(arguments) - 1))
+
+    index = get_index()
+    entries = index.load_many(list(set([send[0] for send in sends])))
+    if not read_only:
+        index.save()
+    for (contract_path, function_name, count) in sends:
+        functions = entries[contract_path]["functions"]
+        if function_name not in functions:
+            raise ValueError(f"{function_name} does not exist in {contract_path}")
+        # Overloads with the same count are told apart by the resolved arguments, see `send`
+        counts = sorted(
+            set([len(overload["inputs"]) for overload in functions[function_name]])
+        )
+        if count not in counts:
+            raise ValueError(
+                f"{function_name} of {contract_path} takes {' or '.join(map(str, counts))} arguments, got {count}"
+            )
 
-        if index == length - 1:
-            tokens.append(token)
 
-    return tokens
+def _is_signer(signer: str, signers: set) -> bool:
+    return (
+        signer in SECTION_DEPLOYER_SIGNERS
+        or signer in signers
+        or signer.startswith("0x")
+    )
+
+
+def _remove_field(field: str, missing_fields: list):
+    try:
+        missing_fields.remove(field)
+    except:
+        pass
+    return missing_fields
 
 
 #####################
@@ -136,28 +185,42 @@ def signer_from_context(context: dict):
     return Signer(pub, KeyKind.PRIVATE, context[SECTION_SIGNER_PRIV])
 
 
-def deployer_from_context(context: dict, contracts: list, name: str):
-
-    signer = context[SECTION_DEPLOYER_SIGNER]
-
+def _signer_from_name(signer: str) -> Signer:
     if type(signer) == str and signer.startswith("0x"):
-        signer = Signer("", KeyKind.PRIVATE, signer)
+        return Signer("", KeyKind.PRIVATE, signer)
     elif "ledger" == signer:
-        signer = Signer("", KeyKind.LEDGER)
+        return Signer("", KeyKind.LEDGER)
     elif "trezor" == signer:
-        signer = Signer("", KeyKind.TREZOR)
+        return Signer("", KeyKind.TREZOR)
     elif "ganache" == signer:
-        signer = TEST_SIGNER
-    else:
-        signer = SIGNERS[signer]
+        return TEST_SIGNER
+    return SIGNERS[signer]
+
+
+def deployer_from_context(
+    context: dict, contracts: list, name: str, read_only: bool = False
+):
 
-    network = context[SECTION_DEPLOYER_NETWORK]
-    if network.startswith("http"):
-        network = f"--rpc-url {network}"
+    signer = _signer_from_name(context[SECTION_DEPLOYER_SIGNER])
+
+    urls = [
+        Network.networks.get(network, network).replace("--rpc-url", "").strip()
+        for network in context[SECTION_DEPLOYER_NETWORK].split()
+    ]
+    if len(urls) == 1 and context[SECTION_DEPLOYER_NETWORK] in Network.networks:
+        network = Network.networks[context[SECTION_DEPLOYER_NETWORK]]
     else:
-        network = Network.networks[network]
+        network = "--rpc-url " + " ".join(dict.fromkeys(urls))
+
+    backend = default_backend(
+        signer, native=(SECTION_DEPLOYER_NATIVE in context)
+    )  # signs private key transactions in-process instead of calling forge/cast
+    session = get_session()
+    if session is not None:
+        # Records the backend's results, or answers from a recording instead (see `replay`)
+        backend = session.wrap(backend)
 
-    return Deployer(
+    deployer = Deployer(
         network,
         signer,
         contracts,
@@ -169,7 +232,35 @@ def deployer_from_context(context: dict, contracts: list, name: str):
             SECTION_DEPLOYER_NO_CACHE in context
         ),  # todo if True, prints the calling commands and raw output
         name=name,
+        workers=context.get(SECTION_DEPLOYER_WORKERS, 1),
+        addresses=None if SECTION_DEPLOYER_SCOPED in context else ADDRESSES,
+        scoped=(SECTION_DEPLOYER_SCOPED in context),
+        peers=DEPLOYERS,
+        batch=context.get(SECTION_DEPLOYER_BATCH, 0),
+        batch_gas=context.get(SECTION_DEPLOYER_BATCH_GAS, 0),
+        pipeline=(
+            SECTION_DEPLOYER_PIPELINE in context
+        ),  # submits sends without waiting for them to be mined
+        create2=context.get(SECTION_DEPLOYER_CREATE2),
+        timeout=context.get(SECTION_DEPLOYER_TIMEOUT, 0),
+        retries=context.get(SECTION_DEPLOYER_RETRIES, 3),
+        pin_nonces=(SECTION_DEPLOYER_PIN_NONCES in context),
+        rate=context.get(SECTION_DEPLOYER_RATE, 0),
+        fee_cache=context.get(SECTION_DEPLOYER_FEE_CACHE, False),
+        fee_bump=context.get(SECTION_DEPLOYER_FEE_BUMP, 0),
+        max_fee=context.get(SECTION_DEPLOYER_MAX_FEE),
+        signers=[
+            _signer_from_name(pooled)
+            for pooled in context.get(SECTION_DEPLOYER_SIGNER_POOL, [])
+        ],
+        signer_policy=context.get(SECTION_DEPLOYER_SIGNER_POLICY, "round_robin"),
+        backend=backend,
+        store=session.store if session is not None else None,
+        read_only=read_only,
     )
+    if session is not None:
+        session.started(deployer)
+    return deployer
 
 
 #####################
@@ -177,12 +268,29 @@ def deployer_from_context(context: dict, contracts: list, name: str):
 #####################
 
 
-def parse(script: str):
-
-    next_section = 0
+def compile_script(script: str, read_only: bool = False) -> dict:
+    """
+    Parses and validates a whole script into a plan, without creating deployers or touching
+    the chain. The plan only holds JSON types, so it can be cached (see `load_plan`).
+    `read_only` doesn't save the ABI index either (see `_check_functions`).
+
+    Example:
+        {
+            "version": PLAN_VERSION,
+            "id": "name",
+            "contracts": [["FLY", "src/Fly.sol:Fly"], ...],
+            "steps": [
+                {"kind": "signer", "name": "mySigner", "context": {"private": "..."}},
+                {"kind": "deployer", "name": "my_deployer", "context": {"network": "local", ...}},
+                {"kind": "use", "deployer": "my_deployer", "path": [[Deployer.DEPLOY, "FLY", ["FLY", "FLY"]], ...]},
+            ],
+        }
+    """
 
-    context = {SECTION_DECLARATIONS: {}}
-    paths = []
+    context = {SECTION_DECLARATIONS: {}, SECTION_CONTRACTS: []}
+    steps = []
+    signers = set()
+    deployers = set()
     missing_fields = []
 
     current_section = ""
@@ -190,20 +298,38 @@ def parse(script: str):
     current_deployer = ""
     current_path = []
 
-    lines = script.split("\n")
-    num_lines = len(lines)
-    for (linenu, line) in enumerate(lines):
-        linenu += 1
+    def close_section():
+        if current_section == SECTION_SIGNER:
+            steps.append(
+                {
+                    "kind": "signer",
+                    "name": current_section_name,
+                    "context": context[SECTION_SIGNER][current_section_name],
+                }
+            )
+            signers.add(current_section_name)
+
+        elif current_section == SECTION_DEPLOYER:
+            steps.append(
+                {
+                    "kind": "deployer",
+                    "name": current_section_name,
+                    "context": context[SECTION_DEPLOYER][current_section_name],
+                }
+            )
+            deployers.add(current_section_name)
+
+        elif current_section == SECTION_PATH and len(current_path) > 0:
+            steps.append(
+                {"kind": "use", "deployer": current_deployer, "path": current_path}
+            )
+
+    # Blank and comment lines are already skipped by the lexer
+    for lexed in lex(script):
+        linenu = lexed.number
+        line = lexed.text
+        tokens = list(lexed.tokens)
         try:
-            line = line.strip()
-
-            _sharing_is_caring()
-
-            # Skip if comment or line is empty
-            if len(line) == 0 or line.startswith("#"):
-                continue
-
-            tokens = tokenize(line)
 
             # Is it the beginning of a section
             if line.startswith("."):
@@ -214,22 +340,8 @@ def parse(script: str):
 
                 section = tokens[0]
                 if section in SECTIONS:
-                    if current_section == SECTION_SIGNER:
-                        SIGNERS[current_section_name] = signer_from_context(
-                            context[SECTION_SIGNER][current_section_name]
-                        )
-
-                    elif current_section == SECTION_DEPLOYER:
-                        DEPLOYERS[current_section_name] = deployer_from_context(
-                            context[SECTION_DEPLOYER][current_section_name],
-                            context[SECTION_CONTRACTS],
-                            current_section_name,
-                        )
-
-                    elif current_section == SECTION_PATH:
-                        current_deployer.path(current_path)
-                        current_path = []
-
+                    close_section()
+                    current_path = []
                     current_section = section
                 else:
                     raise ValueError(
@@ -256,10 +368,7 @@ def parse(script: str):
                         "All contracts need to be declared before any deployer is declared."
                     )
 
-                if line.startswith(SECTION_CONTRACTS):
-                    if SECTION_CONTRACTS not in context:
-                        context[SECTION_CONTRACTS] = []
-                else:
+                if not line.startswith(SECTION_CONTRACTS):
                     num_tokens = len(tokens)
                     if num_tokens < 2 or num_tokens > 3:
                         raise ValueError(
@@ -288,7 +397,7 @@ def parse(script: str):
                     if SECTION_SIGNER not in context:
                         context[SECTION_SIGNER] = {}
 
-                    missing_fields = SECTION_SIGNER_REQUIRED
+                    missing_fields = list(SECTION_SIGNER_REQUIRED)
                     current_section_name = _name_check(current_section, tokens)
                     context[SECTION_SIGNER][current_section_name] = {}
 
@@ -315,7 +424,7 @@ def parse(script: str):
                 # network local | avax | fuji | http...
                 # signer local | test | trezor | ledger
                 # legacy
-                if SECTION_CONTRACTS not in context:
+                if len(context[SECTION_CONTRACTS]) == 0:
                     raise ValueError(
                         "You need to declare contracts before declaring a deployer."
                     )
@@ -324,7 +433,7 @@ def parse(script: str):
                     if SECTION_DEPLOYER not in context:
                         context[SECTION_DEPLOYER] = {}
 
-                    missing_fields = SECTION_DEPLOYER_REQUIRED
+                    missing_fields = list(SECTION_DEPLOYER_REQUIRED)
                     current_section_name = _name_check(current_section, tokens)
                     context[SECTION_DEPLOYER][current_section_name] = {}
                 elif line.startswith(SECTION_DEPLOYER_NO_CACHE):
@@ -335,26 +444,70 @@ def parse(script: str):
                     context[SECTION_DEPLOYER][current_section_name][
                         SECTION_DEPLOYER_DEBUG
                     ] = True
+                elif line.startswith(SECTION_DEPLOYER_NATIVE):
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_NATIVE
+                    ] = True
+                elif line.startswith(SECTION_DEPLOYER_CREATE2):
+                    # optional salt prefix, `create2 v2` moves every label to a new address
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_CREATE2
+                    ] = " ".join(tokens[1:])
+                elif line.startswith(SECTION_DEPLOYER_PIPELINE):
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_PIPELINE
+                    ] = True
+                elif line.startswith(SECTION_DEPLOYER_PIN_NONCES):
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_PIN_NONCES
+                    ] = True
+                elif line.startswith(SECTION_DEPLOYER_SCOPED):
+                    # keeps its own addresses, referenced by the others as `$LABEL@deployer`
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_SCOPED
+                    ] = True
                 elif line.startswith(SECTION_DEPLOYER_NETWORK):
-                    network = tokens[1]
-                    if network in SECTION_DEPLOYER_NETWORKS or network.startswith(
-                        "http"
-                    ):
-                        context[SECTION_DEPLOYER][current_section_name][
-                            SECTION_DEPLOYER_NETWORK
-                        ] = network
-                    else:
+                    # several networks/URLs make a pool of endpoints of the same chain
+                    _name_check(SECTION_DEPLOYER_NETWORK, tokens, "value")
+                    for network in tokens[1:]:
+                        if not (
+                            network in SECTION_DEPLOYER_NETWORKS
+                            or network.startswith("http")
+                        ):
+                            raise ValueError(
+                                f"network `{network}` not supported at deployer `{current_section_name}`"
+                            )
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_NETWORK
+                    ] = " ".join(tokens[1:])
+
+                elif line.startswith(SECTION_DEPLOYER_SIGNER_POLICY):
+                    policy = _name_check(
+                        SECTION_DEPLOYER_SIGNER_POLICY, tokens, "value"
+                    )
+                    if policy not in SECTION_DEPLOYER_SIGNER_POLICIES:
                         raise ValueError(
-                            f"network `{network}` not supported at deployer `{current_section_name}`"
+                            f"signer_policy should be one of {SECTION_DEPLOYER_SIGNER_POLICIES} at deployer `{current_section_name}`"
                         )
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_SIGNER_POLICY
+                    ] = policy
+
+                elif line.startswith(SECTION_DEPLOYER_SIGNER_POOL):
+                    # signers used for sends besides `signer`, eg. `signers alice bob`
+                    _name_check(SECTION_DEPLOYER_SIGNER_POOL, tokens, "value")
+                    for signer in tokens[1:]:
+                        if not _is_signer(signer, signers):
+                            raise ValueError(
+                                f"signer `{signer}` not supported or found at deployer `{current_section_name}`"
+                            )
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_SIGNER_POOL
+                    ] = list(dict.fromkeys(tokens[1:]))
 
                 elif line.startswith(SECTION_DEPLOYER_SIGNER):
                     signer = tokens[1]
-                    if (
-                        signer in SECTION_DEPLOYER_SIGNERS
-                        or signer in SIGNERS
-                        or signer.startswith("0x")
-                    ):
+                    if _is_signer(signer, signers):
                         context[SECTION_DEPLOYER][current_section_name][
                             SECTION_DEPLOYER_SIGNER
                         ] = signer
@@ -368,6 +521,99 @@ def parse(script: str):
                         SECTION_DEPLOYER_LEGACY
                     ] = True
 
+                elif line.startswith(SECTION_DEPLOYER_BATCH_GAS):
+                    batch_gas = _name_check(SECTION_DEPLOYER_BATCH_GAS, tokens, "value")
+                    if not batch_gas.isdigit() or int(batch_gas) < 1:
+                        raise ValueError(
+                            f"batch_gas should be a positive number at deployer `{current_section_name}`"
+                        )
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_BATCH_GAS
+                    ] = int(batch_gas)
+
+                elif line.startswith(SECTION_DEPLOYER_BATCH):
+                    batch = _name_check(SECTION_DEPLOYER_BATCH, tokens, "value")
+                    if not batch.isdigit() or int(batch) < 2:
+                        raise ValueError(
+                            f"batch should be a number of calls (2 or more) at deployer `{current_section_name}`"
+                        )
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_BATCH
+                    ] = int(batch)
+
+                elif line.startswith(SECTION_DEPLOYER_TIMEOUT):
+                    timeout = _name_check(SECTION_DEPLOYER_TIMEOUT, tokens, "value")
+                    if not timeout.isdigit() or int(timeout) < 1:
+                        raise ValueError(
+                            f"timeout should be a number of seconds at deployer `{current_section_name}`"
+                        )
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_TIMEOUT
+                    ] = int(timeout)
+
+                elif line.startswith(SECTION_DEPLOYER_RETRIES):
+                    retries = _name_check(SECTION_DEPLOYER_RETRIES, tokens, "value")
+                    if not retries.isdigit():
+                        raise ValueError(
+                            f"retries should be a number (0 or more) at deployer `{current_section_name}`"
+                        )
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_RETRIES
+                    ] = int(retries)
+
+                elif line.startswith(SECTION_DEPLOYER_RATE):
+                    rate = _name_check(SECTION_DEPLOYER_RATE, tokens, "value")
+                    try:
+                        rate = float(rate)
+                    except ValueError:
+                        rate = 0
+                    if rate <= 0:
+                        raise ValueError(
+                            f"rate should be a positive number of requests per second at deployer `{current_section_name}`"
+                        )
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_RATE
+                    ] = rate
+
+                elif line.startswith(SECTION_DEPLOYER_FEE_CACHE):
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_FEE_CACHE
+                    ] = True
+
+                elif line.startswith(SECTION_DEPLOYER_FEE_BUMP):
+                    fee_bump = _name_check(SECTION_DEPLOYER_FEE_BUMP, tokens, "value")
+                    if not fee_bump.isdigit():
+                        raise ValueError(
+                            f"fee_bump should be a percentage (0 or more) at deployer `{current_section_name}`"
+                        )
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_FEE_BUMP
+                    ] = int(fee_bump)
+
+                elif line.startswith(SECTION_DEPLOYER_MAX_FEE):
+                    max_fee = _name_check(SECTION_DEPLOYER_MAX_FEE, tokens, "value")
+                    try:
+                        max_fee = parse_amount(max_fee)
+                    except (ValueError, ArithmeticError):
+                        max_fee = 0
+                    if max_fee <= 0:
+                        raise ValueError(
+                            f"max_fee should be a positive amount (eg. `100gwei`) at deployer `{current_section_name}`"
+                        )
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_MAX_FEE
+                    ] = max_fee
+
+                elif line.startswith(SECTION_DEPLOYER_WORKERS):
+                    workers = _name_check(SECTION_DEPLOYER_WORKERS, tokens, "value")
+                    if not workers.isdigit() or int(workers) < 1:
+                        raise ValueError(
+                            f"workers should be a positive number at deployer `{current_section_name}`"
+                        )
+                    context[SECTION_DEPLOYER][current_section_name][
+                        SECTION_DEPLOYER_WORKERS
+                    ] = int(workers)
+
                 else:
                     raise ValueError(
                         f"error at line({linenu}) | section: {current_section} "
@@ -398,17 +644,15 @@ def parse(script: str):
 
             elif current_section == SECTION_PATH:
 
-                if DEPLOYERS.keys() == []:
-                    raise ValueError(f"you need a deployer for .use")
-
                 if line.startswith(SECTION_PATH):
-                    if SECTION_PATH not in context:
-                        context[SECTION_PATH] = {}
-
                     deployer_name = _name_check(
                         current_section, tokens, "deployer name"
                     )
-                    current_deployer = DEPLOYERS[deployer_name]
+                    if deployer_name not in deployers:
+                        raise ValueError(
+                            f"deployer `{deployer_name}` needs to be declared before `.use`"
+                        )
+                    current_deployer = deployer_name
                 else:
                     action = tokens[0]
                     if action == SECTION_PATH_SKIP0:
@@ -419,6 +663,7 @@ def parse(script: str):
                         continue
 
                     contract_label = tokens[1]
+                    _check_label(contract_label, context[SECTION_CONTRACTS])
 
                     if line.startswith(SECTION_PATH_DEPLOY):
                         if len(tokens) != 3:
@@ -428,30 +673,263 @@ def parse(script: str):
                         arguments = _load_arguments(
                             False, tokens[2], context[SECTION_DECLARATIONS]
                         )
+                        _check_deploy(contract_label, context[SECTION_CONTRACTS])
+                        _check_references(
+                            arguments, context[SECTION_CONTRACTS], deployers
+                        )
                         current_path.append(
                             (Deployer.DEPLOY, contract_label, arguments)
                         )
                     elif line.startswith(SECTION_PATH_SEND):
-                        arguments = tokenize(
-                            line.split(tokens[0] + " " + tokens[1])[1].strip()
-                        )
+                        markers = set()
+                        while tokens[-1] in SECTION_PATH_SEND_MARKERS:
+                            markers.add(tokens.pop())
+                        always = SECTION_PATH_ALWAYS in markers
+                        if SECTION_PATH_PINNED in markers:
+                            send_action = (
+                                Deployer.SEND_ALWAYS_PINNED
+                                if always
+                                else Deployer.SEND_PINNED
+                            )
+                        else:
+                            send_action = (
+                                Deployer.SEND_ALWAYS if always else Deployer.SEND
+                            )
+
                         arguments = _load_arguments(
-                            True, arguments, context[SECTION_DECLARATIONS]
+                            True, tokens[2:], context[SECTION_DECLARATIONS]
+                        )
+                        _check_references(
+                            arguments[1:], context[SECTION_CONTRACTS], deployers
                         )
-                        current_path.append((Deployer.SEND, contract_label, arguments))
+                        current_path.append((send_action, contract_label, arguments))
                     else:
                         raise ValueError(
                             f"error at line({linenu}) | section: {current_section} "
                         )
         except Exception as e:
-            if linenu != num_lines:
-                raise ValueError(f"\nline:{linenu}\n{line}\n{e}")
-            raise ValueError(f"\n{e}")
+            raise ValueError(f"\nline:{linenu}\n{line}\n{e}")
+
+    close_section()
+
+    plan = {
+        "version": PLAN_VERSION,
+        "id": context.get(SECTION_ID, ""),
+        "contracts": context[SECTION_CONTRACTS],
+        "steps": steps,
+    }
+    _check_functions(plan, read_only)
+    return plan
+
+
+def _nonce_key(signer: str, signers: dict, network: str) -> str:
+    if signer in signers:
+        signer = signers[signer][SECTION_SIGNER_PRIV]
+    elif signer == "ganache":
+        signer = TEST_SIGNER.key_argument
+
+    if signer in ("ledger", "trezor"):
+        return f"@signer {signer}"
+    if signer.startswith("0x"):
+        signer = signer[2:]
+    return f"@signer {signer.lower()}@{network}"
+
+
+def _use_graph_step(step: dict, index: int, plan: dict) -> tuple:
+    """
+    Describes a `.use` step for `scheduler.build_graph`: it writes the labels it deploys or
+    sends to, its deployer and the nonces of its signers (`signer` and `signers`) on its
+    network (a hardware wallet on any network), and reads the `$LABEL`s of its arguments.
+    Labels of the shared registry are shared by every deployer, the ones of `scoped`
+    deployers are qualified by their deployer (see `scheduler.qualified`).
+
+    Example:
+        (0, ("@deployer fuji", "@signer 0x..@https://..", "FLY", "POND"), ["$FLY", "$POND@avax"])
+    """
+    signers = {s["name"]: s["context"] for s in plan["steps"] if s["kind"] == "signer"}
+    scoped = [
+        s["name"]
+        for s in plan["steps"]
+        if s["kind"] == "deployer" and SECTION_DEPLOYER_SCOPED in s["context"]
+    ]
+    context = [
+        s["context"]
+        for s in plan["steps"]
+        if s["kind"] == "deployer" and s["name"] == step["deployer"]
+    ][-1]
+
+    # A pool is identified by its first endpoint
+    network = context[SECTION_DEPLOYER_NETWORK].split()[0]
+    network = Network.networks.get(network, network).replace("--rpc-url", "").strip()
+    nonces = [
+        _nonce_key(signer, signers, network)
+        for signer in [context[SECTION_DEPLOYER_SIGNER]]
+        + context.get(SECTION_DEPLOYER_SIGNER_POOL, [])
+    ]
+
+    actions = [
+        (action, contract_label, arguments)
+        for (action, contract_label, arguments) in step["path"]
+        if action not in (Deployer.SKIP_START, Deployer.SKIP_END)
+    ]
+    writes = [f"@deployer {step['deployer']}"] + nonces
+    writes += [
+        qualified(contract_label, step["deployer"], scoped)
+        for (_, contract_label, _) in actions
+    ]
+    reads = referenced_labels([arguments for (_, _, arguments) in actions])
+    return (
+        index,
+        tuple(dict.fromkeys(writes)),
+        ["$" + qualified(label, step["deployer"], scoped) for label in sorted(reads)],
+    )
+
+
+def _run_use(step: dict, prefix: str):
+    path = [tuple(action) for action in step["path"]]
+    with _prefixed(prefix), span("use", deployer=step["deployer"]):
+        try:
+            DEPLOYERS[step["deployer"]].path(path)
+        except Exception as e:
+            _info(path)
+            _event("error", deployer=step["deployer"], message=str(e))
+            raise ValueError(f"##\n.use {step['deployer']}\nerror:\n{e}")
+
+
+def execute(plan: dict):
+    """
+    Creates the signers and deployers of a plan, then runs its `.use` paths.
+
+    Paths run concurrently unless they share a deployer, a signer on the same network or a
+    contract label: a path deploying, sending to or referencing a label waits for the earlier
+    paths deploying or sending to it, so cross deployer `$LABEL` arguments resolve (see
+    `_use_graph_step`). The labels of `scoped` deployers are only shared as `$LABEL@deployer`.
+    Log lines are prefixed with the name of the path's deployer.
+    """
+    uses = []
+    for step in plan["steps"]:
+        if step["kind"] == "signer":
+            SIGNERS[step["name"]] = signer_from_context(step["context"])
+
+        elif step["kind"] == "deployer":
+            DEPLOYERS[step["name"]] = deployer_from_context(
+                step["context"], plan["contracts"], step["name"]
+            )
+
+        elif step["kind"] == "use":
+            uses.append(step)
+
+    if len(uses) == 0:
+        return
+
+    def run(index: int, _writes: tuple, _reads: list):
+        step = uses[index]
+        _run_use(step, f"[{step['deployer']}] ")
+
+    run_graph(
+        [_use_graph_step(step, index, plan) for (index, step) in enumerate(uses)],
+        run,
+        len(uses),
+    )
+
+
+def _map_keys(plan: dict, convert) -> dict:
+    """
+    A copy of `plan` with `convert` applied to its private keys: the signers' ones and the
+    `0x..` keys given as a deployer's `signer`/`signers`.
+    """
+
+    def key(value) -> bool:
+        return isinstance(value, dict) or value.startswith("0x")
+
+    steps = []
+    for step in plan["steps"]:
+        context = step.get("context")
+        if step["kind"] == "signer":
+            context = dict(context)
+            context[SECTION_SIGNER_PRIV] = convert(context[SECTION_SIGNER_PRIV])
+        elif step["kind"] == "deployer":
+            context = dict(context)
+            if key(context[SECTION_DEPLOYER_SIGNER]):
+                context[SECTION_DEPLOYER_SIGNER] = convert(
+                    context[SECTION_DEPLOYER_SIGNER]
+                )
+            if SECTION_DEPLOYER_SIGNER_POOL in context:
+                context[SECTION_DEPLOYER_SIGNER_POOL] = [
+                    convert(signer) if key(signer) else signer
+                    for signer in context[SECTION_DEPLOYER_SIGNER_POOL]
+                ]
+        steps.append(dict(step, context=context) if context is not None else step)
+    return dict(plan, steps=steps)
+
+
+def _from_script(script: str, ref: dict) -> str:
+    (offset, length) = ref["script"]
+    return script[offset : offset + length]
+
+
+def _prune_plans(cache_path: str):
+    plans = [
+        os.path.join(cache_path, name)
+        for name in os.listdir(cache_path)
+        if name.startswith("plan_") and name.endswith(".json")
+    ]
+    plans.sort(key=os.path.getmtime, reverse=True)
+    for plan_path in plans[PLAN_CACHE_SIZE:]:
+        try:
+            os.remove(plan_path)
+        except FileNotFoundError:
+            pass
+
+
+def load_plan(script: str, cache_path: str = "cache", read_only: bool = False) -> dict:
+    """
+    Returns the plan of a script, compiling it only if it isn't cached at
+    `cache/plan_<sha256>.json` yet. Only the `PLAN_CACHE_SIZE` plans used last are kept.
+
+    A cached plan has its function names checked again, against the current artifacts. It
+    holds no private key, only where each one is in the script: `{"script": [offset, length]}`.
+
+    `read_only` (`--plan`) uses a cached plan, but writes nothing to `cache_path`: neither the
+    plan, nor the ABI index, nor a cached plan's last use.
+    """
+    digest = hashlib.sha256(f"{PLAN_VERSION}{script}".encode()).hexdigest()[:16]
+    plan_path = f"{cache_path}/plan_{digest}.json"
 
     try:
-        if current_section == SECTION_PATH:
-            if type(current_deployer) != str and len(current_path) > 0:
-                current_deployer.path(current_path)
-    except Exception as e:
-        _info(current_path)
-        raise ValueError(f"##\nerror:\n{e}")
+        with open(plan_path) as f:
+            plan = json.load(f)
+    except (FileNotFoundError, ValueError):
+        plan = None
+
+    if plan is not None:
+        if not read_only:
+            os.utime(plan_path)
+        with span("check"):
+            _check_functions(plan, read_only)
+        return _map_keys(plan, lambda ref: _from_script(script, ref))
+
+    with span("parse"):
+        plan = compile_script(script, read_only)
+    if read_only:
+        return plan
+
+    keys = []
+    _map_keys(plan, keys.append)
+    # Every key is written as is in the script, which the plan is only cached for
+    if all([key in script for key in keys]):
+        cached = _map_keys(plan, lambda key: {"script": [script.index(key), len(key)]})
+        os.makedirs(cache_path, exist_ok=True)
+        tmp_path = f"{plan_path}.{os.getpid()}.tmp"
+        with open(
+            os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w"
+        ) as f:
+            json.dump(cached, f)
+        os.replace(tmp_path, plan_path)
+        _prune_plans(cache_path)
+
+    return plan
+
+
+def parse(script: str):
+    execute(load_plan(script))
@@ -0,0 +1,289 @@
+import threading, time
+from .rpc import RpcError
+from .log import _info
+from .trace import span
+
+NONCE_ERRORS = [
+    "nonce too low",
+    "nonce too high",
+    "invalid nonce",
+    "already known",
+    "replacement transaction underpriced",
+]
+
+
+def is_nonce_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any([known in message for known in NONCE_ERRORS])
+
+
+def address_mismatches(client, deployments: list) -> list:
+    """
+    Checks predicted deploy addresses against their mined receipts, returns
+    `[(receipt, message), ...]` for every mismatch.
+
+    Example:
+        deployments = [
+            # (description, receipt, {"address": predicted address, "create2": bool})
+            ("src/Fly.sol:Fly", {"contractAddress": "0x..", ...}, {"address": "0x..", "create2": False}),
+        ]
+
+    CREATE receipts carry the address. CREATE2 factory calls don't, so the predicted address
+    has to hold code instead.
+    """
+    mismatches = []
+    code_checks = []
+    for (description, receipt, expected) in deployments:
+        deployed_at = receipt.get("contractAddress") or ""
+        if expected["create2"]:
+            code_checks.append((description, receipt, expected["address"]))
+        elif deployed_at.lower() != expected["address"].lower():
+            mismatches.append(
+                (
+                    receipt,
+                    f"{description}: predicted {expected['address']}, deployed at {deployed_at}",
+                )
+            )
+
+    codes = client.batch(
+        [("eth_getCode", [address, "latest"]) for (_, _, address) in code_checks]
+    )
+    for ((description, receipt, address), code) in zip(code_checks, codes):
+        if isinstance(code, RpcError) or code in (None, "0x"):
+            mismatches.append(
+                (receipt, f"{description}: predicted {address}, which has no code")
+            )
+    return mismatches
+
+
+def check_addresses(client, deployments: list):
+    """
+    Raises listing every predicted deploy address that doesn't match its receipt, see
+    `address_mismatches`.
+    """
+    mismatches = address_mismatches(client, deployments)
+    if len(mismatches) > 0:
+        raise ValueError(
+            "deployed addresses don't match:\n"
+            + "\n".join([message for (_, message) in mismatches])
+        )
+
+
+class NonceManager:
+    """
+    Hands out consecutive nonces of one sender without asking the node for every transaction.
+    Synced from `eth_getTransactionCount(sender, "pending")` on first use and on `resync()`,
+    after a rejected or failed submission left a gap.
+    """
+
+    def __init__(self, client, sender: str):
+        self.client = client
+        self.sender = sender
+        self._nonce = None
+        self._lock = threading.Lock()
+
+    def next(self) -> int:
+        with self._lock:
+            if self._nonce is None:
+                self._nonce = self._pending_count()
+            nonce = self._nonce
+            self._nonce += 1
+            return nonce
+
+    def is_used(self, nonce: int) -> bool:
+        """
+        Whether a transaction with `nonce` reached the node, eg. before its command failed.
+        """
+        return self._pending_count() > nonce
+
+    def resync(self) -> int:
+        with self._lock:
+            self._nonce = self._pending_count()
+            return self._nonce
+
+    def _pending_count(self) -> int:
+        return int(
+            self.client.call("eth_getTransactionCount", [self.sender, "pending"]), 16
+        )
+
+
+_NONCES = {}
+_NONCES_LOCK = threading.Lock()
+
+
+def get_nonce_manager(client, sender: str) -> NonceManager:
+    """
+    Returns the nonce manager of `sender` on the client's endpoint, shared by every deployer
+    using that signer.
+    """
+    key = (client.url, sender.lower())
+    with _NONCES_LOCK:
+        if key not in _NONCES:
+            _NONCES[key] = NonceManager(client, sender)
+        return _NONCES[key]
+
+
+class ReceiptCollector:
+    """
+    Transactions submitted without waiting for them to be mined, whose receipts are fetched
+    in bulk (one JSON-RPC batch per poll) by `collect()`.
+
+    Transactions the node no longer knows about are resubmitted from their signed bytes, with
+    the same nonce, so a dropped one never leaves a gap blocking the ones after it.
+    """
+
+    def __init__(
+        self,
+        client,
+        poll_interval: float = 0.5,
+        receipt_timeout: float = 300,
+        resubmit_after: float = 10,
+    ):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.receipt_timeout = receipt_timeout
+        self.resubmit_after = resubmit_after
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def is_pending(self, tx_hash: str) -> bool:
+        with self._lock:
+            return tx_hash in self._pending
+
+    def add(
+        self, tx_hash: str, description: str, raw: bytes = None, expected: dict = None
+    ):
+        """
+        `raw` are the signed transaction bytes, needed to resubmit it if dropped. `expected`
+        is the predicted address of a deploy (see `check_addresses`).
+        """
+        with self._lock:
+            self._pending[tx_hash] = {
+                "description": description,
+                "raw": raw,
+                "expected": expected,
+            }
+
+    def _resubmit(self, tx_hash: str):
+        pending = self._pending[tx_hash]
+        if pending["raw"] is None:
+            return
+
+        _info(f"Resubmitting dropped transaction {tx_hash} | {pending['description']}")
+        try:
+            self.client.call("eth_sendRawTransaction", ["0x" + pending["raw"].hex()])
+        except RpcError as e:
+            if "already known" in str(e).lower():
+                return
+            raise ValueError(
+                f"{pending['description']} ({tx_hash}) was dropped and can't be resubmitted: {e}"
+            )
+
+    def collect(self, confirmed=None) -> dict:
+        """
+        Waits for every pending transaction and returns `{tx_hash: receipt}`. Raises listing
+        every reverted transaction, or every deploy that didn't land at its predicted address.
+
+        `confirmed(tx_hash)` is called for every transaction mined successfully (and at its
+        predicted address), also when others failed or timed out: only those can be taken as
+        done by the next run.
+        """
+        with self._lock:
+            pending = dict(self._pending)
+        if len(pending) == 0:
+            return {}
+
+        _info(f"# Collecting {len(pending)} receipts")
+
+        receipts = {}
+        try:
+            self._wait(pending, receipts)
+        except (RpcError, ValueError):
+            # The transactions mined before the failure are done all the same
+            self._check(pending, receipts, confirmed)
+            raise
+        self._check(pending, receipts, confirmed)
+        return receipts
+
+    def _wait(self, pending: dict, receipts: dict):
+        """
+        Fills `receipts` until every pending transaction has one, or raises on timeout.
+        """
+        with span("receipt wait", transactions=len(pending)):
+            waiting = list(pending)
+            interval = self.poll_interval
+            started = time.monotonic()
+            next_drop_check = started + self.resubmit_after
+            while True:
+                results = self.client.batch(
+                    [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in waiting]
+                )
+                for (tx_hash, receipt) in zip(waiting, results):
+                    if isinstance(receipt, RpcError):
+                        raise receipt
+                    if receipt is not None:
+                        receipts[tx_hash] = receipt
+                waiting = [tx_hash for tx_hash in waiting if tx_hash not in receipts]
+
+                if len(waiting) == 0:
+                    break
+                if time.monotonic() - started > self.receipt_timeout:
+                    raise RpcError(f"timed out waiting for the receipts of {waiting}")
+
+                if time.monotonic() > next_drop_check:
+                    known = self.client.batch(
+                        [("eth_getTransactionByHash", [tx_hash]) for tx_hash in waiting]
+                    )
+                    for (tx_hash, tx) in zip(waiting, known):
+                        if tx is None:
+                            self._resubmit(tx_hash)
+                    next_drop_check = time.monotonic() + self.resubmit_after
+
+                time.sleep(interval)
+                interval = min(interval * 2, 2)
+
+    def _check(self, pending: dict, receipts: dict, confirmed):
+        with self._lock:
+            for tx_hash in receipts:
+                self._pending.pop(tx_hash, None)
+
+        reverted = [
+            tx_hash
+            for (tx_hash, receipt) in receipts.items()
+            if int(receipt["status"], 16) != 1
+        ]
+        mismatches = address_mismatches(
+            self.client,
+            [
+                (pending[tx_hash]["description"], receipt, pending[tx_hash]["expected"])
+                for (tx_hash, receipt) in receipts.items()
+                if pending[tx_hash]["expected"] is not None and tx_hash not in reverted
+            ],
+        )
+        failed = set(
+            reverted + [receipt["transactionHash"] for (receipt, _) in mismatches]
+        )
+
+        if confirmed is not None:
+            for tx_hash in receipts:
+                if tx_hash not in failed:
+                    confirmed(tx_hash)
+
+        if len(reverted) > 0:
+            raise ValueError(
+                "reverted transactions:\n"
+                + "\n".join(
+                    [
+                        f"{pending[tx_hash]['description']} ({tx_hash})"
+                        for tx_hash in reverted
+                    ]
+                )
+            )
+        if len(mismatches) > 0:
+            raise ValueError(
+                "deployed addresses don't match:\n"
+                + "\n".join([message for (_, message) in mismatches])
+            )
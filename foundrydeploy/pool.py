@@ -0,0 +1,240 @@
+import http.client, itertools, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from .rpc import RpcClient, RpcError
+from .retry import is_transient, backoff
+from .log import _info, _event
+
+# Methods any healthy endpoint can answer, spread over all of them. Everything else (eg.
+# `eth_sendRawTransaction`, `eth_estimateGas`) goes to the fastest one.
+READ_METHODS = set(
+    [
+        "eth_blockNumber",
+        "eth_chainId",
+        "eth_getBlockByNumber",
+        "eth_getCode",
+        "eth_getTransactionByHash",
+        "eth_getTransactionCount",
+        "eth_getTransactionReceipt",
+    ]
+)
+
+
+class Endpoint:
+    __slots__ = ("url", "client", "healthy", "latency", "block", "chain_id", "error")
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        # Failures move on to the next endpoint instead of being retried on the same one
+        self.client = RpcClient(url, timeout=timeout, retries=0)
+        self.healthy = False
+        self.latency = None
+        self.block = None
+        self.chain_id = None
+        self.error = "not checked yet"
+
+
+class PoolClient:
+    """
+    `RpcClient` over several endpoints of the same network, checked every `interval` seconds
+    in the background: an endpoint is healthy if it answers `eth_blockNumber`, on the same
+    chain as the others, at most `max_lag` blocks behind the highest one.
+
+    Reads (`READ_METHODS`) are spread over the healthy endpoints, the rest goes to the one with
+    the lowest latency. An endpoint failing a request is skipped until it passes a health
+    check again, and the request moves on to the next endpoint.
+
+    Example:
+        client = PoolClient(["https://rpc-1..", "https://rpc-2.."])
+        client.call("eth_getTransactionReceipt", ["0x.."])
+    """
+
+    def __init__(
+        self,
+        urls: list,
+        interval: float = 5,
+        max_lag: int = 3,
+        timeout: float = 30,
+        retries: int = 3,
+        check_timeout: float = 5,
+    ):
+        self.url = " ".join(urls)
+        self.endpoints = [Endpoint(url, timeout) for url in urls]
+        self.interval = interval
+        self.max_lag = max_lag
+        self.retries = retries
+        self.check_timeout = check_timeout
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self.check()
+        threading.Thread(target=self._check_forever, daemon=True).start()
+
+    @property
+    def timeout(self) -> float:
+        return self.endpoints[0].client.timeout
+
+    @timeout.setter
+    def timeout(self, timeout: float):
+        for endpoint in self.endpoints:
+            endpoint.client.timeout = timeout
+
+    ###########################
+    # Health checks
+    ###########################
+
+    def _probe(self, endpoint: Endpoint) -> tuple:
+        # Own client, so checks neither wait for the endpoint's requests nor hold them up
+        client = RpcClient(endpoint.url, timeout=self.check_timeout, retries=0)
+        calls = [("eth_blockNumber", [])]
+        if endpoint.chain_id is None:
+            calls.append(("eth_chainId", []))
+
+        start = time.perf_counter()
+        try:
+            results = client.batch(calls)
+        except (RpcError, http.client.HTTPException, OSError) as e:
+            return (None, None, None, str(e) or type(e).__name__)
+        finally:
+            client._close()
+        latency = time.perf_counter() - start
+
+        errors = [result for result in results if isinstance(result, RpcError)]
+        if len(errors) > 0:
+            return (None, None, None, str(errors[0]))
+        chain_id = int(results[1], 16) if len(results) > 1 else endpoint.chain_id
+        return (latency, int(results[0], 16), chain_id, None)
+
+    def check(self):
+        """
+        Checks every endpoint at once and updates their health.
+        """
+        with ThreadPoolExecutor(max_workers=len(self.endpoints)) as pool:
+            probes = list(pool.map(self._probe, self.endpoints))
+
+        answered = [probe for probe in probes if probe[3] is None]
+        head = max([probe[1] for probe in answered], default=0)
+        # The chain most endpoints are on, an endpoint on another one is never used
+        chain_ids = [probe[2] for probe in answered]
+        chain_id = max(set(chain_ids), key=chain_ids.count, default=None)
+
+        with self._lock:
+            for (endpoint, (latency, block, endpoint_chain, error)) in zip(
+                self.endpoints, probes
+            ):
+                if error is None and endpoint_chain != chain_id:
+                    error = f"on chain {endpoint_chain} instead of {chain_id}"
+                elif error is None and head - block > self.max_lag:
+                    error = f"{head - block} blocks behind"
+
+                if error is None:
+                    endpoint.chain_id = endpoint_chain
+                    endpoint.block = block
+                    # Smoothed, so a single slow answer doesn't reorder the endpoints
+                    endpoint.latency = (
+                        latency
+                        if endpoint.latency is None
+                        else 0.7 * endpoint.latency + 0.3 * latency
+                    )
+                self._set_health(endpoint, error)
+
+    def _check_forever(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def close(self):
+        self._stop.set()
+
+    def _set_health(self, endpoint: Endpoint, error: str):
+        healthy = error is None
+        if healthy != endpoint.healthy:
+            if healthy:
+                _info(f"# RPC {endpoint.url} is healthy")
+            else:
+                _info(f"# RPC {endpoint.url} is unhealthy: {error}")
+            _event(
+                "endpoint",
+                url=endpoint.url,
+                healthy=healthy,
+                latency=endpoint.latency,
+                block=endpoint.block,
+                error=error,
+            )
+        endpoint.healthy = healthy
+        endpoint.error = error
+
+    def mark_failed(self, url: str, error):
+        """
+        Skips an endpoint until it passes a health check again.
+        """
+        with self._lock:
+            for endpoint in self.endpoints:
+                if endpoint.url == url:
+                    self._set_health(endpoint, str(error))
+
+    ###########################
+    # Routing
+    ###########################
+
+    def fastest(self) -> list:
+        """
+        Healthy endpoints by latency, then the unhealthy ones (tried last, rather than failing
+        while the health checks haven't caught up).
+        """
+        with self._lock:
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+            unhealthy = [
+                endpoint for endpoint in self.endpoints if not endpoint.healthy
+            ]
+        return sorted(healthy, key=lambda endpoint: endpoint.latency) + unhealthy
+
+    def spread(self) -> list:
+        """
+        Healthy endpoints starting from the next one in turn, then the unhealthy ones.
+        """
+        with self._lock:
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+            unhealthy = [
+                endpoint for endpoint in self.endpoints if not endpoint.healthy
+            ]
+        if len(healthy) > 0:
+            turn = next(self._turn) % len(healthy)
+            healthy = healthy[turn:] + healthy[:turn]
+        return healthy + unhealthy
+
+    def best(self) -> str:
+        return self.fastest()[0].url
+
+    def _route(self, methods: list, send):
+        endpoints = self.spread() if set(methods) <= READ_METHODS else self.fastest()
+        for attempt in range(self.retries + 1):
+            for endpoint in endpoints:
+                try:
+                    return send(endpoint.client)
+                except (RpcError, http.client.HTTPException, OSError) as e:
+                    # Reverts and other answers of a working endpoint are the same anywhere
+                    if isinstance(e, RpcError) and not is_transient(e):
+                        raise
+                    if "nonce" in str(e).lower():
+                        raise
+                    self.mark_failed(endpoint.url, e)
+                    error = e
+
+            if attempt < self.retries:
+                delay = backoff(attempt)
+                _info(
+                    f"# Every RPC of {self.url} failed: {error}, retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+                endpoints = self.fastest()
+        raise error
+
+    def call(self, method: str, params: list = []):
+        return self._route([method], lambda client: client.call(method, params))
+
+    def batch(self, calls: list) -> list:
+        if len(calls) == 0:
+            return []
+        return self._route(
+            [method for (method, _) in calls], lambda client: client.batch(calls)
+        )
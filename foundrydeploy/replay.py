@@ -0,0 +1,337 @@
+import copy, json, os, threading
+from .backend import Backend
+from .store import MemoryStore
+from .log import _info
+
+FIXTURE_VERSION = 1
+
+_SESSION = None
+
+
+class ReplayError(ValueError):
+    pass
+
+
+def _deploy_inputs(contract_path: str, args: list, salt: bytes) -> dict:
+    return {
+        "contract": contract_path,
+        "args": args,
+        "salt": None if salt is None else "0x" + salt.hex(),
+    }
+
+
+def _call_inputs(calls: list) -> list:
+    return [[address, "0x" + data.hex()] for (address, data) in calls]
+
+
+def _flatten(value, path: str = "") -> dict:
+    """
+    Example:
+        _flatten({"args": ["1", "2"]}) -> {"args[0]": "1", "args[1]": "2"}
+    """
+    if isinstance(value, dict):
+        flat = {}
+        for (key, item) in value.items():
+            flat.update(_flatten(item, f"{path}.{key}" if path else key))
+        return flat
+    if isinstance(value, list):
+        flat = {}
+        for (index, item) in enumerate(value):
+            flat.update(_flatten(item, f"{path}[{index}]"))
+        return flat if len(value) > 0 else {path: []}
+    return {path: value}
+
+
+def diff(recorded: dict, made: dict) -> list:
+    """
+    Every field that differs between the inputs of a recorded call and the ones of the call
+    made, as `field: recorded .., got ..` lines.
+    """
+    (recorded, made) = (_flatten(recorded), _flatten(made))
+    lines = []
+    for field in dict.fromkeys(list(recorded) + list(made)):
+        if recorded.get(field, "<missing>") != made.get(field, "<missing>"):
+            lines.append(
+                f"{field}: recorded `{recorded.get(field, '<missing>')}`, got `{made.get(field, '<missing>')}`"
+            )
+    return lines
+
+
+###########################
+# Recording
+###########################
+
+
+class RecordingBackend(Backend):
+    """
+    Calls `backend` and records the inputs and results (or error) of every call.
+    """
+
+    def __init__(self, recorder, backend: Backend):
+        self.recorder = recorder
+        self.backend = backend
+
+    def supports(self, signer) -> bool:
+        return self.backend.supports(signer)
+
+    def _record(self, deployer, action: str, inputs: dict, call):
+        try:
+            result = call()
+        except ValueError as e:
+            self.recorder.add(deployer, action, inputs, error=str(e))
+            raise
+        self.recorder.add(deployer, action, inputs, result=result)
+        return result
+
+    def deploy(
+        self, deployer, contract_path: str, args: list, salt: bytes = None
+    ) -> dict:
+        return self._record(
+            deployer,
+            "deploy",
+            _deploy_inputs(contract_path, args, salt),
+            lambda: self.backend.deploy(deployer, contract_path, args, salt),
+        )
+
+    def send(
+        self, deployer, address: str, signature: str, args: list, signer=None
+    ) -> dict:
+        inputs = {"address": address, "signature": signature, "args": args}
+        return self._record(
+            deployer,
+            "send",
+            inputs,
+            lambda: self.backend.send(deployer, address, signature, args, signer),
+        )
+
+    def multicall(self, deployer, calls: list, signer=None) -> dict:
+        return self._record(
+            deployer,
+            "multicall",
+            {"calls": _call_inputs(calls)},
+            lambda: self.backend.multicall(deployer, calls, signer),
+        )
+
+    def simulate(self, deployer, calls: list) -> bool:
+        inputs = {
+            "calls": _call_inputs([(call["address"], call["data"]) for call in calls])
+        }
+
+        def simulate():
+            ok = self.backend.simulate(deployer, calls)
+            return {"ok": ok, "gas": [call.get("gas") for call in calls]}
+
+        return self._record(deployer, "simulate", inputs, simulate)["ok"]
+
+
+class Recorder:
+    """
+    Records the state every deployer starts from and the calls made to its backend, and
+    writes them as a fixture that `Replayer` runs the script against later.
+
+    Example:
+        {"version": 1, "deployers": {"fuji": {"state": {"addresses": {..}, ..}, "calls": [
+            {"action": "deploy", "inputs": {"contract": "src/Fly.sol:Fly", "args": [], "salt": null},
+             "result": {"address": "0x..", "transactions": ["0x.."]}}, ..]}}}
+    """
+
+    # Deployers record their own cache, not the real one
+    store = None
+
+    def __init__(self, path: str):
+        self.path = path
+        self.deployers = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, backend: Backend) -> Backend:
+        return RecordingBackend(self, backend)
+
+    def started(self, deployer):
+        with self._lock:
+            self.deployers[deployer.name] = {
+                "state": MemoryStore.snapshot(deployer),
+                "calls": [],
+            }
+
+    def add(self, deployer, action: str, inputs: dict, result=None, error=None):
+        entry = {"action": action, "inputs": inputs}
+        if error is not None:
+            entry["error"] = error
+        else:
+            entry["result"] = result
+        with self._lock:
+            self.deployers[deployer.name]["calls"].append(copy.deepcopy(entry))
+
+    def finish(self):
+        """
+        Writes the fixture, also after a failed run so its error can be replayed too.
+        """
+        with self._lock:
+            fixture = {"version": FIXTURE_VERSION, "deployers": self.deployers}
+            calls = sum([len(entry["calls"]) for entry in self.deployers.values()])
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(fixture, f, indent=1)
+            os.replace(tmp_path, self.path)
+        _info(f"# Recorded {calls} calls to `{self.path}`")
+
+
+###########################
+# Replay
+###########################
+
+
+class ReplayBackend(Backend):
+    """
+    Serves the results recorded by `Recorder`, without any process or network request.
+    A call matching no recorded one raises a `ReplayError` listing what differs.
+    """
+
+    offline = True
+
+    def __init__(self, replayer):
+        self.replayer = replayer
+
+    def _result(self, deployer, action: str, inputs: dict):
+        entry = self.replayer.take(deployer, action, inputs)
+        if "error" in entry:
+            raise ValueError(entry["error"])
+        return copy.deepcopy(entry["result"])
+
+    def deploy(
+        self, deployer, contract_path: str, args: list, salt: bytes = None
+    ) -> dict:
+        return self._result(
+            deployer, "deploy", _deploy_inputs(contract_path, args, salt)
+        )
+
+    def send(
+        self, deployer, address: str, signature: str, args: list, signer=None
+    ) -> dict:
+        inputs = {"address": address, "signature": signature, "args": args}
+        return self._result(deployer, "send", inputs)
+
+    def multicall(self, deployer, calls: list, signer=None) -> dict:
+        return self._result(deployer, "multicall", {"calls": _call_inputs(calls)})
+
+    def simulate(self, deployer, calls: list) -> bool:
+        inputs = {
+            "calls": _call_inputs([(call["address"], call["data"]) for call in calls])
+        }
+        result = self._result(deployer, "simulate", inputs)
+        for (call, gas) in zip(calls, result["gas"]):
+            if gas is not None:
+                call["gas"] = gas
+        return result["ok"]
+
+
+class Replayer:
+    """
+    Runs a script against a fixture written by `Recorder`: every deployer starts from its
+    recorded state in a `MemoryStore` and its backend calls are answered from the fixture.
+
+    Calls are matched by their resolved inputs rather than by position, since `workers` and
+    concurrent `.use` paths don't always make them in the recorded order.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path) as f:
+            fixture = json.load(f)
+        if fixture.get("version") != FIXTURE_VERSION:
+            raise ReplayError(
+                f"`{path}` is a version {fixture.get('version')} fixture, expected {FIXTURE_VERSION}"
+            )
+
+        self.remaining = {
+            name: list(entry["calls"]) for (name, entry) in fixture["deployers"].items()
+        }
+        self.made = {name: 0 for name in self.remaining}
+        self.store = MemoryStore(
+            {name: entry["state"] for (name, entry) in fixture["deployers"].items()}
+        )
+        self._lock = threading.Lock()
+
+    def wrap(self, backend: Backend) -> Backend:
+        return ReplayBackend(self)
+
+    def started(self, deployer):
+        if deployer.name not in self.remaining:
+            raise ReplayError(f"`{self.path}` has no deployer `{deployer.name}`")
+
+    def take(self, deployer, action: str, inputs: dict) -> dict:
+        inputs = json.loads(json.dumps(inputs))
+        with self._lock:
+            remaining = self.remaining[deployer.name]
+            self.made[deployer.name] += 1
+            for (index, entry) in enumerate(remaining):
+                if entry["action"] == action and entry["inputs"] == inputs:
+                    return remaining.pop(index)
+            raise ReplayError(
+                self._divergence(deployer.name, action, inputs, remaining)
+            )
+
+    def _divergence(self, name: str, action: str, inputs: dict, remaining: list) -> str:
+        message = f"Replay of `{self.path}` diverged at call {self.made[name]} of `{name}`: {action} not recorded"
+        candidates = [entry for entry in remaining if entry["action"] == action]
+        if len(candidates) == 0:
+            if len(remaining) == 0:
+                return message + ", every recorded call was already made"
+            return message + f", the next recorded call is a {remaining[0]['action']}"
+
+        # The recorded call differing in the fewest fields, the earliest one on ties
+        closest = min(candidates, key=lambda entry: len(diff(entry["inputs"], inputs)))
+        return "\n    ".join(
+            [message + ", closest recorded call:"] + diff(closest["inputs"], inputs)
+        )
+
+    def finish(self):
+        """
+        Raises a `ReplayError` listing the recorded calls the run didn't make.
+        """
+        missing = [
+            f"{name}: {entry['action']} {json.dumps(entry['inputs'])}"
+            for (name, entries) in self.remaining.items()
+            for entry in entries
+        ]
+        if len(missing) > 0:
+            raise ReplayError(
+                "\n    ".join(
+                    [
+                        f"Replay of `{self.path}` didn't make {len(missing)} recorded calls:"
+                    ]
+                    + missing
+                )
+            )
+        _info(f"# Replayed `{self.path}`: {sum(self.made.values())} calls matched")
+
+
+def start_recording(path: str) -> Recorder:
+    """
+    Records the deployers created from now on, see `Recorder`.
+    """
+    global _SESSION
+    _SESSION = Recorder(path)
+    return _SESSION
+
+
+def start_replay(path: str) -> Replayer:
+    """
+    Replays `path` with the deployers created from now on, see `Replayer`.
+    """
+    global _SESSION
+    _SESSION = Replayer(path)
+    return _SESSION
+
+
+def stop():
+    """
+    Returns the recording or replay session that was running (None if there wasn't any).
+    """
+    global _SESSION
+    (session, _SESSION) = (_SESSION, None)
+    return session
+
+
+def get_session():
+    return _SESSION
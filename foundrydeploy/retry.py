@@ -0,0 +1,82 @@
+import random, re, threading, time
+
+# Failures worth another attempt: the node throttled, timed out or was briefly unreachable.
+# Anything else (reverts, bad arguments, insufficient funds..) fails the same way every time. A
+# nonce already used isn't either: it may have been used by the transaction being retried.
+TRANSIENT_ERRORS = re.compile(
+    r"\b(429|502|503|504)\b|too many requests|rate limit|limit exceeded|timed out|timeout"
+    r"|bad gateway|service unavailable|temporarily unavailable|connection (reset|refused|aborted)"
+    r"|header not found",
+    re.IGNORECASE,
+)
+
+
+def is_transient(error) -> bool:
+    return TRANSIENT_ERRORS.search(str(error)) is not None
+
+
+def backoff(attempt: int, base: float = 0.5, cap: float = 30) -> float:
+    """
+    Seconds to wait before retry number `attempt + 1`: exponential, with full jitter so
+    deployers throttled together don't all retry at the same moment.
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average, in bursts of up to `burst`. A rate of 0
+    doesn't limit anything.
+    """
+
+    def __init__(self, rate: float = 0, burst: float = None):
+        self._lock = threading.Lock()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate: float, burst: float = None):
+        with self._lock:
+            self.rate = rate
+            self.burst = burst if burst is not None else max(1, rate)
+            self._tokens = self.burst
+            self._updated = time.monotonic()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            # Reserve the token now, and wait for it outside of the lock
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_limiter(endpoint: str) -> TokenBucket:
+    """
+    Returns the rate limiter of an endpoint, shared by every deployer and client using it.
+    """
+    with _LIMITERS_LOCK:
+        if endpoint not in _LIMITERS:
+            _LIMITERS[endpoint] = TokenBucket()
+        return _LIMITERS[endpoint]
+
+
+def limit_rate(endpoint: str, rate: float):
+    """
+    Limits an endpoint to `rate` requests per second. Deployers sharing an endpoint with
+    different rates get the lowest one.
+    """
+    limiter = get_limiter(endpoint)
+    if rate > 0 and (limiter.rate <= 0 or rate < limiter.rate):
+        limiter.set_rate(rate)
@@ -0,0 +1,165 @@
+import json, threading, itertools, http.client, time
+from urllib.parse import urlsplit
+from .retry import is_transient, backoff, get_limiter
+from .log import _info
+
+
+class RpcError(ValueError):
+    def __init__(self, message: str, code: int = None, data=None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+
+class RpcClient:
+    """
+    JSON-RPC over HTTP, keeping one keep-alive connection per thread.
+
+    Requests go through the endpoint's rate limiter (see `retry.limit_rate`). Throttled,
+    timed out and unreachable requests are retried `retries` times with exponential backoff.
+    """
+
+    def __init__(self, url: str, timeout: float = 30, retries: int = 3):
+        self.url = url
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.is_https = parts.scheme == "https"
+        self.target = parts.path or "/"
+        if parts.query:
+            self.target += "?" + parts.query
+        self.timeout = timeout
+        self.retries = retries
+        self._limiter = get_limiter(url)
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.is_https:
+                conn = http.client.HTTPSConnection(
+                    self.host, self.port, timeout=self.timeout
+                )
+            else:
+                conn = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout
+                )
+            self._local.conn = conn
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _post_once(self, body: bytes):
+        conn = self._connection()
+        try:
+            conn.request(
+                "POST", self.target, body, {"Content-Type": "application/json"}
+            )
+            response = conn.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            self._close()
+            raise
+
+        if response.status != 200:
+            raise RpcError(
+                f"{self.url} answered HTTP {response.status}: {data[:200].decode(errors='replace')}",
+                response.status,
+            )
+        return json.loads(data)
+
+    def _post(self, payload):
+        body = json.dumps(payload).encode()
+
+        # A kept-alive socket may have been closed by the server in between calls, so the
+        # first retry of a connection error is immediate, on a fresh connection.
+        attempt = 0
+        while True:
+            self._limiter.acquire()
+            try:
+                return self._post_once(body)
+            except (http.client.HTTPException, OSError, RpcError) as e:
+                stale = attempt == 0 and not isinstance(e, RpcError)
+                if attempt >= self.retries or not (stale or is_transient(e)):
+                    raise
+                delay = 0 if stale else backoff(attempt)
+                if delay > 0:
+                    _info(f"# {e}, retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                attempt += 1
+
+    def _request(self, method: str, params: list) -> dict:
+        return {
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+            "method": method,
+            "params": params,
+        }
+
+    @staticmethod
+    def _result(response: dict):
+        if "error" in response:
+            error = response["error"]
+            return RpcError(
+                error.get("message", str(error)), error.get("code"), error.get("data")
+            )
+        return response.get("result")
+
+    def call(self, method: str, params: list = []):
+        for attempt in range(self.retries + 1):
+            result = self._result(self._post(self._request(method, params)))
+            # Nonce races are retried by the backend, which has to sign again
+            if (
+                not isinstance(result, RpcError)
+                or attempt == self.retries
+                or not is_transient(result)
+                or "nonce" in str(result).lower()
+            ):
+                break
+            delay = backoff(attempt)
+            _info(f"# {self.url} {method}: {result}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+        if isinstance(result, RpcError):
+            raise result
+        return result
+
+    def batch(self, calls: list) -> list:
+        """
+        Sends `[(method, params), ...]` as a single JSON-RPC batch. Failed calls have an
+        `RpcError` in their place instead of raising.
+        """
+        if len(calls) == 0:
+            return []
+        requests = [self._request(method, params) for (method, params) in calls]
+        responses = self._post(requests)
+        if isinstance(responses, dict):
+            raise RpcError(f"batch request failed: {responses.get('error', responses)}")
+
+        by_id = {response.get("id"): response for response in responses}
+        return [self._result(by_id.get(request["id"], {})) for request in requests]
+
+
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(url: str) -> RpcClient:
+    """
+    Returns the shared client of an endpoint, so every deployer talking to it reuses the same
+    connections. Space separated URLs are a pool of endpoints (see `pool.PoolClient`).
+    """
+    with _CLIENTS_LOCK:
+        if url not in _CLIENTS:
+            if " " in url:
+                from .pool import PoolClient
+
+                _CLIENTS[url] = PoolClient(url.split())
+            else:
+                _CLIENTS[url] = RpcClient(url)
+        return _CLIENTS[url]
@@ -0,0 +1,141 @@
+import contextvars, threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from .abi import nested_items
+
+
+def referenced_labels(arguments) -> set:
+    """
+    Collects every `$LABEL` used by a step, including the ones inside `[..]` lists and `(..)`
+    tuples.
+
+    Example:
+        ["$FLY", "[$POND,$STREAM]", "($BALLOT,1)", "1ether"] -> {"FLY", "POND", "STREAM", "BALLOT"}
+    """
+    labels = set()
+    for arg in arguments:
+        if isinstance(arg, (list, tuple)):
+            labels.update(referenced_labels(arg))
+            continue
+        if not isinstance(arg, str):
+            continue
+
+        arg = arg.strip()
+        items = nested_items(arg)
+        if items is not None:
+            labels.update(referenced_labels(items))
+        elif arg.startswith("$"):
+            labels.add(arg[1:])
+    return labels
+
+
+def qualified(contract_label: str, deployer: str, scoped=()) -> str:
+    """
+    The key of a label referenced by `deployer`: `LABEL@owner` for the labels of a `scoped`
+    deployer, which keeps its own addresses, and `LABEL` for the ones of the shared registry.
+    A label is owned by the deployer referencing it, unless written `LABEL@owner`.
+
+    Example:
+        qualified("FLY", "fuji") -> "FLY"
+        qualified("FLY", "fuji", scoped={"fuji"}) -> "FLY@fuji"
+        qualified("FLY@avax", "fuji", scoped={"fuji"}) -> "FLY"
+    """
+    (contract_label, _, owner) = contract_label.partition("@")
+    owner = owner or deployer
+    if owner in scoped:
+        return f"{contract_label}@{owner}"
+    return contract_label
+
+
+def build_graph(steps: list) -> list:
+    """
+    Returns, for every step, the set of earlier step indices it has to wait for.
+
+    Every step writes its own contract label (deploy sets its address, send changes its state)
+    and reads the labels it references with `$`. Steps that touch the same label keep their
+    relative order, so a send never overtakes the deploy of its target or of its arguments.
+
+    A step writing several labels (eg. a batch of sends) has a tuple of labels instead.
+    """
+    last_write = {}
+    reads_since_write = {}
+    graph = []
+
+    for (index, (_, contract_label, arguments)) in enumerate(steps):
+        if isinstance(contract_label, tuple):
+            writes = set(contract_label)
+        else:
+            writes = {contract_label}
+        reads = referenced_labels(arguments) - writes
+        deps = set()
+
+        for label in reads:
+            if label in last_write:
+                deps.add(last_write[label])
+
+        for label in writes:
+            if label in last_write:
+                deps.add(last_write[label])
+            deps.update(reads_since_write.get(label, []))
+
+        for label in reads:
+            reads_since_write.setdefault(label, []).append(index)
+        for label in writes:
+            last_write[label] = index
+            reads_since_write[label] = []
+
+        graph.append(deps)
+
+    return graph
+
+
+def run_graph(steps: list, execute, workers: int):
+    """
+    Calls `execute(action, contract_label, arguments)` for every step, running the ones with
+    no pending dependencies concurrently on a pool of `workers` threads.
+
+    The first failure cancels the steps that haven't started yet; the ones already running
+    are allowed to finish before the error is raised. Steps run in a copy of the caller's
+    context, so context variables (eg. the log prefix) carry over.
+    """
+    graph = build_graph(steps)
+    pending = [len(deps) for deps in graph]
+    dependents = [[] for _ in steps]
+    for (index, deps) in enumerate(graph):
+        for dep in deps:
+            dependents[dep].append(index)
+
+    failed = threading.Event()
+
+    def run(index: int):
+        # A worker freed by the failure could start the next queued step before it's cancelled
+        if failed.is_set():
+            return
+        try:
+            execute(*steps[index])
+        except BaseException:
+            failed.set()
+            raise
+
+    def submit(pool, index: int):
+        return pool.submit(contextvars.copy_context().run, run, index)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {
+            submit(pool, index): index
+            for index in range(len(steps))
+            if pending[index] == 0
+        }
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                if future.exception() is not None:
+                    for waiting in running:
+                        waiting.cancel()
+                    future.result()
+
+                for dependent in dependents[index]:
+                    pending[dependent] -= 1
+                    if pending[dependent] == 0:
+                        running[submit(pool, dependent)] = dependent
@@ -0,0 +1,68 @@
+import threading
+from . import Signer
+
+ROUND_ROBIN = "round_robin"
+LEAST_PENDING = "least_pending"
+POLICIES = [ROUND_ROBIN, LEAST_PENDING]
+
+
+class SignerPool:
+    """
+    Signers sharing the sends of a deployer. Each one keeps its own nonces (see
+    `pipeline.NonceManager`), so independent sends aren't queued behind a single account.
+
+    * `round_robin` hands the signers out in turn
+    * `least_pending` hands out the one with the fewest sends in flight (pipelined: not
+      collected yet), the one that made the fewest sends on ties
+
+    Example:
+        pool = SignerPool([alice, bob], policy="least_pending")
+        signer = pool.acquire()
+        # .. send with `signer`
+        pool.release(signer)
+    """
+
+    def __init__(self, signers: [Signer], policy: str = ROUND_ROBIN):
+        if len(signers) == 0:
+            raise ValueError("a signer pool needs at least one signer")
+        if policy not in POLICIES:
+            raise ValueError(
+                f"signer policy `{policy}` not supported, use one of {POLICIES}"
+            )
+        self.signers = list(signers)
+        self.policy = policy
+        self.pending = [0] * len(self.signers)
+        self.sends = [0] * len(self.signers)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.signers)
+
+    def acquire(self) -> Signer:
+        with self._lock:
+            if self.policy == ROUND_ROBIN:
+                index = self._next
+                self._next = (index + 1) % len(self.signers)
+            else:
+                index = min(
+                    range(len(self.signers)),
+                    key=lambda i: (self.pending[i], self.sends[i]),
+                )
+            self.pending[index] += 1
+            self.sends[index] += 1
+            return self.signers[index]
+
+    def release(self, signer: Signer):
+        with self._lock:
+            for (index, pooled) in enumerate(self.signers):
+                if pooled is signer:
+                    self.pending[index] = max(self.pending[index] - 1, 0)
+                    return
+
+    def settle(self):
+        """
+        Every send was mined, eg. once the receipts of a pipelined path are collected.
+        """
+        with self._lock:
+            self.pending = [0] * len(self.signers)
@@ -0,0 +1,311 @@
+import os, pickle, sqlite3, threading, time
+
+
+class CacheStore:
+    """
+    Where deployers keep their deployments between runs.
+
+    `load` fills the deployer's `contracts`, `addresses`, `deployments` and `sent` and returns
+    whether anything was cached. `save` persists them, only for the labels the deployer
+    deployed or was given an address for in `.contracts` (see `Deployer.owned`).
+    """
+
+    def location(self, deployer) -> str:
+        raise NotImplementedError
+
+    def load(self, deployer) -> bool:
+        raise NotImplementedError
+
+    def save(self, deployer):
+        raise NotImplementedError
+
+
+class PickleStore(CacheStore):
+    """
+    One pickle of the whole deployer per `sha256(name + rpc)[:8]`, at `deployer.cache_path`.
+    """
+
+    def location(self, deployer) -> str:
+        return deployer.cache_path
+
+    def load(self, deployer) -> bool:
+        try:
+            with open(deployer.cache_path, "rb") as f:
+                cached = pickle.load(f)
+        except FileNotFoundError:
+            return False
+
+        deployer.contracts = cached.contracts
+        deployments = getattr(cached, "deployments", None)
+        if deployments is None:
+            deployer.addresses.update(cached.addresses)
+        else:
+            # The addresses of other deployers may have been pickled along
+            deployer.addresses.update(
+                {
+                    label: address
+                    for (label, address) in cached.addresses.items()
+                    if label in deployments
+                }
+            )
+            deployer.deployments.update(deployments)
+        deployer.sent.update(getattr(cached, "sent", {}))
+        return True
+
+    def save(self, deployer):
+        with open(deployer.cache_path, "wb") as f:
+            pickle.dump(deployer, f)
+
+
+class MemoryStore(CacheStore):
+    """
+    Keeps the deployers' state in memory, by deployer name, for replays (see `replay.Replayer`)
+    which must not touch the real cache.
+
+    Example:
+        MemoryStore({"fuji": MemoryStore.snapshot(deployer)})
+    """
+
+    def __init__(self, states: dict = None):
+        self.states = states if states is not None else {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def snapshot(deployer) -> dict:
+        return {
+            "contracts": dict(deployer.contracts),
+            "addresses": dict(deployer.addresses),
+            "deployments": dict(deployer.deployments),
+            "sent": dict(deployer.sent),
+        }
+
+    def location(self, deployer) -> str:
+        return f"memory ({deployer.name})"
+
+    def load(self, deployer) -> bool:
+        with self._lock:
+            state = self.states.get(deployer.name)
+        if state is None:
+            return False
+
+        deployer.contracts.update(state["contracts"])
+        deployer.addresses.update(state["addresses"])
+        deployer.deployments.update(state["deployments"])
+        deployer.sent.update(state["sent"])
+        return True
+
+    def save(self, deployer):
+        state = MemoryStore.snapshot(deployer)
+        with self._lock:
+            self.states[deployer.name] = state
+
+
+class SqliteStore(CacheStore):
+    """
+    Single SQLite database (WAL mode) shared by every deployer, network and parallel run.
+    Rows are keyed by `(chain_id, deployer, label)`; the signer is never stored.
+
+    Example:
+        SqliteStore("cache/deployments.db").lookup("FLY", chain_id=43113)
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS deployments (
+        chain_id INTEGER NOT NULL,
+        deployer TEXT NOT NULL,
+        label TEXT NOT NULL,
+        address TEXT NOT NULL,
+        contract_path TEXT,
+        tx_hash TEXT,
+        artifact_hash TEXT,
+        deployed_at REAL,
+        updated_at REAL NOT NULL,
+        fingerprint TEXT,
+        PRIMARY KEY (chain_id, deployer, label)
+    );
+    CREATE INDEX IF NOT EXISTS deployments_by_label ON deployments (label, chain_id);
+
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        chain_id INTEGER NOT NULL,
+        deployer TEXT NOT NULL,
+        tx_hash TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS transactions_by_deployer ON transactions (chain_id, deployer);
+
+    CREATE TABLE IF NOT EXISTS sends (
+        chain_id INTEGER NOT NULL,
+        deployer TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (chain_id, deployer, fingerprint)
+    );
+    """
+
+    def __init__(self, path: str, read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        if read_only:
+            # Neither created nor migrated, see `get_store`
+            self._conn = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False
+            )
+            self._conn.row_factory = sqlite3.Row
+            return
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SqliteStore.SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        columns = [
+            row["name"] for row in self._conn.execute("PRAGMA table_info(deployments)")
+        ]
+        if "fingerprint" not in columns:
+            self._conn.execute("ALTER TABLE deployments ADD COLUMN fingerprint TEXT")
+
+    def location(self, deployer) -> str:
+        return f"{self.path} ({deployer.chain_id()}, {deployer.name})"
+
+    def load(self, deployer) -> bool:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM deployments WHERE chain_id = ? AND deployer = ?",
+                (deployer.chain_id(), deployer.name),
+            ).fetchall()
+            sends = self._conn.execute(
+                "SELECT fingerprint, count FROM sends WHERE chain_id = ? AND deployer = ?",
+                (deployer.chain_id(), deployer.name),
+            ).fetchall()
+
+        for send in sends:
+            deployer.sent[send["fingerprint"]] = send["count"]
+
+        if len(rows) == 0:
+            # Carry over a cache written by an older version
+            return PickleStore().load(deployer)
+
+        for row in rows:
+            if row["deployed_at"] is None:
+                # Fixed in `.contracts`, which gives it again, or a label of another deployer
+                # saved under this one by older versions
+                continue
+            deployer.addresses[row["label"]] = row["address"]
+            if row["contract_path"]:
+                deployer.contracts[row["label"]] = row["contract_path"]
+            deployer.deployments[row["label"]] = {
+                "tx_hash": row["tx_hash"],
+                "artifact_hash": row["artifact_hash"],
+                "deployed_at": row["deployed_at"],
+                # Read only stores aren't migrated
+                "fingerprint": (
+                    row["fingerprint"] if "fingerprint" in row.keys() else None
+                ),
+            }
+        return True
+
+    def save(self, deployer):
+        if self.read_only:
+            raise ValueError(f"`{self.path}` is opened read only")
+        chain_id = deployer.chain_id()
+        now = time.time()
+
+        rows = []
+        for label in deployer.owned():
+            deployment = deployer.deployments.get(label, {})
+            rows.append(
+                (
+                    chain_id,
+                    deployer.name,
+                    label,
+                    deployer.addresses[label],
+                    deployer.contracts.get(label),
+                    deployment.get("tx_hash"),
+                    deployment.get("artifact_hash"),
+                    deployment.get("deployed_at"),
+                    now,
+                    deployment.get("fingerprint"),
+                )
+            )
+
+        sends = [
+            (chain_id, deployer.name, fingerprint, count, now)
+            for (fingerprint, count) in list(deployer.sent.items())
+        ]
+
+        transactions = deployer.transactions[deployer.saved_transactions :]
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO deployments (
+                    chain_id, deployer, label, address, contract_path, tx_hash,
+                    artifact_hash, deployed_at, updated_at, fingerprint
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (chain_id, deployer, label) DO UPDATE SET
+                    address = excluded.address,
+                    contract_path = excluded.contract_path,
+                    tx_hash = excluded.tx_hash,
+                    artifact_hash = excluded.artifact_hash,
+                    deployed_at = excluded.deployed_at,
+                    updated_at = excluded.updated_at,
+                    fingerprint = excluded.fingerprint
+                """,
+                rows,
+            )
+            self._conn.executemany(
+                "INSERT INTO transactions (chain_id, deployer, tx_hash, created_at) VALUES (?, ?, ?, ?)",
+                [(chain_id, deployer.name, tx, now) for tx in transactions],
+            )
+            self._conn.executemany(
+                """
+                INSERT INTO sends VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (chain_id, deployer, fingerprint) DO UPDATE SET
+                    count = excluded.count,
+                    updated_at = excluded.updated_at
+                """,
+                sends,
+            )
+        deployer.saved_transactions += len(transactions)
+
+    def lookup(self, label: str, chain_id: int = None) -> list:
+        """
+        Every cached deployment of `label`, optionally only the ones on `chain_id`.
+        """
+        query = "SELECT * FROM deployments WHERE label = ?"
+        params = [label]
+        if chain_id is not None:
+            query += " AND chain_id = ?"
+            params.append(chain_id)
+
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(query, params)]
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(cache_path: str = "cache", read_only: bool = False) -> CacheStore:
+    """
+    Returns the store shared by every deployer using `cache_path`. A `read_only` one never
+    creates or writes anything, an empty `MemoryStore` stands in for a missing database.
+    """
+    path = f"{cache_path}/deployments.db"
+    if read_only and not os.path.exists(path):
+        return MemoryStore()
+
+    key = (path, read_only)
+    with _STORES_LOCK:
+        if key not in _STORES:
+            _STORES[key] = SqliteStore(path, read_only)
+        return _STORES[key]
@@ -0,0 +1,147 @@
+import contextlib, contextvars, json, os, threading, time
+
+# Tags of the enclosing spans, inherited by the spans opened within them (and by the steps
+# `scheduler.run_graph` runs, which copy the context)
+_TAGS = contextvars.ContextVar("trace_tags", default={})
+_NOOP = contextlib.nullcontext()
+
+_TRACER = None
+
+
+class Tracer:
+    """
+    Collects the spans of a run: `(name, tags, start_ns, end_ns, thread_id)`.
+    """
+
+    def __init__(self):
+        self.spans = []
+        self.started = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def add(self, name: str, tags: dict, start: int, end: int):
+        with self._lock:
+            self.spans.append((name, tags, start, end, threading.get_ident()))
+
+    def chrome_trace(self) -> dict:
+        """
+        The spans as Chrome trace events, loadable in `chrome://tracing` or Perfetto.
+        """
+        threads = {}
+        events = []
+        for (name, tags, start, end, thread) in self.spans:
+            tid = threads.setdefault(thread, len(threads) + 1)
+            events.append(
+                {
+                    "name": name,
+                    "cat": tags.get("action", name),
+                    "ph": "X",
+                    "ts": (start - self.started) / 1000,
+                    "dur": (end - start) / 1000,
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": tags,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def summary(self) -> str:
+        """
+        Count, total, mean and max time of every span name, slowest first. Nested spans are
+        counted in their parents too, so the shares can add up to more than 100%.
+        """
+        if len(self.spans) == 0:
+            return "no spans recorded"
+
+        by_name = {}
+        for (name, _, start, end, _) in self.spans:
+            by_name.setdefault(name, []).append((end - start) / 1e6)
+        wall = (max([recorded[3] for recorded in self.spans]) - self.started) / 1e6
+
+        table = [["span", "count", "total ms", "mean ms", "max ms", "% of run"]]
+        for (name, durations) in sorted(
+            by_name.items(), key=lambda item: -sum(item[1])
+        ):
+            total = sum(durations)
+            table.append(
+                [
+                    name,
+                    str(len(durations)),
+                    f"{total:.1f}",
+                    f"{total / len(durations):.2f}",
+                    f"{max(durations):.2f}",
+                    f"{100 * total / wall:.1f}" if wall > 0 else "",
+                ]
+            )
+
+        widths = [max([len(line[column]) for line in table]) for column in range(6)]
+        return "\n".join(
+            [
+                "  ".join(
+                    [line[0].ljust(widths[0])]
+                    + [cell.rjust(width) for (cell, width) in zip(line[1:], widths[1:])]
+                )
+                for line in table
+            ]
+        )
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "tags", "start", "token")
+
+    def __init__(self, tracer: Tracer, name: str, tags: dict):
+        self.tracer = tracer
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.tags = {**_TAGS.get(), **self.tags}
+        self.token = _TAGS.set(self.tags)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        end = time.perf_counter_ns()
+        _TAGS.reset(self.token)
+        if error is not None:
+            self.tags = dict(self.tags, error=f"{kind.__name__}: {error}")
+        self.tracer.add(self.name, self.tags, self.start, end)
+
+
+def span(name: str, **tags):
+    """
+    Times the enclosed block when tracing is enabled, and does nothing otherwise.
+
+    Example:
+        with span("action", deployer="fuji", label="FLY", action="deploy"):
+            with span("subprocess"):  # tagged with deployer, label and action too
+                ...
+    """
+    if _TRACER is None:
+        return _NOOP
+    return _Span(_TRACER, name, tags)
+
+
+def enable() -> Tracer:
+    """
+    Starts recording spans, returns the tracer holding them.
+    """
+    global _TRACER
+    _TRACER = Tracer()
+    return _TRACER
+
+
+def disable() -> Tracer:
+    """
+    Stops recording spans, returns the tracer that held them (None if it wasn't enabled).
+    """
+    global _TRACER
+    (tracer, _TRACER) = (_TRACER, None)
+    return tracer
+
+
+def get_tracer() -> Tracer:
+    return _TRACER
@@ -0,0 +1,62 @@
+import os, sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "bench"))
+
+from rpc_server import Chain, serve
+from fixtures import write_artifacts
+from foundrydeploy import parser, store, artifacts, pipeline
+
+
+def reset():
+    """
+    Forgets the signers, deployers and caches of earlier runs, like a new process would.
+    """
+    parser.SIGNERS.clear()
+    parser.DEPLOYERS.clear()
+    parser.ADDRESSES.clear()
+    store._STORES.clear()
+    artifacts._INDEXES.clear()
+    pipeline._NONCES.clear()
+
+
+@pytest.fixture
+def chain():
+    return Chain()
+
+
+@pytest.fixture
+def node(chain):
+    """
+    A JSON-RPC endpoint serving `chain`, see `bench/rpc_server.py`.
+    """
+    server = serve(chain)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def nodes():
+    """
+    Endpoints of two chains (ids 1001 and 1002), for several deployers.
+    """
+    servers = [serve(Chain(chain_id=chain_id)) for chain_id in (1001, 1002)]
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """
+    An empty project with the `out/` artifacts of `src/Contract{0,1,2}.sol`, as working
+    directory. Every contract takes `(string, address, uint256)` and has `setValue(uint256)`,
+    `setOther(address)` and `setName(string)`.
+    """
+    write_artifacts(str(tmp_path), 3)
+    monkeypatch.chdir(tmp_path)
+    reset()
+    yield tmp_path
+    reset()
@@ -0,0 +1,172 @@
+import pytest
+from foundrydeploy.abi import encode, encode_call, encode_calls, select_overload
+
+
+def words(*hex_words: str) -> str:
+    return "".join([word.rjust(64, "0") for word in hex_words])
+
+
+def padded(text: str) -> str:
+    return text.encode().hex().ljust(64, "0")
+
+
+# The examples of the Solidity ABI specification
+@pytest.mark.parametrize(
+    "signature, args, encoded",
+    [
+        ("baz(uint32,bool)", ["69", "true"], "cdcd77c0" + words("45", "1")),
+        (
+            "bar(bytes3[2])",
+            ["[0x616263, 0x646566]"],
+            "fce353f6" + padded("abc") + padded("def"),
+        ),
+        (
+            "sam(bytes,bool,uint256[])",
+            ["0x64617665", "true", "[1, 2, 3]"],
+            "a5643bf2"
+            + words("60", "1", "a0", "4")
+            + padded("dave")
+            + words("3", "1", "2", "3"),
+        ),
+        (
+            "f(uint256,uint32[],bytes10,bytes)",
+            [
+                "0x123",
+                "[0x456, 0x789]",
+                "0x31323334353637383930",
+                "0x48656c6c6f2c20776f726c6421",
+            ],
+            "8be65246"
+            + words("123", "80")
+            + padded("1234567890")
+            + words("e0", "2", "456", "789", "d")
+            + padded("Hello, world!"),
+        ),
+        (
+            "g(uint256[][],string[])",
+            ["[[1, 2], [3]]", '["one", "two", "three"]'],
+            "2289b18c"
+            + words("40", "140")
+            + words("2", "40", "a0", "2", "1", "2", "1", "3")
+            + words("3", "60", "a0", "e0")
+            + words("3")
+            + padded("one")
+            + words("3")
+            + padded("two")
+            + words("5")
+            + padded("three"),
+        ),
+    ],
+)
+def test_encodes_the_specification_examples(signature, args, encoded):
+    assert encode_call(signature, args).hex() == encoded
+
+
+def test_encodes_nested_dynamic_tuples():
+    # Offset of the tuple, then its own head (offsets of its string and array) and tails
+    assert encode(["(string,uint256[])"], ['("ab", [1])']).hex() == (
+        words("20", "40", "80", "2") + padded("ab") + words("1", "1")
+    )
+    # A dynamic array of dynamic tuples: every tuple gets an offset from the array's items
+    assert encode(["(string)[]"], ['[("a"), ("b")]']).hex() == (
+        words("20", "2", "40", "a0")
+        + words("20", "1")
+        + padded("a")
+        + words("20", "1")
+        + padded("b")
+    )
+    # Static tuples are inlined
+    assert encode(["(uint8,bool)[2]"], ["[(1, true), (2, false)]"]).hex() == (
+        words("1", "1", "2", "0")
+    )
+
+
+@pytest.mark.parametrize(
+    "typ, value, encoded",
+    [
+        ("int256", "-1", "f" * 64),
+        ("int8", "-128", "f" * 62 + "80"),
+        ("int8", "127", words("7f")),
+        ("int16", "-0x1", "f" * 64),
+        ("uint8", "255", words("ff")),
+        ("uint256", str(2**256 - 1), "f" * 64),
+        ("uint256", "0", words("0")),
+        ("bytes1", "0x01", "01".ljust(64, "0")),
+        ("bytes32", "0x" + "ab" * 32, "ab" * 32),
+    ],
+)
+def test_encodes_elementary_bounds(typ, value, encoded):
+    assert encode([typ], [value]).hex() == encoded
+
+
+@pytest.mark.parametrize(
+    "typ, value",
+    [
+        ("int8", "-129"),
+        ("int8", "128"),
+        ("uint8", "256"),
+        ("uint256", str(2**256)),
+        ("uint256", "-1"),
+        ("bytes1", "0x0102"),
+        ("bytes32", "0x" + "ab" * 33),
+        ("address", "0x1234"),
+        ("bool", "1"),
+        ("uint256[2]", "[1]"),
+    ],
+)
+def test_rejects_values_that_dont_fit(typ, value):
+    with pytest.raises(ValueError):
+        encode([typ], [value])
+
+
+def test_encodes_calls_grouped_by_signature():
+    calls = [
+        ("transfer(address,uint256)", ["0x" + "11" * 20, "1ether"]),
+        ('"setName(string)"', ['"first"']),
+        ("transfer(address,uint256)", ["0x" + "22" * 20, "1ether"]),
+        ("transfer(address,uint256)", ["0x" + "33" * 20, "-1"]),
+        ("setName(string)", ['"second"']),
+        ("setPair(uint256,uint256)", ["1"]),
+    ]
+    encoded = encode_calls(calls)
+
+    assert len(encoded) == len(calls)
+    for (call, result) in zip(calls[:3] + calls[4:5], encoded[:3] + encoded[4:5]):
+        assert result == encode_call(*call)
+    assert isinstance(encoded[3], ValueError)
+    assert isinstance(encoded[5], ValueError)
+
+
+OVERLOADS = [
+    {"signature": "mint(address)", "inputs": ["address"]},
+    {"signature": "mint(uint256)", "inputs": ["uint256"]},
+    {"signature": "mint(address,uint256)", "inputs": ["address", "uint256"]},
+    {"signature": "mint(string,uint256)", "inputs": ["string", "uint256"]},
+]
+ADDRESS = "0x" + "11" * 20
+
+
+def test_selects_the_overload_the_arguments_are_written_for():
+    assert select_overload("mint", OVERLOADS, [ADDRESS])["signature"] == "mint(address)"
+    assert (
+        select_overload("mint", OVERLOADS, ["1ether"])["signature"] == "mint(uint256)"
+    )
+    assert (
+        select_overload("mint", OVERLOADS, ['"name"', "1"])["signature"]
+        == "mint(string,uint256)"
+    )
+
+
+def test_overload_errors():
+    with pytest.raises(ValueError, match="takes 1 or 2 arguments, got 3"):
+        select_overload("mint", OVERLOADS, [ADDRESS, "1", "2"])
+
+    with pytest.raises(ValueError, match="no overload of `mint` takes these arguments"):
+        select_overload("mint", OVERLOADS, ["true"])
+
+    ambiguous = [
+        {"signature": "set(uint256)", "inputs": ["uint256"]},
+        {"signature": "set(uint128)", "inputs": ["uint128"]},
+    ]
+    with pytest.raises(ValueError, match="write the full signature"):
+        select_overload("set", ambiguous, ["1"])
@@ -0,0 +1,91 @@
+import pytest
+from loguru import logger
+from conftest import reset
+from rpc_server import decode_aggregate3, decode_transaction
+from foundrydeploy import parser
+from foundrydeploy.abi import encode_call, selector
+from foundrydeploy.multicall import MULTICALL3, AGGREGATE3
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+    batch {batch}
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, 1)
+    send L0 setValue(1)
+    send L0 setOther(0x0000000000000000000000000000000000000002)
+    send L0 setName("three")
+"""
+
+CALLS = [
+    ("setValue(uint256)", ["1"]),
+    ("setOther(address)", ["0x0000000000000000000000000000000000000002"]),
+    ("setName(string)", ['"three"']),
+]
+
+
+def run(node, batch: int = 10):
+    reset()
+    parser.parse(SCRIPT.format(url=node.url, batch=batch))
+    return parser.DEPLOYERS["d"].address("L0")
+
+
+def multicalls(chain) -> list:
+    """
+    The `[(target, calldata), ...]` of every `aggregate3` transaction the chain received.
+    """
+    transactions = [decode_transaction(raw) for raw in chain.transactions]
+    return [
+        decode_aggregate3(tx["data"])
+        for tx in transactions
+        if tx["to"] == MULTICALL3.lower()
+    ]
+
+
+def test_sends_are_one_aggregate3_transaction(project, node, chain):
+    address = run(node)
+
+    assert len(chain.transactions) == 2
+    assert decode_transaction(chain.transactions[1])["data"][:4] == selector(AGGREGATE3)
+    assert multicalls(chain) == [
+        [(address, encode_call(*call)) for call in CALLS],
+    ]
+
+    # Batched sends are recorded like the others
+    run(node)
+    assert len(chain.transactions) == 2
+
+
+def test_batches_hold_up_to_batch_calls(project, node, chain):
+    address = run(node, batch=2)
+
+    assert multicalls(chain) == [
+        [(address, encode_call(*call)) for call in CALLS[:2]],
+        [(address, encode_call(*call)) for call in CALLS[2:]],
+    ]
+
+
+def test_a_call_reverting_through_multicall3_sends_one_by_one(project, node, chain):
+    set_other = selector("setOther(address)")
+    chain.reverting.add(set_other)
+    lines = []
+    handler = logger.add(lines.append, format="{message}", level="INFO", catch=False)
+    try:
+        with pytest.raises(ValueError, match="reverted"):
+            run(node)
+    finally:
+        logger.remove(handler)
+
+    # The simulated results are decoded down to the revert reason of the failing call
+    assert [line.strip() for line in lines if "through Multicall3" in line] == [
+        "Batching  | $L0 setOther(...) reverts through Multicall3: 0xc35d0a82 reverts"
+    ]
+    assert multicalls(chain) == []
+    # Sent one by one instead, until the reverting one
+    assert [chain.sent(selector(signature)) for (signature, _) in CALLS] == [1, 1, 0]
@@ -0,0 +1,153 @@
+import pytest
+from rpc_server import decode_transaction
+from foundrydeploy import parser
+from foundrydeploy.abi import selector
+from foundrydeploy.crypto import (
+    keccak256,
+    rlp_encode,
+    sign_transaction,
+    private_key_to_address,
+    create_address,
+    create2_address,
+)
+
+# The example of EIP-155
+EIP155_KEY = "4646464646464646464646464646464646464646464646464646464646464646"
+EIP155_TX = {
+    "chainId": 1,
+    "nonce": 9,
+    "gasPrice": 20 * 10**9,
+    "gas": 21000,
+    "to": "0x3535353535353535353535353535353535353535",
+    "value": 10**18,
+}
+EIP155_SIGNED = (
+    "f86c098504a817c800825208943535353535353535353535353535353535353535880de0b6b3a76400008025"
+    "a028ef61340bd939bc2195fe537567866003e1a15d3c71ff63e1590620aa636276"
+    "a067cbe9d8997f761aecb703304b3800ccf555c9f3dc64214b297fb1966a3b6d83"
+)
+
+
+def test_keccak256():
+    assert (
+        keccak256(b"").hex()
+        == "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    )
+    assert (
+        keccak256(b"hello world").hex()
+        == "47173285a8d7341e5e972fc677286384f802f8ef42a5ec5f03bbfa254cb01fad"
+    )
+    # Longer than the 136 byte rate
+    assert keccak256(b"a" * 200) != keccak256(b"a" * 201)
+
+
+@pytest.mark.parametrize(
+    "item, encoded",
+    [
+        (b"", "80"),
+        (0, "80"),
+        (b"\x00", "00"),
+        (127, "7f"),
+        (128, "8180"),
+        (1024, "820400"),
+        (b"dog", "83646f67"),
+        ([], "c0"),
+        ([b"cat", b"dog"], "c88363617483646f67"),
+        ([[], [[]], [[], [[]]]], "c7c0c1c0c3c0c1c0"),
+        (b"a" * 55, "b7" + "61" * 55),
+        (b"a" * 56, "b838" + "61" * 56),
+        ([b"a" * 60], "f83e" + "b83c" + "61" * 60),
+    ],
+)
+def test_rlp_encode(item, encoded):
+    assert rlp_encode(item).hex() == encoded
+
+
+def test_eip155_signed_transaction():
+    assert (
+        private_key_to_address(EIP155_KEY)
+        == "0x9d8a62f656a8d1615c1294fd71e9cfb3e4855a4f"
+    )
+    assert sign_transaction(EIP155_TX, EIP155_KEY).hex() == EIP155_SIGNED
+
+
+def test_eip1559_signed_transaction_recovers_its_sender():
+    tx = dict(EIP155_TX, maxPriorityFeePerGas=10**9, maxFeePerGas=50 * 10**9)
+    tx.pop("gasPrice")
+    raw = sign_transaction(dict(tx, data=b"\x12\x34"), EIP155_KEY)
+    assert raw[0] == 2
+
+    decoded = decode_transaction(raw)
+    assert decoded["sender"] == private_key_to_address(EIP155_KEY)
+    assert (decoded["nonce"], decoded["to"], decoded["data"]) == (
+        9,
+        EIP155_TX["to"],
+        b"\x12\x34",
+    )
+
+
+@pytest.mark.parametrize(
+    "nonce, address",
+    [
+        (0, "0xcd234a471b72ba2f1ccf0a70fcaba648a5eecd8d"),
+        (1, "0x343c43a37d37dff08ae8c4a11544c718abb4fcf8"),
+        (2, "0xf778b86fa74e846c4f0a1fbd1335fe81c00a0c91"),
+        (3, "0xfffd933a0bc612844eaf0c6fe3e5b8e9b6c1d19c"),
+    ],
+)
+def test_create_address(nonce, address):
+    assert (
+        create_address("0x6ac7ea33f8831ea9dcc53393aaa88b25a785dbf0", nonce) == address
+    )
+
+
+@pytest.mark.parametrize(
+    "factory, salt, initcode, address",
+    # The examples of EIP-1014
+    [
+        ("0x" + "00" * 20, 0, "00", "0x4d1a2e2bb4f88f0250f26ffff098b0b30b26bf38"),
+        (
+            "0xdeadbeef" + "00" * 16,
+            0,
+            "00",
+            "0xb928f69bb1d91cd65274e3c79d8986362984fda3",
+        ),
+        (
+            "0x" + "00" * 16 + "deadbeef",
+            0xCAFEBABE,
+            "deadbeef",
+            "0x60f3f640a8508fc6a86d45df051962668e1e8ac7",
+        ),
+        ("0x" + "00" * 20, 0, "", "0xe33c0c7f7df4809055c3eba6c09cfe4baf1bd9e0"),
+    ],
+)
+def test_create2_address(factory, salt, initcode, address):
+    salt = salt.to_bytes(32, "big")
+    assert create2_address(factory, salt, bytes.fromhex(initcode)) == address
+
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, 1)
+    send L0 setValue(7)
+"""
+
+
+def test_deploys_and_sends_against_a_node(project, node, chain):
+    parser.parse(SCRIPT.format(url=node.url))
+
+    (deploy, send) = [decode_transaction(raw) for raw in chain.transactions]
+    assert (deploy["sender"], deploy["nonce"], deploy["to"]) == (chain.sender, 0, None)
+    address = create_address(chain.sender, 0)
+    assert parser.DEPLOYERS["d"].addresses["L0"] == address
+    assert (send["nonce"], send["to"]) == (1, address)
+    assert send["data"] == selector("setValue(uint256)") + (7).to_bytes(32, "big")
+    assert all([receipt["status"] == "0x1" for receipt in chain.receipts.values()])
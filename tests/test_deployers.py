@@ -0,0 +1,100 @@
+import pytest
+from loguru import logger
+from rpc_server import decode_transaction
+from foundrydeploy import parser
+from foundrydeploy.abi import selector
+from foundrydeploy.crypto import create_address
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+    L1 "src/Contract1.sol:Contract1"
+
+.deployer a
+    network {a}
+    signer ganache
+    native
+    {scoped}
+
+.deployer b
+    network {b}
+    signer ganache
+    native
+    {scoped}
+
+.use a
+    deploy L0 (zero, 0x0000000000000000000000000000000000000001, 0)
+
+.use b
+    {b_path}
+"""
+B_PATH = """deploy L1 (one, {other}, 1)
+    deploy L0 (zero, 0x0000000000000000000000000000000000000001, 0)"""
+
+
+def script(a: str, b: str, b_path: str, scoped: bool = False) -> str:
+    return SCRIPT.format(a=a, b=b, b_path=b_path, scoped="scoped" if scoped else "")
+
+
+def test_deployers_share_their_addresses(project, nodes):
+    (a, b) = nodes
+    parser.parse(
+        script(a.url, b.url, "send L0 setValue(7)\n    deploy L1 (one, $L0, 1)")
+    )
+
+    address = create_address(a.chain.sender, 0)
+    assert parser.DEPLOYERS["a"].addresses["L0"] == address
+    assert parser.DEPLOYERS["b"].addresses["L0"] == address
+    # `b` sent to and referenced the L0 `a` deployed, without deploying its own
+    (send, deploy) = [decode_transaction(raw) for raw in b.chain.transactions]
+    assert send["to"] == address
+    assert send["data"].startswith(selector("setValue(uint256)"))
+    assert deploy["to"] is None
+    assert bytes.fromhex(address[2:]) in deploy["data"]
+
+
+def test_scoped_deployers_keep_their_own_labels(project, nodes):
+    (a, b) = nodes
+    other = "0x0000000000000000000000000000000000000002"
+    parser.parse(script(a.url, b.url, B_PATH.format(other=other), scoped=True))
+
+    sender = a.chain.sender
+    assert parser.DEPLOYERS["a"].addresses == {"L0": create_address(sender, 0)}
+    assert parser.DEPLOYERS["b"].addresses == {
+        "L1": create_address(sender, 0),
+        "L0": create_address(sender, 1),
+    }
+    assert parser.ADDRESSES == {}
+
+
+def test_references_another_deployers_label(project, nodes):
+    (a, b) = nodes
+    parser.parse(script(a.url, b.url, B_PATH.format(other="$L0@a"), scoped=True))
+
+    # L1's constructor got `a`'s L0, deployed before it
+    address = parser.DEPLOYERS["a"].addresses["L0"]
+    assert bytes.fromhex(address[2:]) in b.chain.transactions[0]
+
+
+def test_references_need_a_declared_deployer(project):
+    with pytest.raises(ValueError, match="deployer `c` needs to be declared"):
+        parser.compile_script(script("local", "local", B_PATH.format(other="$L0@c")))
+
+
+def test_log_lines_name_their_deployer_once(project, nodes):
+    (a, b) = nodes
+    lines = []
+    handler = logger.add(
+        lines.append, format="{extra[prefix]}{message}", level="INFO", catch=False
+    )
+    try:
+        parser.parse(script(a.url, b.url, B_PATH.format(other="$L0@a"), scoped=True))
+    finally:
+        logger.remove(handler)
+
+    deploys = [line.strip() for line in lines if "Deploying" in line]
+    assert sorted(deploys) == [
+        "[a] Deploying | $L0...",
+        "[b] Deploying | $L0...",
+        "[b] Deploying | $L1...",
+    ]
@@ -0,0 +1,56 @@
+import os
+from conftest import reset
+from foundrydeploy import parser
+from foundrydeploy.estimate import resolve_plan
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+    {options}
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, 1)
+    send L0 setValue(7)
+"""
+
+
+def plan(url: str, options: str = "") -> list:
+    reset()
+    script = SCRIPT.format(url=url, options=options)
+    return resolve_plan(parser.load_plan(script, read_only=True))
+
+
+def test_plan_writes_nothing(project, node):
+    rows = plan(node.url)
+    assert [row["status"] for row in rows] == ["deploy", "send"]
+    # No store, cached plan or ABI index
+    assert not (project / "cache").exists()
+
+
+def test_plan_reads_the_cache_without_writing_it(project, node):
+    parser.parse(SCRIPT.format(url=node.url, options=""))
+    cache = project / "cache"
+    modified = {path: os.stat(cache / path).st_mtime_ns for path in os.listdir(cache)}
+
+    # The plan cached by the run is used, but not even touched
+    rows = plan(node.url)
+    assert [row["status"] for row in rows] == ["skip (cached)", "skip (sent)"]
+    assert {
+        path: os.stat(cache / path).st_mtime_ns for path in os.listdir(cache)
+    } == modified
+
+
+def test_plan_keeps_the_journal(project, node):
+    plan(node.url, "no_cache")
+    journal = parser.DEPLOYERS["d"].journal.path
+    os.makedirs(os.path.dirname(journal), exist_ok=True)
+    with open(journal, "w") as f:
+        f.write('{"kind": "send", "label": "L0", "key": "k", "transactions": []}\n')
+
+    plan(node.url, "no_cache")
+    assert os.path.exists(journal)
@@ -0,0 +1,79 @@
+import json
+from conftest import reset
+from foundrydeploy import log, parser
+from foundrydeploy.log import add_event_sink, remove_event_sink
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, 1)
+    send L0 setValue(7)
+"""
+
+
+def events(path) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_every_action_is_an_event(project, node, chain):
+    path = project / "events.jsonl"
+    handler = add_event_sink(str(path))
+    try:
+        parser.parse(SCRIPT.format(url=node.url))
+        reset()
+        parser.parse(SCRIPT.format(url=node.url))
+    finally:
+        remove_event_sink(handler)
+
+    lines = events(path)
+    assert all([line["deployer"] == "d" and "time" in line for line in lines])
+    kinds = [line["event"] for line in lines]
+    assert kinds == [
+        "cache_load",
+        "deploy",
+        "send",
+        "cache_save",
+        "summary",
+        "cache_load",
+        "skip",
+        "skip",
+        "cache_save",
+        "summary",
+    ]
+
+    (deploy, send) = lines[1:3]
+    address = deploy["address"]
+    assert deploy["label"] == "L0"
+    assert deploy["transactions"] == lines[4]["transactions"][:1]
+    assert send["signature"] == "setValue(uint256)"
+    assert send["address"] == address
+    assert lines[4]["addresses"] == {"L0": address}
+    assert [(line["action"], line["reason"]) for line in lines[6:8]] == [
+        ("deploy", "cached"),
+        ("send", "sent"),
+    ]
+    assert len(chain.transactions) == 2
+
+
+def test_removing_a_sink_closes_its_file(project, monkeypatch):
+    opened = []
+
+    def record(*args, **kwargs):
+        opened.append(open(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(log, "open", record, raising=False)
+    handler = add_event_sink(str(project / "events.jsonl"))
+    log._event("summary", deployer="d")
+    remove_event_sink(handler)
+
+    assert opened[0].closed
+    assert [line["event"] for line in events(project / "events.jsonl")] == ["summary"]
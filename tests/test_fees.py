@@ -0,0 +1,83 @@
+from rpc_server import decode_transaction
+from foundrydeploy import parser
+from foundrydeploy.fees import BlockContext, FeePolicy
+
+GWEI = 10**9
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+    {options}
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, 1)
+    send L0 setValue(1)
+    send L0 setValue(2)
+    send L0 setValue(3)
+"""
+
+
+def run(node, options: str) -> list:
+    parser.parse(SCRIPT.format(url=node.url, options=options))
+    return [decode_transaction(raw)["fees"] for raw in node.chain.transactions]
+
+
+def test_policy_bumps_and_caps_the_suggested_fees():
+    assert FeePolicy(bump=10).apply(True, gas_price=25 * GWEI) == {
+        "gasPrice": 27500000000
+    }
+    assert FeePolicy(bump=10, max_fee=26 * GWEI).apply(True, gas_price=25 * GWEI) == {
+        "gasPrice": 26 * GWEI
+    }
+    assert FeePolicy(bump=50).apply(False, base_fee=10 * GWEI, tip=2 * GWEI) == {
+        "maxFeePerGas": 23 * GWEI,
+        "maxPriorityFeePerGas": 3 * GWEI,
+    }
+    assert FeePolicy(bump=50, max_fee=2 * GWEI).apply(
+        False, base_fee=10 * GWEI, tip=4 * GWEI
+    ) == {"maxFeePerGas": 2 * GWEI, "maxPriorityFeePerGas": 2 * GWEI}
+
+
+def test_legacy_transactions_pay_the_bumped_gas_price(project, node):
+    # The stand-in node suggests 1 gwei
+    fees = run(node, "legacy\n    fee_bump 10")
+    assert fees == [{"gasPrice": 1100000000}] * 4
+    # Fetched once for the whole run
+    assert parser.DEPLOYERS["d"].fees.fetches == 1
+
+
+def test_eip1559_transactions_pay_twice_the_base_fee_and_the_tip(project, node):
+    # A 1 gwei tip, and a base fee of 7 wei
+    fees = run(node, "")
+    assert fees == [{"maxPriorityFeePerGas": GWEI, "maxFeePerGas": GWEI + 14}] * 4
+
+
+def test_eip1559_transactions_are_capped_at_max_fee(project, node):
+    fees = run(node, "fee_bump 20\n    max_fee 1.1gwei")
+    assert (
+        fees == [{"maxPriorityFeePerGas": 1100000000, "maxFeePerGas": 1100000000}] * 4
+    )
+
+
+def test_fees_are_only_fetched_again_for_a_new_block(node, chain):
+    context = BlockContext(node.url, legacy=True, poll_interval=60)
+    assert context.fees() == {"gasPrice": GWEI}
+    requests = node.requests
+    context.fees()
+    # Fresh: no request at all
+    assert (node.requests, context.fetches) == (requests, 1)
+
+    context.poll_interval = 0
+    context.fees()
+    # Stale, but the block is the same: only `eth_blockNumber`
+    assert (node.requests, context.fetches) == (requests + 1, 1)
+
+    chain.block += 1
+    context.fees()
+    assert (node.requests, context.fetches) == (requests + 3, 2)
+    assert context.block == chain.block
@@ -0,0 +1,72 @@
+import glob, json
+import pytest
+from conftest import reset
+from foundrydeploy import parser
+from foundrydeploy.abi import selector
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, 1)
+    send L0 setValue(1)
+    send L0 setName("two")
+"""
+
+SET_VALUE = selector("setValue(uint256)")
+SET_NAME = selector("setName(string)")
+
+
+def run(node):
+    reset()
+    parser.parse(SCRIPT.format(url=node.url))
+
+
+def crash(node, chain) -> str:
+    """
+    Runs the script until `setName` reverts, which leaves the cache unsaved like a crash
+    would, and returns the journal.
+    """
+    chain.reverting.add(SET_NAME)
+    with pytest.raises(ValueError, match="reverted"):
+        run(node)
+    chain.reverting.clear()
+
+    (journal,) = glob.glob("cache/*.journal")
+    return journal
+
+
+def test_resumes_from_the_last_completed_action(project, node, chain):
+    journal = crash(node, chain)
+    with open(journal) as f:
+        records = [json.loads(line) for line in f]
+    assert [record["kind"] for record in records] == ["deploy", "send"]
+    address = records[0]["address"]
+
+    run(node)
+    # Neither the deploy nor the first send are made again
+    assert len(chain.transactions) == 4
+    assert chain.sent(SET_VALUE) == 1
+    assert chain.sent(SET_NAME) == 2
+    assert parser.DEPLOYERS["d"].address("L0") == address
+    # Saving the cache compacted the journal
+    assert glob.glob("cache/*.journal") == []
+
+    run(node)
+    assert len(chain.transactions) == 4
+
+
+def test_a_torn_last_record_is_ignored(project, node, chain):
+    journal = crash(node, chain)
+    with open(journal, "a") as f:
+        f.write('{"kind": "send", "label": "L0", "ke')
+
+    run(node)
+    assert chain.sent(SET_VALUE) == 1
+    assert len(chain.transactions) == 4
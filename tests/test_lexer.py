@@ -0,0 +1,49 @@
+import pytest
+from foundrydeploy import parser
+from foundrydeploy.lexer import LexError, lex, lex_line
+
+
+def test_splits_on_whitespace_outside_groups():
+    line = lex_line('    send HOPPER setSaleDetails(1, [$A, $B], "a b")  # comment', 3)
+    assert line.tokens == ["send", "HOPPER", 'setSaleDetails(1, [$A, $B], "a b")']
+    assert line.columns == [5, 10, 17]
+
+    line = lex_line("    deploy L0 (#PUB, x)")
+    assert line.tokens == ["deploy", "L0", "(#PUB, x)"]
+    assert line.columns == [5, 12, 15]
+
+
+def test_skips_blank_and_comment_lines():
+    lines = lex(".contracts\n\n    # comment\n    L0 0x01 # label\n")
+    assert [(line.number, line.tokens) for line in lines] == [
+        (1, [".contracts"]),
+        (4, ["L0", "0x01"]),
+    ]
+
+
+@pytest.mark.parametrize(
+    "text, column, message",
+    [
+        ("send L0 f(1, [2, 3)", 19, "unexpected `)`"),
+        ("send L0 f(1))", 13, "unexpected `)`"),
+        ("  send L0 f(1)] x", 15, "unexpected `]`"),
+        ("deploy L0 (a, (b, c)", 11, "unclosed `(`"),
+        ("send L0 f(1, [2", 14, "unclosed `[`"),
+        ('send L0 f(1, "a', 14, 'unclosed `"`'),
+        ('send L0 "a b', 9, 'unclosed `"`'),
+    ],
+)
+def test_errors_point_at_their_column(text, column, message):
+    with pytest.raises(LexError) as error:
+        lex_line(text, 7)
+
+    assert (error.value.number, error.value.column) == (7, column)
+    assert str(error.value) == (
+        f"line:7:{column} {message}\n{text}\n{' ' * (column - 1)}^"
+    )
+
+
+def test_script_errors_have_the_script_line():
+    script = '.contracts\n\n    # comment\n    L0 "src/C.sol:C\n'
+    with pytest.raises(LexError, match='line:4:8 unclosed `"`'):
+        parser.compile_script(script)
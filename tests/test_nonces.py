@@ -0,0 +1,59 @@
+import pytest
+from foundrydeploy import parser
+from foundrydeploy.crypto import create_address
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+    L1 "src/Contract1.sol:Contract1"
+    L2 "src/Contract2.sol:Contract2"
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+    workers 4
+
+.use d
+    deploy L0 (zero, 0x0000000000000000000000000000000000000001, 0)
+    deploy L1 (one, 0x0000000000000000000000000000000000000001, 1)
+    deploy L2 (two, 0x0000000000000000000000000000000000000001, 2)
+    send L0 setValue(7)
+    send L1 setValue(8)
+    send L2 setValue(9)
+"""
+
+
+def test_concurrent_steps_take_distinct_nonces(project, node, chain):
+    # Transactions stay pending for a while, like on a real node
+    chain.block_time = 0.2
+    node.latency = 0.02
+    parser.parse(SCRIPT.format(url=node.url))
+
+    assert chain.nonces[chain.sender] == 6
+    deployer = parser.DEPLOYERS["d"]
+    addresses = {create_address(chain.sender, nonce) for nonce in range(6)}
+    assert {deployer.addresses[f"L{index}"] for index in range(3)} <= addresses
+
+
+@pytest.mark.parametrize("signer", ["ledger", "env", "ganache\n    signers env"])
+def test_signers_without_local_nonces_run_steps_one_at_a_time(project, node, signer):
+    script = f"""
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.signer env
+    private $PK
+
+.deployer d
+    network {node.url}
+    signer {signer}
+    workers 4
+"""
+    parser.parse(script)
+    assert parser.DEPLOYERS["d"].workers == 1
+
+
+def test_private_keys_keep_their_workers(project, node):
+    parser.parse(SCRIPT.format(url=node.url).split(".use")[0])
+    assert parser.DEPLOYERS["d"].workers == 4
@@ -0,0 +1,63 @@
+import pytest
+from conftest import reset
+from foundrydeploy import parser
+from foundrydeploy.abi import selector
+from foundrydeploy.crypto import create_address
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+    pipeline
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, 1)
+    send L0 setValue(7)
+"""
+
+
+def run(script: str):
+    reset()
+    parser.parse(script)
+
+
+def test_reverted_send_is_made_again(project, node, chain):
+    set_value = selector("setValue(uint256)")
+    chain.reverting.add(set_value)
+    script = SCRIPT.format(url=node.url)
+
+    for _ in range(2):
+        with pytest.raises(ValueError, match="reverted transactions"):
+            run(script)
+    # The deploy was mined the first time, the send is made again after reverting
+    assert len(chain.transactions) == 3
+    assert chain.sent(set_value) == 2
+
+    chain.reverting.clear()
+    run(script)
+    run(script)
+    assert chain.sent(set_value) == 3
+    assert len(chain.transactions) == 4
+
+
+def test_reverted_deploy_keeps_no_address(project, node, chain):
+    # Every deploy's initcode starts with the artifacts' `6080604052`
+    chain.reverting.add(bytes.fromhex("60806040"))
+    script = SCRIPT.format(url=node.url)
+
+    with pytest.raises(ValueError, match="reverted transactions"):
+        run(script)
+    deployer = parser.DEPLOYERS["d"]
+    assert "L0" not in deployer.addresses
+    assert "L0" not in deployer.deployments
+
+    chain.reverting.clear()
+    run(script)
+    deployer = parser.DEPLOYERS["d"]
+    # Deployed again, with the next nonce of the signer
+    assert deployer.addresses["L0"] == create_address(chain.sender, 2)
+    assert len(chain.transactions) == 4
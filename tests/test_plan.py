@@ -0,0 +1,67 @@
+import json, os
+import pytest
+from fixtures import artifact
+from foundrydeploy import parser
+from foundrydeploy.const import PLAN_CACHE_SIZE
+
+KEY = "59c6995e998f97a5a0044966f0945389dc9e86dae88c7a8412f4603b6b78690d"
+POOLED = "0x5de4111afa1a4b94908f83103eb1f1706367c2e68ca870fc3fb9a804cdab365a"
+
+SCRIPT = f"""
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.signer s
+    private {KEY}
+
+.deployer d
+    network local
+    signer s
+    signers {POOLED}
+
+.use d
+    send L0 setValue (7)
+"""
+
+
+def plans(project) -> list:
+    return sorted((project / "cache").glob("plan_*.json"))
+
+
+def test_cached_plan_holds_no_key(project):
+    plan = parser.load_plan(SCRIPT)
+    [cached] = plans(project)
+    text = cached.read_text()
+    assert KEY not in text and POOLED[2:] not in text
+
+    # Read back with the keys of the script
+    assert parser.load_plan(SCRIPT) == json.loads(json.dumps(plan))
+
+
+def test_cached_plan_is_checked_against_new_artifacts(project):
+    parser.load_plan(SCRIPT)
+
+    # `setValue` is renamed after the plan was cached
+    rebuilt = artifact(0)
+    rebuilt["abi"][1]["name"] = "setAmount"
+    with open(project / "out/Contract0.sol/Contract0.json", "w") as f:
+        json.dump(rebuilt, f)
+
+    with pytest.raises(ValueError, match="setValue does not exist"):
+        parser.load_plan(SCRIPT)
+
+
+def test_least_recently_used_plans_are_removed(project, monkeypatch):
+    first = SCRIPT + "\n# 0\n"
+    parser.load_plan(first)
+    for index in range(1, PLAN_CACHE_SIZE + 2):
+        parser.load_plan(SCRIPT + f"\n# {index}\n")
+        parser.load_plan(first)
+    assert len(plans(project)) == PLAN_CACHE_SIZE
+
+    # Used all along, it's still cached
+    def compile_script(script: str):
+        raise AssertionError("compiled again")
+
+    monkeypatch.setattr(parser, "compile_script", compile_script)
+    parser.load_plan(first)
@@ -0,0 +1,88 @@
+import http.client, time
+import pytest
+from rpc_server import Chain, serve
+from foundrydeploy import TEST_SIGNER
+from foundrydeploy.crypto import sign_transaction
+from foundrydeploy.pool import PoolClient
+
+
+@pytest.fixture
+def servers():
+    chain = Chain()
+    # The first endpoint is the fastest, so the one sends go to
+    servers = [serve(chain, latency=latency) for latency in (0, 0.02, 0.04)]
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def send(client, nonce: int) -> str:
+    tx = {"chainId": 31337, "nonce": nonce, "gas": 21000, "gasPrice": 10**9}
+    raw = sign_transaction(tx, TEST_SIGNER.key_argument)
+    return client.call("eth_sendRawTransaction", ["0x" + raw.hex()])
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+
+def test_reads_are_spread(servers):
+    pool = PoolClient([server.url for server in servers], interval=3600)
+    before = [server.requests for server in servers]
+    for _ in range(30):
+        pool.call("eth_blockNumber")
+    assert [server.requests - count for (server, count) in zip(servers, before)] == [
+        10,
+        10,
+        10,
+    ]
+
+
+def test_fails_over_and_rejoins(servers):
+    (fastest, *others) = servers
+    pool = PoolClient([server.url for server in servers], interval=0.1)
+    assert pool.best() == fastest.url
+    send(pool, 0)
+
+    fastest.down = True
+    before = fastest.requests
+    # Sends move on to the next endpoint, the down one is skipped once it failed
+    send(pool, 1)
+    assert pool.best() != fastest.url
+    assert not pool.endpoints[0].healthy
+    for _ in range(10):
+        assert int(pool.call("eth_blockNumber"), 16) == 3
+    send(pool, 2)
+    # Only the health checks still try it
+    wait_for(lambda: fastest.requests > before + 1)
+    assert not pool.endpoints[0].healthy
+    assert fastest.chain.nonces[fastest.chain.sender] == 3
+
+    fastest.down = False
+    wait_for(lambda: pool.endpoints[0].healthy)
+    assert pool.best() == fastest.url
+    before = fastest.requests
+    send(pool, 3)
+    for _ in range(9):
+        pool.call("eth_blockNumber")
+    assert fastest.requests - before >= 4
+    pool.close()
+
+
+def test_every_endpoint_down(servers):
+    pool = PoolClient([server.url for server in servers], interval=3600, retries=0)
+    for server in servers:
+        server.down = True
+    with pytest.raises((http.client.HTTPException, OSError)):
+        pool.call("eth_blockNumber")
+    assert not any([endpoint.healthy for endpoint in pool.endpoints])
+
+    for server in servers:
+        server.down = False
+    pool.check()
+    assert all([endpoint.healthy for endpoint in pool.endpoints])
+    assert int(pool.call("eth_blockNumber"), 16) == 1
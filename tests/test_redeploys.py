@@ -0,0 +1,81 @@
+import json, os
+from conftest import reset
+from rpc_server import decode_transaction
+from foundrydeploy import parser
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+    L1 "src/Contract1.sol:Contract1"
+    L2 "src/Contract2.sol:Contract2"
+    FIXED "src/Contract2.sol:Contract2" 0x0000000000000000000000000000000000000009
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, {amount})
+    deploy L1 (name, $L0, 1)
+    deploy L2 (name, 0x0000000000000000000000000000000000000001, 1)
+    deploy FIXED (name, $L0, 1)
+"""
+
+
+def run(node, amount: int = 1) -> dict:
+    reset()
+    parser.parse(SCRIPT.format(url=node.url, amount=amount))
+    return dict(parser.DEPLOYERS["d"].addresses)
+
+
+def deploys(chain) -> int:
+    return len(
+        [raw for raw in chain.transactions if decode_transaction(raw)["to"] is None]
+    )
+
+
+def rebuild(index: int):
+    """
+    Changes the bytecode of `src/Contract{index}.sol`, like a new build would.
+    """
+    path = f"out/Contract{index}.sol/Contract{index}.json"
+    with open(path) as f:
+        artifact = json.load(f)
+    artifact["bytecode"]["object"] += "00"
+    with open(path, "w") as f:
+        json.dump(artifact, f)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+
+def test_unchanged_deploys_are_skipped(project, node, chain):
+    first = run(node)
+    assert deploys(chain) == 3
+    assert run(node) == first
+    assert deploys(chain) == 3
+
+
+def test_changed_arguments_redeploy_the_label_and_its_dependents(project, node, chain):
+    first = run(node)
+    second = run(node, amount=2)
+
+    # L1 takes $L0, whose address changed; L2 and the fixed label stay
+    assert deploys(chain) == 5
+    assert second["L0"] != first["L0"]
+    assert second["L1"] != first["L1"]
+    assert second["L2"] == first["L2"]
+    assert second["FIXED"] == first["FIXED"]
+
+    assert run(node, amount=2) == second
+    assert deploys(chain) == 5
+
+
+def test_a_rebuilt_contract_is_redeployed(project, node, chain):
+    first = run(node)
+    rebuild(2)
+    second = run(node)
+
+    assert deploys(chain) == 4
+    assert second["L2"] != first["L2"]
+    assert [second[label] for label in ("L0", "L1")] == [first["L0"], first["L1"]]
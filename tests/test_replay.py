@@ -0,0 +1,78 @@
+import pytest
+from conftest import reset
+from foundrydeploy import parser, replay
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, 1)
+    send L0 setValue({value})
+{extra}
+"""
+
+
+@pytest.fixture
+def recorded(project, node, chain):
+    """
+    A fixture recorded from a run against the stand-in node, which is down afterwards.
+    """
+    session = replay.start_recording("fixture.json")
+    try:
+        parser.parse(SCRIPT.format(url=node.url, value=1, extra=""))
+    finally:
+        replay.stop()
+    session.finish()
+    node.down = True
+    yield "fixture.json"
+    replay.stop()
+
+
+def run_replay(node, fixture: str, value: int = 1, extra: str = ""):
+    reset()
+    session = replay.start_replay(fixture)
+    parser.parse(SCRIPT.format(url=node.url, value=value, extra=extra))
+    session.finish()
+
+
+def test_replays_a_recorded_run_offline(recorded, node, chain):
+    transactions = len(chain.transactions)
+    requests = node.requests
+    run_replay(node, recorded)
+
+    assert len(chain.transactions) == transactions
+    assert node.requests == requests
+
+
+def test_reports_the_fields_a_call_diverges_on(recorded, node):
+    with pytest.raises(ValueError) as error:
+        run_replay(node, recorded, value=2)
+
+    assert "diverged at call 2 of `d`: send not recorded" in str(error.value)
+    assert "args[0]: recorded `1`, got `2`" in str(error.value)
+
+
+def test_reports_calls_made_past_the_recording(recorded, node):
+    extra = "    deploy L0 (name, 0x0000000000000000000000000000000000000002, 1)"
+    with pytest.raises(ValueError, match="every recorded call was already made"):
+        run_replay(node, recorded, extra=extra)
+
+
+def test_reports_the_recorded_calls_not_made(recorded, node):
+    reset()
+    session = replay.start_replay(recorded)
+    parser.parse(
+        SCRIPT.format(url=node.url, value=1, extra="").replace("    send", "#")
+    )
+
+    with pytest.raises(
+        replay.ReplayError, match="didn't make 1 recorded calls"
+    ) as error:
+        session.finish()
+    assert '"signature": "setValue(uint256)"' in str(error.value)
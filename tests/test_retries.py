@@ -0,0 +1,135 @@
+import json, os, sys
+import pytest
+from foundrydeploy import parser, TEST_SIGNER
+from foundrydeploy.crypto import create_address
+from foundrydeploy.retry import is_transient
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.deployer d
+    network {url}
+    signer ganache
+    {backend}
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, 1)
+    send L0 setValue(7)
+"""
+
+# Broadcasts a transaction like `forge create` would, then fails as if the node's answer was
+# lost (or prints it, with `fail` False). Its arguments are appended to `forge.log`
+FAKE_FORGE = """#!{python}
+import json, sys, urllib.request
+sys.path.insert(0, {root!r})
+from foundrydeploy.crypto import create_address, private_key_to_address, sign_transaction
+
+with open("forge.log", "a") as log:
+    log.write(json.dumps(sys.argv[1:]) + "\\n")
+
+def flag(name):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else None
+
+def rpc(method, params):
+    body = json.dumps({{"jsonrpc": "2.0", "id": 1, "method": method, "params": params}})
+    request = urllib.request.Request(
+        flag("--rpc-url"), body.encode(), {{"Content-Type": "application/json"}}
+    )
+    return json.load(urllib.request.urlopen(request))["result"]
+
+key = flag("--private-key")
+sender = private_key_to_address(key)
+nonce = flag("--nonce")
+if nonce is None:
+    nonce = rpc("eth_getTransactionCount", [sender, "pending"])
+tx = {{"chainId": 31337, "nonce": int(nonce, 0), "gas": 10**5, "gasPrice": 10**9}}
+tx_hash = rpc("eth_sendRawTransaction", ["0x" + sign_transaction(tx, key).hex()])
+if {fail}:
+    sys.exit("Error: error sending request: 502 Bad Gateway")
+print("Deployed to: " + create_address(sender, int(nonce, 0)))
+print("Transaction hash: " + tx_hash)
+"""
+
+
+def fake_forge(project, monkeypatch, fail: bool):
+    bin_dir = project / "bin"
+    bin_dir.mkdir()
+    root = os.path.join(os.path.dirname(__file__), "..")
+    (bin_dir / "forge").write_text(
+        FAKE_FORGE.format(python=sys.executable, root=os.path.abspath(root), fail=fail)
+    )
+    (bin_dir / "forge").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def forge_calls(project) -> list:
+    with open(project / "forge.log") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_nonce_errors_are_not_transient():
+    assert is_transient("server returned an error response: 502 Bad Gateway")
+    assert not is_transient("nonce too low: next nonce 3, tx nonce 2")
+
+
+def test_lost_answer_doesnt_send_again(project, node, chain):
+    # The deploy is mined, but its hash never makes it back
+    node.lose.append("eth_sendRawTransaction")
+    parser.parse(SCRIPT.format(url=node.url, backend="native"))
+
+    assert len(chain.transactions) == 2
+    deployer = parser.DEPLOYERS["d"]
+    assert deployer.addresses["L0"] == create_address(chain.sender, 0)
+
+
+@pytest.mark.parametrize("pin_nonces", ["", "pin_nonces"])
+def test_command_failing_after_broadcast_isnt_retried(
+    project, node, chain, monkeypatch, pin_nonces
+):
+    fake_forge(project, monkeypatch, fail=True)
+    with pytest.raises(ValueError, match="502 Bad Gateway"):
+        parser.parse(SCRIPT.format(url=node.url, backend=pin_nonces))
+    assert len(chain.transactions) == 1
+    assert len(forge_calls(project)) == 1
+    # Pinned, the nonce is the one it was given
+    assert ("--nonce" in forge_calls(project)[0]) == (pin_nonces != "")
+
+
+def test_keys_the_shell_expands(project, node, chain, monkeypatch):
+    fake_forge(project, monkeypatch, fail=False)
+    monkeypatch.setenv("PK", TEST_SIGNER.key_argument)
+    script = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.signer env
+    private $PK
+
+.deployer d
+    network {url}
+    signer env
+    {options}
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, 1)
+"""
+    # Neither signed in-process nor given a local nonce, forge gets the expanded key
+    parser.parse(script.format(url=node.url, options="native\n    pin_nonces"))
+    assert parser.DEPLOYERS["d"].addresses["L0"] == create_address(chain.sender, 0)
+    assert forge_calls(project) == [
+        [
+            "create",
+            "--rpc-url",
+            node.url,
+            "--private-key",
+            TEST_SIGNER.key_argument,
+            "src/Contract0.sol:Contract0",
+            "--constructor-args",
+            "name",
+            "--constructor-args",
+            "0x0000000000000000000000000000000000000001",
+            "--constructor-args",
+            "1",
+        ]
+    ]
@@ -0,0 +1,33 @@
+import threading, time
+import pytest
+from foundrydeploy.scheduler import build_graph, run_graph
+
+
+def test_steps_wait_for_the_labels_they_use():
+    steps = [
+        (0, "FLY", []),
+        (1, "POND", ["$FLY"]),
+        (1, "FLY", ["1"]),
+        (1, "STREAM", ["[$POND,$FLY]"]),
+        (1, ("POND", "STREAM"), []),
+    ]
+    assert build_graph(steps) == [set(), {0}, {0, 1}, {1, 2}, {1, 3}]
+
+
+def test_failure_cancels_the_steps_not_started():
+    ran = []
+    lock = threading.Lock()
+
+    def execute(action, contract_label, arguments):
+        with lock:
+            ran.append(contract_label)
+        if contract_label == "L0":
+            raise ValueError("reverted")
+        time.sleep(0.05)
+
+    steps = [(1, f"L{index}", []) for index in range(10)]
+    with pytest.raises(ValueError, match="reverted"):
+        run_graph(steps, execute, 2)
+    # At most the step running next to L0, none of the ones waiting for a worker
+    assert "L0" in ran
+    assert set(ran) <= {"L0", "L1"}
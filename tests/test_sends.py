@@ -0,0 +1,68 @@
+from conftest import reset
+from foundrydeploy import parser
+from foundrydeploy.abi import selector
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+    {options}
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, {amount})
+    send L0 setValue({value})
+    send L0 setName("always") always
+    send L0 setOther(0x0000000000000000000000000000000000000002)
+    send L0 setOther(0x0000000000000000000000000000000000000002)
+"""
+
+SET_VALUE = selector("setValue(uint256)")
+SET_NAME = selector("setName(string)")
+SET_OTHER = selector("setOther(address)")
+
+
+def run(node, value: int = 1, amount: int = 1, options: str = ""):
+    reset()
+    parser.parse(
+        SCRIPT.format(url=node.url, value=value, amount=amount, options=options)
+    )
+
+
+def test_sends_are_made_once_unless_always(project, node, chain):
+    run(node)
+    run(node)
+    run(node)
+
+    assert chain.sent(SET_VALUE) == 1
+    assert chain.sent(SET_NAME) == 3
+    # A send repeated in the path is made as many times, once
+    assert chain.sent(SET_OTHER) == 2
+
+
+def test_a_send_with_other_arguments_is_made(project, node, chain):
+    run(node)
+    run(node, value=2)
+    run(node, value=2)
+    # Back to an argument sent before
+    run(node)
+
+    assert chain.sent(SET_VALUE) == 2
+
+
+def test_a_redeployed_target_gets_the_send_again(project, node, chain):
+    run(node)
+    run(node, amount=2)
+
+    assert chain.sent(SET_VALUE) == 2
+
+
+def test_no_cache_forgets_the_sends(project, node, chain):
+    run(node)
+    run(node, options="no_cache")
+
+    assert chain.sent(SET_VALUE) == 2
+    assert chain.sent(SET_NAME) == 2
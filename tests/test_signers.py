@@ -0,0 +1,138 @@
+import pytest
+from rpc_server import decode_transaction
+from foundrydeploy import Signer, parser
+from foundrydeploy.abi import selector
+from foundrydeploy.crypto import private_key_to_address
+from foundrydeploy.multicall import AGGREGATE3
+from foundrydeploy.signers import LEAST_PENDING, SignerPool
+
+ALICE = "11" * 32
+BOB = "22" * 32
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+
+.signer alice
+    private {alice}
+
+.signer bob
+    private {bob}
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+    signers alice bob
+    {options}
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, 1)
+{sends}
+"""
+
+
+def senders(chain) -> list:
+    """
+    `(sender, selector)` of every transaction, in the order the chain received them.
+    """
+    transactions = [decode_transaction(raw) for raw in chain.transactions]
+    return [(tx["sender"], tx["data"][:4]) for tx in transactions]
+
+
+def run(node, sends: list, options: str = ""):
+    parser.parse(
+        SCRIPT.format(
+            alice=ALICE,
+            bob=BOB,
+            url=node.url,
+            options=options,
+            sends="\n".join(["    " + send for send in sends]),
+        )
+    )
+
+
+def test_pinned_sends_stay_on_the_signer(project, node, chain):
+    run(
+        node,
+        [
+            "send L0 setValue(1)",
+            "send L0 setValue(2) pinned",
+            "send L0 setOther(#PUB)",
+            "send L0 setValue(3) always pinned",
+            "send L0 setValue(4)",
+        ],
+    )
+
+    (alice, bob) = [private_key_to_address(key) for key in (ALICE, BOB)]
+    (set_value, set_other) = [
+        selector(f) for f in ("setValue(uint256)", "setOther(address)")
+    ]
+    assert senders(chain)[1:] == [
+        (alice, set_value),
+        (chain.sender, set_value),
+        (chain.sender, set_other),
+        (chain.sender, set_value),
+        (bob, set_value),
+    ]
+
+
+def test_sends_go_round_robin_over_the_pool(project, node, chain):
+    run(node, [f"send L0 setValue({value})" for value in range(5)])
+
+    (alice, bob) = [private_key_to_address(key) for key in (ALICE, BOB)]
+    assert [sender for (sender, _) in senders(chain)] == [
+        chain.sender,
+        alice,
+        bob,
+        alice,
+        bob,
+        alice,
+    ]
+
+
+def test_pooled_signers_keep_their_own_nonces(project, node, chain):
+    run(
+        node,
+        [f"send L0 setValue({value})" for value in range(6)],
+        "pipeline\n    signer_policy least_pending",
+    )
+
+    (alice, bob) = [private_key_to_address(key) for key in (ALICE, BOB)]
+    transactions = [decode_transaction(raw) for raw in chain.transactions[1:]]
+    assert sorted([(tx["sender"], tx["nonce"]) for tx in transactions]) == sorted(
+        [(alice, nonce) for nonce in range(3)] + [(bob, nonce) for nonce in range(3)]
+    )
+    assert parser.DEPLOYERS["d"].signers.sends == [3, 3]
+
+
+def test_batches_are_spread_over_the_pool(project, node, chain):
+    run(node, [f"send L0 setValue({value})" for value in range(4)], "batch 2")
+
+    (alice, bob) = [private_key_to_address(key) for key in (ALICE, BOB)]
+    aggregate3 = selector(AGGREGATE3)
+    assert senders(chain)[1:] == [(alice, aggregate3), (bob, aggregate3)]
+
+
+def test_least_pending_hands_out_the_least_busy_signer():
+    (alice, bob, carol) = [
+        Signer(argument=key) for key in ("11" * 32, "22" * 32, "33" * 32)
+    ]
+    round_robin = SignerPool([alice, bob, carol])
+    least_pending = SignerPool([alice, bob, carol], policy=LEAST_PENDING)
+
+    for pool in (round_robin, least_pending):
+        assert [pool.acquire() for _ in range(3)] == [alice, bob, carol]
+        pool.release(bob)
+    assert round_robin.acquire() is alice
+    assert least_pending.acquire() is bob
+
+    # Back to the one with the fewest sends once nothing is pending
+    least_pending.settle()
+    assert least_pending.acquire() is alice
+    assert least_pending.sends == [2, 2, 1]
+
+
+def test_unknown_policies_are_rejected():
+    with pytest.raises(ValueError, match="signer policy `random` not supported"):
+        SignerPool([Signer(argument="11" * 32)], policy="random")
@@ -0,0 +1,51 @@
+from conftest import reset
+from foundrydeploy import parser
+from foundrydeploy.store import get_store
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+    L1 "src/Contract1.sol:Contract1"
+    FIXED "src/Contract2.sol:Contract2" 0x00000000000000000000000000000000000000f1
+
+.deployer a
+    network {a}
+    signer ganache
+    native
+    {scoped}
+
+.deployer b
+    network {b}
+    signer ganache
+    native
+    {scoped}
+
+.use a
+    deploy L0 (zero, $FIXED, 0)
+
+.use b
+    {b_path}
+"""
+
+
+def test_saves_only_the_deployers_own_labels(project, nodes):
+    (a, b) = nodes
+    parser.parse(
+        SCRIPT.format(a=a.url, b=b.url, b_path="deploy L1 (one, $L0, 1)", scoped="")
+    )
+
+    store = get_store()
+    assert [row["chain_id"] for row in store.lookup("L0")] == [1001]
+    assert [row["chain_id"] for row in store.lookup("L1")] == [1002]
+    # `.contracts` addresses are given to every deployer
+    assert [row["deployed_at"] for row in store.lookup("FIXED")] == [None, None]
+
+    # Scoped, `b` deploys L0 on its own chain instead of taking `a`'s
+    reset()
+    parser.parse(
+        SCRIPT.format(
+            a=a.url, b=b.url, b_path="deploy L0 (zero, $FIXED, 0)", scoped="scoped"
+        )
+    )
+    assert len(b.chain.transactions) == 2
+    assert [row["chain_id"] for row in get_store().lookup("L0")] == [1001, 1002]
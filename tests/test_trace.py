@@ -0,0 +1,82 @@
+import json
+import pytest
+from foundrydeploy import parser, trace
+
+SCRIPT = """
+.contracts
+    L0 "src/Contract0.sol:Contract0"
+    L1 "src/Contract1.sol:Contract1"
+
+.deployer d
+    network {url}
+    signer ganache
+    native
+    workers 2
+
+.use d
+    deploy L0 (name, 0x0000000000000000000000000000000000000001, 1)
+    deploy L1 (name, 0x0000000000000000000000000000000000000001, 1)
+    send L0 setValue(1)
+"""
+
+
+@pytest.fixture
+def tracer():
+    yield trace.enable()
+    trace.disable()
+
+
+def test_exports_every_action_as_a_chrome_trace(project, node, tracer):
+    parser.parse(SCRIPT.format(url=node.url))
+    tracer.export_chrome("trace.json")
+
+    with open("trace.json") as f:
+        exported = json.load(f)
+    events = exported["traceEvents"]
+    assert exported["displayTimeUnit"] == "ms"
+    assert all([event["ph"] == "X" and event["ts"] >= 0 for event in events])
+    assert all([event["dur"] >= 0 for event in events])
+
+    actions = [event for event in events if event["name"] == "action"]
+    assert sorted([(event["args"]["label"], event["cat"]) for event in actions]) == [
+        ("L0", "deploy"),
+        ("L0", "send"),
+        ("L1", "deploy"),
+    ]
+    assert all([event["args"]["deployer"] == "d" for event in actions])
+
+    # Spans nested in an action, on the worker threads, carry its tags
+    submits = [event for event in events if event["name"] == "rpc submit"]
+    assert len(submits) == 3
+    assert sorted([event["args"]["label"] for event in submits]) == ["L0", "L0", "L1"]
+    for submit in submits:
+        (action,) = [
+            event
+            for event in actions
+            if event["tid"] == submit["tid"]
+            and event["ts"] <= submit["ts"]
+            and submit["ts"] + submit["dur"] <= event["ts"] + event["dur"]
+        ]
+        assert action["args"]["label"] == submit["args"]["label"]
+
+    names = {event["name"] for event in events}
+    assert {"parse", "use", "cache load", "cache save"} <= names
+    assert "action" in tracer.summary()
+
+
+def test_failed_spans_record_their_error(project, node, chain, tracer):
+    chain.reverting.add(bytes.fromhex("60806040"))
+    with pytest.raises(ValueError):
+        parser.parse(SCRIPT.format(url=node.url))
+
+    failed = [
+        event
+        for event in tracer.chrome_trace()["traceEvents"]
+        if event["name"] == "action"
+    ]
+    assert any(["reverted" in event["args"].get("error", "") for event in failed])
+
+
+def test_spans_cost_nothing_while_disabled():
+    assert trace.get_tracer() is None
+    assert trace.span("action", label="L0") is trace.span("resolve")